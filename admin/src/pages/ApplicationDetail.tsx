@@ -71,9 +71,10 @@ export default function ApplicationDetail() {
             const phone = formData.phone || formData.phone_number;
             if (message.trim() && phone) {
                 try {
+                    // Queued for the SMS worker; delivery is not known yet
                     await api.sendSms(phone, message);
                 } catch (smsError) {
-                    console.error('Failed to send SMS:', smsError);
+                    console.error('Failed to queue SMS:', smsError);
                     // Continue anyway - status was updated
                 }
             }
@@ -169,7 +169,14 @@ class ApiService {
             headers: this.headers(),
             body: JSON.stringify({ phone, message }),
         });
-        if (!response.ok) throw new Error('Failed to send SMS');
+        if (!response.ok) throw new Error('Failed to queue SMS');
+        // Queued only ({ status: 'queued', outbox_id }); see getSmsStatus
+        return response.json();
+    }
+
+    async getSmsStatus(outboxId: string) {
+        const response = await fetch(`${API_URL}/sms/${outboxId}`, { headers: this.headers() });
+        if (!response.ok) throw new Error('Failed to fetch SMS status');
         return response.json();
     }
 }
@@ -0,0 +1,37 @@
+"""add processed outcome missing
+
+Messages Gmail no longer has (deleted between being listed and fetched)
+are recorded as 'missing', so they count as handled and are not asked
+for again.
+
+Revision ID: 2d8e6b1f4a90
+Revises: b6d2f8a4c107
+Create Date: 2026-10-17 14:12:51.306127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8e6b1f4a90'
+down_revision: Union[str, None] = 'b6d2f8a4c107'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ADD VALUE can't be used in the transaction that adds it
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE processedoutcome ADD VALUE IF NOT EXISTS 'missing'")
+
+
+def downgrade() -> None:
+    # Postgres can't drop an enum value: rebuild the type without it
+    op.execute("DELETE FROM processed_messages WHERE outcome = 'missing'")
+    op.execute("ALTER TYPE processedoutcome RENAME TO processedoutcome_old")
+    op.execute("CREATE TYPE processedoutcome AS ENUM ('stored', 'duplicate', 'unparsed')")
+    op.execute("ALTER TABLE processed_messages ALTER COLUMN outcome TYPE processedoutcome "
+               "USING outcome::text::processedoutcome")
+    op.execute("DROP TYPE processedoutcome_old")
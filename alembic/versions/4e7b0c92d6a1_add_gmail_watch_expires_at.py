@@ -0,0 +1,26 @@
+"""add gmail_sync_state watch_expires_at
+
+Revision ID: 4e7b0c92d6a1
+Revises: d1281135c35b
+Create Date: 2026-10-17 09:12:41.508316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7b0c92d6a1'
+down_revision: Union[str, None] = 'd1281135c35b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('gmail_sync_state', sa.Column('watch_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('gmail_sync_state', 'watch_expires_at')
@@ -0,0 +1,52 @@
+"""add ledger billing_period idempotency key
+
+Revision ID: 5b2d71e0c4a8
+Revises: a3f08c5d9e12
+Create Date: 2026-10-16 14:05:52.730194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2d71e0c4a8'
+down_revision: Union[str, None] = 'a3f08c5d9e12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ledger', sa.Column('billing_period', sa.String(length=32), nullable=True))
+
+    # Key existing billing debits so a same-day re-run after deploy is a no-op.
+    # Only the first debit per driver and period gets the key; historical
+    # double charges keep billing_period NULL and don't violate the constraint.
+    op.execute("""
+        UPDATE ledger
+        SET billing_period = keyed.period
+        FROM (
+            SELECT id, period,
+                   ROW_NUMBER() OVER (PARTITION BY driver_id, period ORDER BY created_at, id) AS rn
+            FROM (
+                SELECT id, driver_id, created_at,
+                       CASE description
+                           WHEN 'Daily rental charge' THEN 'daily:' || to_char(created_at, 'YYYY-MM-DD')
+                           ELSE 'weekly:' || to_char(created_at, 'IYYY-"W"IW')
+                       END AS period
+                FROM ledger
+                WHERE type = 'debit'
+                  AND description IN ('Daily rental charge', 'Weekly rental charge')
+            ) debits
+        ) keyed
+        WHERE ledger.id = keyed.id AND keyed.rn = 1
+    """)
+
+    op.create_unique_constraint('uq_ledger_driver_billing_period', 'ledger', ['driver_id', 'billing_period'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_ledger_driver_billing_period', 'ledger', type_='unique')
+    op.drop_column('ledger', 'billing_period')
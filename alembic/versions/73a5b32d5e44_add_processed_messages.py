@@ -0,0 +1,35 @@
+"""add processed_messages
+
+Revision ID: 73a5b32d5e44
+Revises: c5a9e3f71d20
+Create Date: 2026-10-17 00:22:14.938125
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '73a5b32d5e44'
+down_revision: Union[str, None] = 'c5a9e3f71d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('processed_messages',
+    sa.Column('gmail_id', sa.String(length=255), nullable=False),
+    sa.Column('outcome', sa.Enum('stored', 'duplicate', 'unparsed', name='processedoutcome'), nullable=False),
+    sa.Column('parser_version', sa.Integer(), nullable=False),
+    sa.Column('payment_id', sa.UUID(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['payment_id'], ['payments_raw.id'], ),
+    sa.PrimaryKeyConstraint('gmail_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('processed_messages')
+    sa.Enum(name='processedoutcome').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,43 @@
+"""add driver_balances read model
+
+Revision ID: 7c1e9a4b2f30
+Revises: d4a311607f35
+Create Date: 2026-10-16 09:12:41.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e9a4b2f30'
+down_revision: Union[str, None] = 'd4a311607f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('driver_balances',
+    sa.Column('driver_id', sa.UUID(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['driver_id'], ['drivers.id'], ),
+    sa.PrimaryKeyConstraint('driver_id')
+    )
+
+    # Backfill from the existing ledger
+    op.execute("""
+        INSERT INTO driver_balances (driver_id, balance, updated_at)
+        SELECT d.id,
+               COALESCE(SUM(CASE WHEN l.type = 'credit' THEN l.amount ELSE -l.amount END), 0),
+               now() AT TIME ZONE 'utc'
+        FROM drivers d
+        LEFT JOIN ledger l ON l.driver_id = d.id
+        GROUP BY d.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('driver_balances')
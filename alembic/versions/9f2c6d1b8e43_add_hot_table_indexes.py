@@ -0,0 +1,94 @@
+"""add hot table indexes
+
+Indexes for the queries the API, parser and billing job run constantly.
+Built with CREATE INDEX CONCURRENTLY so writes keep flowing during the
+build; that can't run inside a transaction, hence the autocommit block.
+
+The unique indexes match what the code already assumes (the parser dedupes
+payments on (source, transaction_id) and gmail_id, aliases are unique per
+type + value). Older data can still hold duplicates (see
+scripts/debug_duplicates.py), so the upgrade first looks for them and, if
+there are any, lists the offending rows and stops before building any
+index. Which copy to keep is left to a person: a payment may carry a
+match and ledger credit. Each index is also dropped first, so an INVALID
+leftover from an interrupted build doesn't block a retry.
+
+Revision ID: 9f2c6d1b8e43
+Revises: e81f4c6a0b57
+Create Date: 2026-10-16 17:05:41.620394
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2c6d1b8e43'
+down_revision: Union[str, None] = 'e81f4c6a0b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('ix_ledger_driver_type_created_at', 'ledger', ['driver_id', 'type', 'created_at'], False),
+    ('ix_ledger_driver_created_at', 'ledger', ['driver_id', 'created_at', 'id'], False),
+    ('uq_payments_raw_source_transaction', 'payments_raw', ['source', 'transaction_id'], True),
+    ('uq_payments_raw_gmail_id', 'payments_raw', ['gmail_id'], True),
+    ('ix_payments_raw_matched_received_at', 'payments_raw', ['matched', 'received_at'], False),
+    ('ix_payments_raw_received_at', 'payments_raw', ['received_at'], False),
+    ('uq_aliases_value_type', 'aliases', ['alias_value', 'alias_type'], True),
+    ('ix_sms_log_driver_created_at', 'sms_log', ['driver_id', 'created_at'], False),
+    ('ix_sms_outbox_driver_created_at', 'sms_outbox', ['driver_id', 'created_at'], False),
+    ('ix_applications_created_at', 'applications', ['created_at'], False),
+    ('ix_applications_status_created_at', 'applications', ['status', 'created_at'], False),
+    ('ix_applications_driver_created_at', 'applications', ['driver_id', 'created_at'], False),
+]
+
+
+# Duplicate groups listed per unique index when the upgrade refuses to run
+SAMPLE_DUPLICATES = 20
+
+
+def _duplicates(table: str, columns: list[str]) -> list:
+    """Groups of rows that would violate a unique index on `columns` (NULLs never conflict)."""
+    cols = ', '.join(columns)
+    not_null = ' AND '.join(f'{column} IS NOT NULL' for column in columns)
+    return op.get_bind().execute(sa.text(
+        f"SELECT {cols}, count(*) AS copies, array_agg(id::text ORDER BY created_at) AS ids "
+        f"FROM {table} WHERE {not_null} GROUP BY {cols} HAVING count(*) > 1 "
+        f"ORDER BY count(*) DESC LIMIT {SAMPLE_DUPLICATES}"
+    )).all()
+
+
+def check_no_duplicates() -> None:
+    """Abort, listing the rows, if existing data would make a unique index build fail."""
+    problems = []
+    for name, table, columns, unique in INDEXES:
+        if not unique:
+            continue
+        for row in _duplicates(table, columns):
+            key = ', '.join(f'{column}={getattr(row, column)!r}' for column in columns)
+            problems.append(f"  {name}: {key} x{row.copies}: {table}.id {', '.join(row.ids)}")
+    if problems:
+        raise RuntimeError(
+            "Duplicate rows block the unique indexes; no index was built. Remove the extra copies "
+            "(keep the matched one) and re-run the upgrade:\n" + "\n".join(problems)
+        )
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql:
+        check_no_duplicates()
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
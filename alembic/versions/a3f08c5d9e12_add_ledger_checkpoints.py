@@ -0,0 +1,39 @@
+"""add ledger_checkpoints
+
+Revision ID: a3f08c5d9e12
+Revises: 7c1e9a4b2f30
+Create Date: 2026-10-16 11:40:03.114527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f08c5d9e12'
+down_revision: Union[str, None] = '7c1e9a4b2f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ledger_checkpoints',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('driver_id', sa.UUID(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('last_entry_at', sa.DateTime(), nullable=False),
+    sa.Column('last_entry_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['driver_id'], ['drivers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ledger_checkpoints_driver_position', 'ledger_checkpoints',
+                    ['driver_id', 'last_entry_at', 'last_entry_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ledger_checkpoints_driver_position', table_name='ledger_checkpoints')
+    op.drop_table('ledger_checkpoints')
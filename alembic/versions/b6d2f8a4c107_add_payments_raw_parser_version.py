@@ -0,0 +1,27 @@
+"""add payments_raw parser_version
+
+Revision ID: b6d2f8a4c107
+Revises: 4e7b0c92d6a1
+Create Date: 2026-10-17 11:40:07.214853
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2f8a4c107'
+down_revision: Union[str, None] = '4e7b0c92d6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL: parsed before versioning
+    op.add_column('payments_raw', sa.Column('parser_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('payments_raw', 'parser_version')
@@ -0,0 +1,32 @@
+"""add gmail_sync_state
+
+Revision ID: c5a9e3f71d20
+Revises: 9f2c6d1b8e43
+Create Date: 2026-10-17 00:31:12.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e3f71d20'
+down_revision: Union[str, None] = '9f2c6d1b8e43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('gmail_sync_state',
+    sa.Column('mailbox', sa.String(length=255), nullable=False),
+    sa.Column('history_id', sa.String(length=32), nullable=False),
+    sa.Column('last_full_sync_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('mailbox')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('gmail_sync_state')
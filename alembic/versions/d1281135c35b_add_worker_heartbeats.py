@@ -0,0 +1,39 @@
+"""add worker_heartbeats
+
+Revision ID: d1281135c35b
+Revises: 73a5b32d5e44
+Create Date: 2026-10-17 00:30:13.381027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1281135c35b'
+down_revision: Union[str, None] = '73a5b32d5e44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('worker_heartbeats',
+    sa.Column('worker', sa.String(length=64), nullable=False),
+    sa.Column('host', sa.String(length=255), nullable=True),
+    sa.Column('pid', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('beat_at', sa.DateTime(), nullable=False),
+    sa.Column('last_success_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('consecutive_failures', sa.Integer(), nullable=False),
+    sa.Column('details', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('stopped_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('worker')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('worker_heartbeats')
@@ -0,0 +1,45 @@
+"""add sms_outbox
+
+Revision ID: e81f4c6a0b57
+Revises: 5b2d71e0c4a8
+Create Date: 2026-10-16 16:22:19.045813
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81f4c6a0b57'
+down_revision: Union[str, None] = '5b2d71e0c4a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sms_outbox',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('driver_id', sa.UUID(), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'sending', 'sent', 'failed', name='smsoutboxstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('message_id', sa.String(length=255), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['driver_id'], ['drivers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sms_outbox_status_next_attempt', 'sms_outbox', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sms_outbox_status_next_attempt', table_name='sms_outbox')
+    op.drop_table('sms_outbox')
+    sa.Enum(name='smsoutboxstatus').drop(op.get_bind(), checkfirst=True)
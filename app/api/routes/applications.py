@@ -4,11 +4,12 @@ from typing import Optional
 from uuid import UUID
 
 from app.api.deps import get_db, get_current_user
-from app.models import Application, ApplicationComment, Driver, Staff, Ledger
+from app.models import Application, ApplicationComment, Driver, Staff, LedgerType
 from app.schemas import (
     ApplicationCreate, ApplicationResponse, ApplicationStatusUpdate,
     CommentCreate, CommentResponse
 )
+from app.services.billing import post_ledger_entry
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
@@ -110,13 +111,13 @@ def update_status(
         
         # Create initial ledger entry if needed
         if form_data.get("initial_balance"):
-            ledger_entry = Ledger(
+            post_ledger_entry(
+                db,
                 driver_id=driver.id,
-                type="credit",
+                entry_type=LedgerType.credit,
                 amount=form_data.get("initial_balance"),
                 description="Initial balance on approval"
             )
-            db.add(ledger_entry)
     
     # Add comment with status change message
     if request.message:
@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional
 from uuid import UUID
 
 from app.api.deps import get_db, get_current_user
-from app.models import Driver, Ledger, Alias, Staff
+from app.models import Driver, DriverBalance, Ledger, Alias, Staff
 from app.schemas import (
     DriverCreate, DriverUpdate, DriverResponse,
     AliasCreate, AliasResponse, LedgerResponse
 )
+from app.services.billing import get_balance
 
 router = APIRouter(prefix="/drivers", tags=["drivers"])
 
@@ -30,7 +30,11 @@ def list_drivers(
     
     drivers = query.offset(skip).limit(limit).all()
     
-    # Calculate balance for each driver
+    # Read balances for the whole page in one query
+    balances = dict(db.query(DriverBalance.driver_id, DriverBalance.balance).filter(
+        DriverBalance.driver_id.in_([driver.id for driver in drivers])
+    ).all())
+    
     result = []
     for driver in drivers:
         driver_dict = {
@@ -44,7 +48,7 @@ def list_drivers(
             "billing_active": driver.billing_active,
             "created_at": driver.created_at,
             "updated_at": driver.updated_at,
-            "balance": _calculate_balance(db, driver.id)
+            "balance": float(balances.get(driver.id, 0))
         }
         result.append(driver_dict)
     
@@ -245,17 +249,5 @@ def get_ledger(
 
 
 def _calculate_balance(db: Session, driver_id: UUID) -> float:
-    """Calculate driver balance (credits - debits)."""
-    from sqlalchemy import case
-    
-    result = db.query(
-        func.sum(
-            case(
-                (Ledger.type == "credit", Ledger.amount),
-                else_=-Ledger.amount
-            )
-        )
-    ).filter(Ledger.driver_id == driver_id).scalar()
-    
-    return float(result) if result else 0.0
-
+    """Get driver balance (credits - debits) from the balance read model."""
+    return float(get_balance(db, driver_id))
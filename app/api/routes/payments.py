@@ -14,8 +14,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.api.deps import get_db, get_current_user
-from app.models import Staff, PaymentRaw, Driver, Alias, Ledger, AliasType
+from app.models import Staff, PaymentRaw, Driver, Alias, LedgerType, AliasType
 from app.schemas import PaymentResponse, PaymentAssign
+from app.services.billing import post_ledger_entry
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
@@ -100,13 +101,8 @@ def payment_stats(
     matched_count = matched_query.count()
     unmatched_count = unmatched_query.count()
     
-    total_amount = db.query(func.sum(PaymentRaw.amount)).filter(
-        PaymentRaw.id.in_(query.with_entities(PaymentRaw.id))
-    ).scalar() or 0
-    
-    matched_amount = db.query(func.sum(PaymentRaw.amount)).filter(
-        PaymentRaw.id.in_(matched_query.with_entities(PaymentRaw.id))
-    ).scalar() or 0
+    total_amount = query.with_entities(func.sum(PaymentRaw.amount)).scalar() or 0
+    matched_amount = matched_query.with_entities(func.sum(PaymentRaw.amount)).scalar() or 0
     
     return {
         "total_payments": total_count,
@@ -158,16 +154,15 @@ def assign_payment(
     payment.driver_id = driver.id
     payment.matched = True
     
-    # Create ledger entry
-    ledger_entry = Ledger(
+    # Create ledger entry (and update the driver's balance)
+    post_ledger_entry(
+        db,
         driver_id=driver.id,
-        type='credit',
+        entry_type=LedgerType.credit,
         amount=payment.amount,
         description=f"{payment.source.value.upper()} payment from {payment.sender_name}",
         reference_id=payment.id,
-        created_at=datetime.utcnow()
     )
-    db.add(ledger_entry)
     
     # Create alias for future matching
     if data.create_alias and payment.sender_name:
@@ -1,14 +1,17 @@
 """
-SMS Routes - Send SMS via OpenPhone API
+SMS Routes - Queue SMS for sending via OpenPhone API
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_current_user
-from app.models.models import Staff, SmsLog, Driver
-from app.services.openphone import openphone
+from app.models.models import Staff, Driver, SmsOutbox
+from app.services.sms_outbox import enqueue_sms
 
 router = APIRouter(prefix="/sms", tags=["sms"])
 
@@ -18,49 +21,64 @@ class SendSmsRequest(BaseModel):
     message: str
 
 
-class SendSmsResponse(BaseModel):
-    success: bool
+class QueuedSmsResponse(BaseModel):
+    """Accepted, not sent yet: poll GET /sms/{outbox_id} for the outcome."""
+    status: str = "queued"
+    outbox_id: str
+
+
+class SmsStatusResponse(BaseModel):
+    outbox_id: str
+    status: str  # pending, sending, sent or failed
+    attempts: int
     message_id: str | None = None
     error: str | None = None
+    sent_at: datetime | None = None
 
 
-@router.post("/send", response_model=SendSmsResponse)
-async def send_sms(
+@router.post("/send", response_model=QueuedSmsResponse, status_code=status.HTTP_202_ACCEPTED)
+def send_sms(
     request: SendSmsRequest,
     db: Session = Depends(get_db),
     current_user: Staff = Depends(get_current_user),
 ):
-    """Send an SMS message via OpenPhone."""
+    """
+    Queue an SMS message for sending via OpenPhone.
     
-    # Send SMS first
-    result = await openphone.send_sms(request.phone, request.message)
-    
-    # Try to find driver to log
+    Returns 202 as soon as the message is in the outbox; an SMS worker sends
+    it and logs the result to sms_log (when the phone belongs to a driver).
+    Whether it was delivered is only known later, from GET /sms/{outbox_id}.
+    """
+    # Link to driver if the phone belongs to one
     driver = db.query(Driver).filter(Driver.phone == request.phone).first()
     
-    if driver:
-        # Log the SMS if driver exists
-        sms_log = SmsLog(
-            driver_id=driver.id,
-            phone=request.phone,
-            message=request.message,
-            status="sent" if result.success else "failed",
-            openphone_response={
-                "message_id": result.message_id,
-                "error": result.error,
-            }
-        )
-        db.add(sms_log)
-        db.commit()
-    else:
-        # If no driver found, we can't log to database due to foreign key constraint
-        # Just print for now or skip
-        print(f"Warning: Sent SMS to {request.phone} but no driver found to log.")
+    outbox = enqueue_sms(
+        db,
+        phone=request.phone,
+        message=request.message,
+        driver_id=driver.id if driver else None,
+    )
+    db.commit()
     
-    if not result.success:
-        raise HTTPException(status_code=500, detail=result.error or "Failed to send SMS")
+    return QueuedSmsResponse(outbox_id=str(outbox.id))
+
+
+@router.get("/{outbox_id}", response_model=SmsStatusResponse)
+def get_sms_status(
+    outbox_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: Staff = Depends(get_current_user),
+):
+    """Delivery status of a queued SMS."""
+    outbox = db.get(SmsOutbox, outbox_id)
+    if not outbox:
+        raise HTTPException(status_code=404, detail="SMS not found")
     
-    return SendSmsResponse(
-        success=True,
-        message_id=result.message_id,
+    return SmsStatusResponse(
+        outbox_id=str(outbox.id),
+        status=outbox.status.value,
+        attempts=outbox.attempts,
+        message_id=outbox.message_id,
+        error=outbox.last_error,
+        sent_at=outbox.sent_at,
     )
@@ -4,10 +4,13 @@ System status endpoint for checking service health.
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from datetime import timedelta
 import os
 
 from app.api.deps import get_db, get_current_user
+from app.core.config import get_settings
 from app.models import Staff
+from app.services.heartbeat import PAYMENT_WORKER, worker_health
 
 router = APIRouter(prefix="/status", tags=["status"])
 
@@ -22,6 +25,7 @@ def get_system_status(
         "database": check_database(db),
         "openphone": check_openphone(),
         "gmail": check_gmail(),
+        "payment_worker": check_payment_worker(db),
     }
     return status
 
@@ -65,3 +69,13 @@ def check_gmail() -> dict:
         return {"status": "warning", "message": "Needs authorization"}
     else:
         return {"status": "error", "message": "Credentials not found"}
+
+
+def check_payment_worker(db: Session) -> dict:
+    """Check the payment ingestion worker's heartbeat (scripts/payment_worker.py)."""
+    try:
+        stale_after = timedelta(seconds=get_settings().payment_worker_stale_seconds)
+        return worker_health(db, PAYMENT_WORKER, stale_after)
+    except Exception as e:
+        db.rollback()
+        return {"status": "error", "message": str(e)}
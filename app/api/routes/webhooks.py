@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, Request
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.core.config import get_settings
 from app.models import Application
+from app.services.gmail_push import decode_notification, push_ingestor
 
 router = APIRouter(prefix="/webhook", tags=["webhooks"])
 
@@ -37,3 +41,28 @@ async def fluent_forms_webhook(
         "status": "received",
         "application_id": str(application.id)
     }
+
+
+@router.post("/gmail-push")
+async def gmail_push_webhook(request: Request, token: str = ""):
+    """
+    Receive a Gmail watch notification (Cloud Pub/Sub push).
+    Schedules a debounced fetch of the new payment emails and returns
+    right away; Pub/Sub retries anything but a 2xx.
+    """
+    expected = get_settings().gmail_push_token
+    if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid token")
+    
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    notification = decode_notification(body)
+    if not notification:
+        # Acknowledge anyway: a malformed message would be redelivered forever
+        return {"status": "ignored"}
+    
+    mailbox, history_id = notification
+    scheduled = push_ingestor.notify(mailbox, history_id)
+    return {"status": "scheduled" if scheduled else "debounced"}
@@ -15,10 +15,35 @@ class Settings(BaseSettings):
     gmail_client_id: str = ""
     gmail_client_secret: str = ""
     gmail_refresh_token: str = ""
+    gmail_resync_hours: int = 48  # Window for a full resync when the history cursor expires
+    gmail_resync_max_messages: int = 500
+    gmail_push_topic: str = ""  # projects/<project>/topics/<topic> for users.watch
+    gmail_push_token: str = ""  # Shared secret in the Pub/Sub push URL (?token=...)
+    gmail_push_debounce_seconds: float = 5.0  # Notifications within this window share one fetch
+    email_archive_dir: str = ""  # Absolute path where raw emails are kept for --replay; empty = off
+    email_archive_compression: str = "gzip"  # or "zstd" (pip install zstandard)
+    
+    # Payment ingestion worker (scripts/payment_worker.py)
+    payment_poll_seconds: float = 60.0
+    payment_poll_jitter_seconds: float = 10.0  # Random extra wait, so restarts don't poll in lockstep
+    payment_poll_max_backoff_seconds: float = 900.0  # Cap on the wait after repeated failures
+    payment_worker_stale_seconds: float = 300.0  # /api/status warns when the heartbeat is older
     
     # OpenPhone
     openphone_api_key: str = ""
     openphone_phone_number: str = "+13123002032"
+    openphone_timeout_seconds: float = 30.0
+    openphone_max_connections: int = 20
+    openphone_max_keepalive_connections: int = 10
+    openphone_http2: bool = False  # Requires httpx[http2]
+    sms_concurrency: int = 8  # Max OpenPhone requests in flight
+    sms_rate_per_second: float = 5.0  # Token-bucket limit on sends
+    sms_time_budget_seconds: float = 300.0  # Per drain() run (e.g. the late notices); per batch in sms_worker
+    sms_outbox_batch_size: int = 100
+    sms_outbox_poll_seconds: float = 5.0
+    sms_outbox_lease_seconds: float = 600.0  # Must exceed the time budget
+    sms_max_attempts: int = 5
+    sms_retry_base_seconds: float = 60.0  # Doubles per attempt
     
     # Stripe
     stripe_api_key: str = ""
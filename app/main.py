@@ -1,12 +1,27 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import auth, drivers, applications, payments, webhooks, status, sms
+from app.services.gmail_push import push_ingestor
+from app.services.openphone import openphone
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    push_ingestor.cancel()
+    # Close pooled HTTP connections on shutdown
+    await openphone.aclose()
+    openphone.close()
+
 
 app = FastAPI(
     title="Gonzo Core",
     description="Backend system for GonzoFleet",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS for admin panel
@@ -5,8 +5,14 @@ from .models import (
     Alias,
     PaymentRaw,
     Ledger,
+    DriverBalance,
+    LedgerCheckpoint,
     Staff,
     SmsLog,
+    SmsOutbox,
+    GmailSyncState,
+    ProcessedMessage,
+    WorkerHeartbeat,
     # Enums
     BillingType,
     ApplicationStatus,
@@ -14,6 +20,8 @@ from .models import (
     PaymentSource,
     LedgerType,
     StaffRole,
+    SmsOutboxStatus,
+    ProcessedOutcome,
 )
 
 __all__ = [
@@ -23,12 +31,20 @@ __all__ = [
     "Alias",
     "PaymentRaw",
     "Ledger",
+    "DriverBalance",
+    "LedgerCheckpoint",
     "Staff",
     "SmsLog",
+    "SmsOutbox",
+    "GmailSyncState",
+    "ProcessedMessage",
+    "WorkerHeartbeat",
     "BillingType",
     "ApplicationStatus",
     "AliasType",
     "PaymentSource",
     "LedgerType",
     "StaffRole",
+    "SmsOutboxStatus",
+    "ProcessedOutcome",
 ]
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from sqlalchemy import (
     Column, String, Boolean, Numeric, Text, DateTime, 
-    ForeignKey, Enum, LargeBinary
+    ForeignKey, Enum, LargeBinary, Integer, Index, UniqueConstraint
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
@@ -51,6 +51,20 @@ class StaffRole(str, enum.Enum):
     staff = "staff"
 
 
+class SmsOutboxStatus(str, enum.Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
+
+class ProcessedOutcome(str, enum.Enum):
+    stored = "stored"        # new payment saved
+    duplicate = "duplicate"  # parsed, payment already known
+    unparsed = "unparsed"    # no parser matched or it found no payment
+    missing = "missing"      # Gmail no longer has it (deleted after it was listed)
+
+
 # Models
 class Driver(Base):
     __tablename__ = "drivers"
@@ -73,6 +87,7 @@ class Driver(Base):
     aliases = relationship("Alias", back_populates="driver", cascade="all, delete-orphan")
     payments = relationship("PaymentRaw", back_populates="driver")
     ledger_entries = relationship("Ledger", back_populates="driver")
+    balance_entry = relationship("DriverBalance", back_populates="driver", uselist=False)
     sms_logs = relationship("SmsLog", back_populates="driver")
 
 
@@ -90,6 +105,12 @@ class Application(Base):
     driver = relationship("Driver", back_populates="applications")
     comments = relationship("ApplicationComment", back_populates="application", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_applications_created_at", "created_at"),
+        Index("ix_applications_status_created_at", "status", "created_at"),
+        Index("ix_applications_driver_created_at", "driver_id", "created_at"),
+    )
+
 
 class ApplicationComment(Base):
     __tablename__ = "application_comments"
@@ -118,7 +139,8 @@ class Alias(Base):
     driver = relationship("Driver", back_populates="aliases")
 
     __table_args__ = (
-        # Unique constraint on type + value
+        # Unique on type + value; value first so lookups by value alone use it too
+        Index("uq_aliases_value_type", "alias_value", "alias_type", unique=True),
         {"sqlite_autoincrement": True},
     )
 
@@ -137,11 +159,20 @@ class PaymentRaw(Base):
     received_at = Column(DateTime, nullable=True)
     matched = Column(Boolean, default=False)
     driver_id = Column(UUID(as_uuid=True), ForeignKey("drivers.id"), nullable=True)
+    parser_version = Column(Integer, nullable=True)  # gmail_parser.PARSER_VERSION that parsed it; NULL before versioning
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     driver = relationship("Driver", back_populates="payments")
 
+    __table_args__ = (
+        # Dedupe keys used by the email parser: one row per transaction, one per email
+        Index("uq_payments_raw_source_transaction", "source", "transaction_id", unique=True),
+        Index("uq_payments_raw_gmail_id", "gmail_id", unique=True),
+        Index("ix_payments_raw_matched_received_at", "matched", "received_at"),
+        Index("ix_payments_raw_received_at", "received_at"),
+    )
+
 
 class Ledger(Base):
     __tablename__ = "ledger"
@@ -152,11 +183,56 @@ class Ledger(Base):
     amount = Column(Numeric(10, 2), nullable=False)
     description = Column(String(255), nullable=True)
     reference_id = Column(UUID(as_uuid=True), nullable=True)
+    billing_period = Column(String(32), nullable=True)  # e.g. daily:2026-01-05, set on billing debits
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     driver = relationship("Driver", back_populates="ledger_entries")
 
+    __table_args__ = (
+        # Idempotency key: at most one billing debit per driver per period
+        UniqueConstraint("driver_id", "billing_period", name="uq_ledger_driver_billing_period"),
+        Index("ix_ledger_driver_type_created_at", "driver_id", "type", "created_at"),
+        Index("ix_ledger_driver_created_at", "driver_id", "created_at", "id"),
+    )
+
+
+class DriverBalance(Base):
+    """Read model of each driver's ledger balance (credits - debits).
+
+    Maintained in the same transaction as every ledger write, see
+    app.services.billing.post_ledger_entry.
+    """
+    __tablename__ = "driver_balances"
+
+    driver_id = Column(UUID(as_uuid=True), ForeignKey("drivers.id"), primary_key=True)
+    balance = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    driver = relationship("Driver", back_populates="balance_entry")
+
+
+class LedgerCheckpoint(Base):
+    """Snapshot of a driver's balance as of a ledger position.
+
+    The position is the (created_at, id) of the last ledger entry covered,
+    so balance = checkpoint balance + SUM of entries after that position.
+    """
+    __tablename__ = "ledger_checkpoints"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    driver_id = Column(UUID(as_uuid=True), ForeignKey("drivers.id"), nullable=False)
+    balance = Column(Numeric(12, 2), nullable=False)
+    entry_count = Column(Integer, nullable=False)
+    last_entry_at = Column(DateTime, nullable=False)
+    last_entry_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ledger_checkpoints_driver_position", "driver_id", "last_entry_at", "last_entry_id"),
+    )
+
 
 class Staff(Base):
     __tablename__ = "staff"
@@ -185,3 +261,77 @@ class SmsLog(Base):
 
     # Relationships
     driver = relationship("Driver", back_populates="sms_logs")
+
+    __table_args__ = (
+        Index("ix_sms_log_driver_created_at", "driver_id", "created_at"),
+    )
+
+
+class SmsOutbox(Base):
+    """SMS waiting to be sent. Written in the same transaction as whatever
+    triggered it and drained by app.services.sms_outbox workers."""
+    __tablename__ = "sms_outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    driver_id = Column(UUID(as_uuid=True), ForeignKey("drivers.id"), nullable=True)
+    phone = Column(String(20), nullable=False)
+    message = Column(Text, nullable=False)
+    status = Column(Enum(SmsOutboxStatus), nullable=False, default=SmsOutboxStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    message_id = Column(String(255), nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    driver = relationship("Driver")
+
+    __table_args__ = (
+        Index("ix_sms_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_sms_outbox_driver_created_at", "driver_id", "created_at"),
+    )
+
+
+class GmailSyncState(Base):
+    """Incremental sync cursor per mailbox: the Gmail historyId up to which
+    payment emails have been fetched and stored."""
+    __tablename__ = "gmail_sync_state"
+
+    mailbox = Column(String(255), primary_key=True)  # Gmail address
+    history_id = Column(String(32), nullable=False)  # uint64, kept as Gmail returns it
+    last_full_sync_at = Column(DateTime, nullable=True)
+    watch_expires_at = Column(DateTime, nullable=True)  # users.watch push notifications (renewed daily)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ProcessedMessage(Base):
+    """Every Gmail message the parser has handled, so it is not downloaded
+    again. Unparsed ones are retried once the parser version moves past
+    the one recorded here."""
+    __tablename__ = "processed_messages"
+
+    gmail_id = Column(String(255), primary_key=True)
+    outcome = Column(Enum(ProcessedOutcome), nullable=False)
+    parser_version = Column(Integer, nullable=False)
+    payment_id = Column(UUID(as_uuid=True), ForeignKey("payments_raw.id"), nullable=True)
+    processed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WorkerHeartbeat(Base):
+    """Liveness of a long-running worker: written after every poll, read by
+    /api/status to tell a healthy worker from a stuck or dead one."""
+    __tablename__ = "worker_heartbeats"
+
+    worker = Column(String(64), primary_key=True)  # e.g. payment-ingest
+    host = Column(String(255), nullable=True)
+    pid = Column(Integer, nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    beat_at = Column(DateTime, nullable=False)
+    last_success_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    details = Column(JSONB, nullable=True)  # counts from the last poll
+    stopped_at = Column(DateTime, nullable=True)  # set on graceful shutdown
@@ -0,0 +1,122 @@
+"""
+Alias Index
+
+In-memory lookup of payment sender -> driver for the payment parser:
+- Loads every alias (with its driver's name) in one query
+- Keys are normalized (casefolded, whitespace collapsed), so "JOHN  SMITH"
+  matches an alias saved as "John Smith"
+- Prefers aliases of the payment's own source type (a Zelle payment matches
+  a zelle alias before a venmo alias with the same value)
+- refresh() reloads only when aliases changed (max created_at / row count),
+  so a long-running worker can keep one index across polls
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Alias, AliasType, Driver
+
+
+@dataclass(frozen=True)
+class DriverMatch:
+    """The matched driver; enough to post a ledger entry and log who it was."""
+    id: UUID
+    first_name: str
+    last_name: str
+
+
+@dataclass(frozen=True)
+class _Entry:
+    alias_type: AliasType
+    alias_value: str
+    created_at: datetime
+    driver: DriverMatch
+
+
+def normalize_alias(value: Optional[str]) -> str:
+    """Casefold and collapse whitespace: '  JOHN   Smith ' -> 'john smith'."""
+    return " ".join((value or "").split()).casefold()
+
+
+class AliasIndex:
+    """Normalized alias -> driver map, loaded once and reused until aliases change."""
+
+    def __init__(self):
+        self._entries: dict[str, list[_Entry]] = {}
+        self._version: Optional[tuple] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._version is not None
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _current_version(self, db: Session) -> tuple:
+        """Cheap change marker: newest alias and alias count (catches deletes too)."""
+        newest, count = db.query(func.max(Alias.created_at), func.count(Alias.id)).one()
+        return (newest, count)
+
+    def refresh(self, db: Session) -> bool:
+        """Reload if aliases were added or removed since the last load. Returns True if reloaded."""
+        version = self._current_version(db)
+        if version == self._version:
+            return False
+
+        entries: dict[str, list[_Entry]] = {}
+        rows = db.query(
+            Alias.alias_type, Alias.alias_value, Alias.created_at,
+            Driver.id, Driver.first_name, Driver.last_name
+        ).join(Driver, Driver.id == Alias.driver_id).all()
+
+        drivers: dict[UUID, DriverMatch] = {}
+        for alias_type, alias_value, created_at, driver_id, first_name, last_name in rows:
+            driver = drivers.setdefault(driver_id, DriverMatch(driver_id, first_name, last_name))
+            entries.setdefault(normalize_alias(alias_value), []).append(
+                _Entry(alias_type, alias_value, created_at or datetime.min, driver)
+            )
+
+        self._entries = entries
+        self._version = version
+        return True
+
+    def ensure_loaded(self, db: Session):
+        """Load on first use; later calls don't touch the database."""
+        if not self.loaded:
+            self.refresh(db)
+
+    def lookup(self, value: Optional[str], source: Optional[str] = None) -> Optional[DriverMatch]:
+        """
+        Driver for one alias value, or None.
+
+        Several candidates can share a normalized key; prefer one of the
+        payment's source type, then an exact (un-normalized) match, then the
+        oldest alias.
+        """
+        if not value:
+            return None
+
+        candidates = self._entries.get(normalize_alias(value))
+        if not candidates:
+            return None
+
+        def rank(entry: _Entry):
+            return (entry.alias_type.value != source, entry.alias_value != value, entry.created_at)
+
+        return min(candidates, key=rank).driver
+
+    def match(self, sender_name: Optional[str], sender_identifier: Optional[str],
+              source: Optional[str] = None) -> Optional[DriverMatch]:
+        """Match by sender name first, then by identifier (email/phone/username)."""
+        return self.lookup(sender_name, source) or (
+            self.lookup(sender_identifier, source) if sender_identifier else None
+        )
+
+
+# Shared index for the parser process
+alias_index = AliasIndex()
@@ -1 +1,541 @@
-# Billing and ledger engine
+"""
+Billing Service
+
+Keeps driver balances in step with the ledger:
+- post_ledger_entry() writes a ledger row and adjusts driver_balances in the same transaction
+- post_ledger_entries() does the same for many rows in two statements
+- get_balance() reads one driver's balance without scanning the ledger
+- get_balance_summaries() returns balance and last debit/credit times for many drivers in one query
+- rebuild_balances() recomputes driver_balances from the ledger in bulk
+
+Billing debits are generated set-based and idempotently:
+- create_period_debits() charges every due driver of a billing type in one statement
+- find_late_drivers() finds delinquent drivers and when their balance went negative
+
+Ledger checkpoints store a driver's balance as of a ledger position, so
+bulk recomputation only has to read the entries after the latest one:
+- create_checkpoints() advances checkpoints for drivers with enough new entries
+- verify_checkpoints() proves checkpoint + tail equals the full ledger SUM
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional, Union
+from uuid import UUID, uuid4
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import Driver, Ledger, LedgerType, DriverBalance, BillingType
+
+# Signed ledger amount for raw SQL over "ledger l"
+_SIGNED_AMOUNT = "CASE WHEN l.type = 'credit' THEN l.amount ELSE -l.amount END"
+
+
+@dataclass
+class BalanceSummary:
+    """A driver's balance plus when they were last charged and last paid."""
+    driver_id: UUID
+    balance: Decimal
+    last_debit_at: Optional[datetime]
+    last_credit_at: Optional[datetime]
+
+
+def _signed_amount(entry_type: LedgerType, amount: Decimal) -> Decimal:
+    """Credits raise the balance, debits lower it."""
+    return amount if entry_type == LedgerType.credit else -amount
+
+
+def apply_balance_delta(db: Session, driver_id: UUID, delta: Decimal) -> None:
+    """Add delta to a driver's balance row, creating it if missing."""
+    stmt = insert(DriverBalance).values(
+        driver_id=driver_id,
+        balance=delta,
+        updated_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DriverBalance.driver_id],
+        set_={
+            "balance": DriverBalance.balance + stmt.excluded.balance,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+
+def post_ledger_entry(
+    db: Session,
+    driver_id: UUID,
+    entry_type: Union[LedgerType, str],
+    amount,
+    description: Optional[str] = None,
+    reference_id: Optional[UUID] = None,
+    created_at: Optional[datetime] = None,
+) -> Ledger:
+    """
+    Add a ledger entry and update the driver's balance.
+
+    This is the only way ledger rows should be written: both changes join the
+    caller's transaction, so they commit or roll back together. The entry is
+    flushed before the balance upsert, so the ledger is written before the
+    balance row is locked, the same order as rebuild_balances().
+    """
+    entry_type = LedgerType(entry_type)
+    amount = Decimal(str(amount))
+
+    entry = Ledger(
+        id=uuid4(),
+        driver_id=driver_id,
+        type=entry_type,
+        amount=amount,
+        description=description,
+        reference_id=reference_id,
+        created_at=created_at or datetime.utcnow(),
+    )
+    db.add(entry)
+    db.flush()
+    apply_balance_delta(db, driver_id, _signed_amount(entry_type, amount))
+
+    return entry
+
+
+def post_ledger_entries(db: Session, entries: list[dict]) -> int:
+    """
+    Bulk post_ledger_entry(): one multi-row ledger INSERT and one balance
+    upsert, whatever the number of entries.
+
+    entries are dicts of driver_id, type, amount and optionally description,
+    reference_id, created_at. Deltas are summed per driver first, since one
+    upsert can't update the same balance row twice. Returns the entry count.
+    """
+    if not entries:
+        return 0
+
+    now = datetime.utcnow()
+    rows = []
+    deltas: dict[UUID, Decimal] = {}
+    for entry in entries:
+        entry_type = LedgerType(entry['type'])
+        amount = Decimal(str(entry['amount']))
+        rows.append({
+            'id': uuid4(),
+            'driver_id': entry['driver_id'],
+            'type': entry_type,
+            'amount': amount,
+            'description': entry.get('description'),
+            'reference_id': entry.get('reference_id'),
+            'created_at': entry.get('created_at') or now,
+        })
+        deltas[entry['driver_id']] = deltas.get(entry['driver_id'], Decimal('0')) + _signed_amount(entry_type, amount)
+
+    db.execute(insert(Ledger).values(rows))
+
+    stmt = insert(DriverBalance).values([
+        {'driver_id': driver_id, 'balance': delta, 'updated_at': now}
+        for driver_id, delta in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DriverBalance.driver_id],
+        set_={
+            "balance": DriverBalance.balance + stmt.excluded.balance,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+    return len(rows)
+
+
+def get_balance(db: Session, driver_id: UUID) -> Decimal:
+    """Get a driver's current balance (credits - debits)."""
+    balance = db.query(DriverBalance.balance).filter(
+        DriverBalance.driver_id == driver_id
+    ).scalar()
+
+    return balance if balance is not None else Decimal('0')
+
+
+def _last_entry_at(entry_type: LedgerType):
+    """Correlated MAX(created_at) of one entry type for the outer driver row."""
+    return select(func.max(Ledger.created_at)).where(
+        Ledger.driver_id == Driver.id,
+        Ledger.type == entry_type
+    ).scalar_subquery()
+
+
+def get_balance_summaries(
+    db: Session,
+    driver_ids: Optional[Iterable[UUID]] = None,
+    billing_active: Optional[bool] = None,
+) -> dict[UUID, BalanceSummary]:
+    """
+    Get balance summaries for a set of drivers in a single query.
+
+    Args:
+        driver_ids: Only these drivers (all drivers if None)
+        billing_active: Only drivers with this billing flag (any if None)
+
+    Returns:
+        Dict of driver_id -> BalanceSummary. Drivers without ledger
+        entries have a zero balance and no timestamps.
+    """
+    query = db.query(
+        Driver.id,
+        func.coalesce(DriverBalance.balance, 0).label("balance"),
+        _last_entry_at(LedgerType.debit).label("last_debit_at"),
+        _last_entry_at(LedgerType.credit).label("last_credit_at"),
+    ).outerjoin(DriverBalance, DriverBalance.driver_id == Driver.id)
+
+    if driver_ids is not None:
+        driver_ids = list(driver_ids)
+        if not driver_ids:
+            return {}
+        query = query.filter(Driver.id.in_(driver_ids))
+
+    if billing_active is not None:
+        query = query.filter(Driver.billing_active == billing_active)
+
+    return {
+        row.id: BalanceSummary(
+            driver_id=row.id,
+            balance=Decimal(row.balance),
+            last_debit_at=row.last_debit_at,
+            last_credit_at=row.last_credit_at,
+        )
+        for row in query.all()
+    }
+
+
+@dataclass
+class DebitRunResult:
+    """Outcome of one create_period_debits() run."""
+    billing_type: BillingType
+    billing_period: str
+    due: int
+    inserted: int
+
+    @property
+    def skipped(self) -> int:
+        """Due drivers already charged for this period (e.g. a re-run)."""
+        return self.due - self.inserted
+
+
+def billing_period_key(billing_type: BillingType, when: datetime) -> str:
+    """Idempotency key for a billing period: daily:YYYY-MM-DD or weekly:YYYY-Www."""
+    if billing_type == BillingType.weekly:
+        year, week, _ = when.isocalendar()
+        return f"weekly:{year}-W{week:02d}"
+    return f"daily:{when.date().isoformat()}"
+
+
+def create_period_debits(db: Session, billing_type: BillingType, now: Optional[datetime] = None) -> DebitRunResult:
+    """
+    Charge every due, billing-active driver of one billing type in a single statement.
+
+    Each debit carries a (driver_id, billing_period) key backed by a unique
+    constraint, so running the job twice for the same period inserts nothing
+    the second time. Weekly drivers are also only due when their last debit
+    is at least 7 days old, keeping each driver's own weekly cadence.
+    Balances are updated in the same statement.
+    """
+    billing_type = BillingType(billing_type)
+    now = now or datetime.utcnow()
+    period = billing_period_key(billing_type, now)
+
+    weekly_cadence = ""
+    if billing_type == BillingType.weekly:
+        weekly_cadence = """
+            AND NOT EXISTS (
+                SELECT 1 FROM ledger p
+                WHERE p.driver_id = d.id
+                  AND p.type = 'debit'
+                  AND p.created_at > :now - interval '7 days'
+            )
+        """
+
+    row = db.execute(text(f"""
+        WITH due AS (
+            SELECT d.id AS driver_id, d.billing_rate
+            FROM drivers d
+            WHERE d.billing_active AND d.billing_type = :billing_type
+            {weekly_cadence}
+        ),
+        inserted AS (
+            INSERT INTO ledger (id, driver_id, type, amount, description, billing_period, created_at)
+            SELECT gen_random_uuid(), due.driver_id, 'debit', due.billing_rate,
+                   :description, :billing_period, :now
+            FROM due
+            ON CONFLICT (driver_id, billing_period) DO NOTHING
+            RETURNING driver_id, amount
+        ),
+        balances AS (
+            INSERT INTO driver_balances (driver_id, balance, updated_at)
+            SELECT driver_id, -amount, :now FROM inserted
+            ON CONFLICT (driver_id) DO UPDATE
+            SET balance = driver_balances.balance + EXCLUDED.balance,
+                updated_at = EXCLUDED.updated_at
+        )
+        SELECT (SELECT COUNT(*) FROM due) AS due,
+               (SELECT COUNT(*) FROM inserted) AS inserted
+    """), {
+        "billing_type": billing_type.value,
+        "billing_period": period,
+        "description": f"{billing_type.value.capitalize()} rental charge",
+        "now": now,
+    }).one()
+
+    return DebitRunResult(
+        billing_type=billing_type,
+        billing_period=period,
+        due=row.due,
+        inserted=row.inserted,
+    )
+
+
+# Grace period before a negative balance counts as late, per billing type
+LATE_AFTER = {
+    BillingType.daily: timedelta(days=2),
+    BillingType.weekly: timedelta(hours=48),
+}
+
+
+@dataclass
+class LateDriver:
+    """A billing-active driver whose balance has been negative past the grace period."""
+    driver_id: UUID
+    billing_type: BillingType
+    balance: Decimal
+    went_negative_at: datetime
+    days_late: int
+
+
+def find_late_drivers(db: Session, now: Optional[datetime] = None) -> list[LateDriver]:
+    """
+    Find every late driver in one pass over the ledger.
+
+    Only drivers whose current balance (from driver_balances) is negative are
+    scanned. For each, a running balance over their ledger finds the last entry
+    that took the balance from >= 0 to < 0; that is when the current stretch
+    of delinquency started, regardless of how often the driver is charged.
+    """
+    now = now or datetime.utcnow()
+
+    rows = db.execute(text(f"""
+        WITH delinquent AS (
+            SELECT d.id AS driver_id, d.billing_type, b.balance
+            FROM drivers d
+            JOIN driver_balances b ON b.driver_id = d.id
+            WHERE d.billing_active AND b.balance < 0
+        ),
+        running AS (
+            SELECT l.driver_id, l.created_at, l.id,
+                   SUM({_SIGNED_AMOUNT}) OVER (
+                       PARTITION BY l.driver_id ORDER BY l.created_at, l.id
+                   ) AS running_balance
+            FROM ledger l
+            JOIN delinquent dq ON dq.driver_id = l.driver_id
+        ),
+        steps AS (
+            SELECT driver_id, created_at, running_balance,
+                   LAG(running_balance, 1, 0) OVER (
+                       PARTITION BY driver_id ORDER BY created_at, id
+                   ) AS previous_balance
+            FROM running
+        )
+        SELECT dq.driver_id, dq.billing_type, dq.balance,
+               MAX(s.created_at) AS went_negative_at
+        FROM delinquent dq
+        JOIN steps s ON s.driver_id = dq.driver_id
+        WHERE s.running_balance < 0 AND s.previous_balance >= 0
+        GROUP BY dq.driver_id, dq.billing_type, dq.balance
+        HAVING MAX(s.created_at) <= CASE dq.billing_type
+            WHEN 'weekly' THEN CAST(:weekly_cutoff AS timestamp)
+            ELSE CAST(:daily_cutoff AS timestamp)
+        END
+    """), {
+        "daily_cutoff": now - LATE_AFTER[BillingType.daily],
+        "weekly_cutoff": now - LATE_AFTER[BillingType.weekly],
+    }).all()
+
+    return [
+        LateDriver(
+            driver_id=row.driver_id,
+            billing_type=BillingType(row.billing_type),
+            balance=row.balance,
+            went_negative_at=row.went_negative_at,
+            days_late=(now - row.went_negative_at).days,
+        )
+        for row in rows
+    ]
+
+
+# Latest checkpoint per driver
+_LATEST_CHECKPOINTS = """
+    latest AS (
+        SELECT DISTINCT ON (driver_id)
+               driver_id, balance, entry_count, last_entry_at, last_entry_id
+        FROM ledger_checkpoints
+        ORDER BY driver_id, last_entry_at DESC, last_entry_id DESC
+    )
+"""
+
+# Ledger entries after a driver's latest checkpoint (all entries if none)
+_AFTER_CHECKPOINT = """
+    (c.driver_id IS NULL OR (l.created_at, l.id) > (c.last_entry_at, c.last_entry_id))
+"""
+
+
+@dataclass
+class CheckpointMismatch:
+    """A driver whose checkpoint + tail disagrees with the full ledger."""
+    driver_id: UUID
+    checkpointed_balance: Decimal
+    full_balance: Decimal
+    checkpoint_entries: int
+    covered_entries: int
+
+
+def create_checkpoints(db: Session, min_entries: int = 30, settle: timedelta = timedelta(days=1)) -> int:
+    """
+    Write a new checkpoint for every driver with enough uncheckpointed entries.
+
+    Each checkpoint is derived from the previous one plus the tail, so the cost
+    is proportional to new entries rather than the whole ledger. Entries newer
+    than `settle` are left in the tail: a slow transaction can still commit an
+    entry with an earlier created_at, which a checkpoint would otherwise skip.
+
+    Returns the number of checkpoints written.
+    """
+    cutoff = datetime.utcnow() - settle
+
+    result = db.execute(text(f"""
+        WITH {_LATEST_CHECKPOINTS},
+        tail AS (
+            SELECT l.driver_id,
+                   SUM({_SIGNED_AMOUNT}) AS delta,
+                   COUNT(*) AS entries,
+                   MAX(l.created_at) AS last_entry_at,
+                   (array_agg(l.id ORDER BY l.created_at DESC, l.id DESC))[1] AS last_entry_id
+            FROM ledger l
+            LEFT JOIN latest c ON c.driver_id = l.driver_id
+            WHERE l.created_at < :cutoff AND {_AFTER_CHECKPOINT}
+            GROUP BY l.driver_id
+            HAVING COUNT(*) >= :min_entries
+        )
+        INSERT INTO ledger_checkpoints
+            (id, driver_id, balance, entry_count, last_entry_at, last_entry_id, created_at)
+        SELECT gen_random_uuid(),
+               t.driver_id,
+               COALESCE(c.balance, 0) + t.delta,
+               COALESCE(c.entry_count, 0) + t.entries,
+               t.last_entry_at,
+               t.last_entry_id,
+               now() AT TIME ZONE 'utc'
+        FROM tail t
+        LEFT JOIN latest c ON c.driver_id = t.driver_id
+    """), {"cutoff": cutoff, "min_entries": min_entries})
+
+    return result.rowcount
+
+
+def verify_checkpoints(db: Session) -> tuple[int, list[CheckpointMismatch]]:
+    """
+    Check that latest checkpoint + tail equals the full ledger SUM for every driver.
+
+    Also checks that the number of entries at or before each checkpoint position
+    still equals the count it was taken with, which catches entries written
+    behind a checkpoint.
+
+    Returns (drivers checked, mismatches).
+    """
+    rows = db.execute(text(f"""
+        WITH {_LATEST_CHECKPOINTS},
+        totals AS (
+            SELECT l.driver_id,
+                   SUM({_SIGNED_AMOUNT}) AS full_balance,
+                   SUM(CASE WHEN (l.created_at, l.id) <= (c.last_entry_at, c.last_entry_id)
+                            THEN 0 ELSE {_SIGNED_AMOUNT} END) AS tail_delta,
+                   COUNT(*) FILTER (
+                       WHERE (l.created_at, l.id) <= (c.last_entry_at, c.last_entry_id)
+                   ) AS covered_entries
+            FROM ledger l
+            JOIN latest c ON c.driver_id = l.driver_id
+            GROUP BY l.driver_id
+        )
+        SELECT c.driver_id,
+               c.balance + COALESCE(t.tail_delta, 0) AS checkpointed_balance,
+               COALESCE(t.full_balance, 0) AS full_balance,
+               c.entry_count AS checkpoint_entries,
+               COALESCE(t.covered_entries, 0) AS covered_entries
+        FROM latest c
+        LEFT JOIN totals t ON t.driver_id = c.driver_id
+    """)).all()
+
+    mismatches = [
+        CheckpointMismatch(
+            driver_id=row.driver_id,
+            checkpointed_balance=row.checkpointed_balance,
+            full_balance=row.full_balance,
+            checkpoint_entries=row.checkpoint_entries,
+            covered_entries=row.covered_entries,
+        )
+        for row in rows
+        if row.checkpointed_balance != row.full_balance
+        or row.checkpoint_entries != row.covered_entries
+    ]
+
+    return len(rows), mismatches
+
+
+def rebuild_balances(db: Session, use_checkpoints: bool = True) -> int:
+    """
+    Recompute every driver's balance from the ledger in one statement.
+
+    With use_checkpoints, each balance is the latest checkpoint plus the entries
+    after it; otherwise the whole ledger is summed.
+
+    Ledger writes are blocked until the caller commits, so no delta applied
+    by post_ledger_entry can be lost between the SUM and the overwrite.
+
+    Returns the number of balance rows written.
+    """
+    db.execute(text("LOCK TABLE ledger IN SHARE MODE"))
+
+    if use_checkpoints:
+        sql = f"""
+            WITH {_LATEST_CHECKPOINTS},
+            tail AS (
+                SELECT l.driver_id, SUM({_SIGNED_AMOUNT}) AS delta
+                FROM ledger l
+                LEFT JOIN latest c ON c.driver_id = l.driver_id
+                WHERE {_AFTER_CHECKPOINT}
+                GROUP BY l.driver_id
+            )
+            INSERT INTO driver_balances (driver_id, balance, updated_at)
+            SELECT d.id,
+                   COALESCE(c.balance, 0) + COALESCE(t.delta, 0),
+                   now() AT TIME ZONE 'utc'
+            FROM drivers d
+            LEFT JOIN latest c ON c.driver_id = d.id
+            LEFT JOIN tail t ON t.driver_id = d.id
+        """
+    else:
+        sql = f"""
+            INSERT INTO driver_balances (driver_id, balance, updated_at)
+            SELECT d.id,
+                   COALESCE(SUM({_SIGNED_AMOUNT}), 0),
+                   now() AT TIME ZONE 'utc'
+            FROM drivers d
+            LEFT JOIN ledger l ON l.driver_id = d.id
+            GROUP BY d.id
+        """
+
+    result = db.execute(text(sql + """
+        ON CONFLICT (driver_id) DO UPDATE
+        SET balance = EXCLUDED.balance,
+            updated_at = EXCLUDED.updated_at
+    """))
+
+    return result.rowcount
@@ -0,0 +1,143 @@
+"""
+Raw Email Archive
+
+Keeps the raw bytes of every payment email downloaded from Gmail, so a
+parser fix can be replayed over past mail without downloading it again and
+a failure can be reproduced offline:
+- Content-addressed: each message is stored once under its SHA-256,
+  compressed (gzip, or zstd with the optional zstandard package), in
+  sharded directories objects/ab/cd/<sha256>.eml.gz
+- index.tsv maps gmail_id -> sha256, one appended line per archived
+  message; objects are written to a temporary file and renamed, so
+  concurrent writers (worker, webhook, cron) never leave a partial file
+- iter_messages() streams (gmail_id, raw) back in archive order for
+  parse_payments.py --replay
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Iterator, Optional
+
+from app.core.config import get_settings
+
+INDEX_FILE = "index.tsv"
+EXTENSIONS = {"gzip": ".eml.gz", "zstd": ".eml.zst"}
+
+
+def _zstd():
+    """zstd needs the optional zstandard package (pip install zstandard)."""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+class EmailArchive:
+    """Compressed, content-addressed store of raw emails under one directory."""
+
+    def __init__(self, root: str, compression: str = "gzip"):
+        if compression == "zstd" and not _zstd():
+            print("Warning: EMAIL_ARCHIVE_COMPRESSION=zstd but zstandard is not installed, using gzip")
+            compression = "gzip"
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unknown archive compression: {compression}")
+        self.root = root
+        self.compression = compression
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _object_path(self, digest: str, compression: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:4], digest + EXTENSIONS[compression])
+
+    def _find(self, digest: str) -> Optional[str]:
+        """Path of a stored object, whichever compression it was written with."""
+        for compression in EXTENSIONS:
+            path = self._object_path(digest, compression)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.compression == "zstd":
+            return _zstd().ZstdCompressor(level=10).compress(raw)
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+
+    @staticmethod
+    def _decompress(path: str, data: bytes) -> bytes:
+        if path.endswith(EXTENSIONS["zstd"]):
+            zstandard = _zstd()
+            if not zstandard:
+                raise RuntimeError(f"{path} is zstd-compressed; pip install zstandard to read it")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def put(self, gmail_id: str, raw: bytes) -> str:
+        """Archive one message. Returns its SHA-256; identical content is stored once."""
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if not self._find(digest):
+            path = self._object_path(digest, self.compression)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self._compress(raw))
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+        # One short O_APPEND write per line, so lines from several processes don't interleave
+        line = f"{gmail_id}\t{digest}\t{len(raw)}\t{datetime.utcnow():%Y-%m-%dT%H:%M:%S}\n".encode()
+        with self._lock:
+            fd = os.open(self.index_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """Raw bytes of an archived message by SHA-256."""
+        path = self._find(digest)
+        if not path:
+            raise KeyError(digest)
+        with open(path, "rb") as f:
+            return self._decompress(path, f.read())
+
+    def iter_index(self) -> Iterator[tuple[str, str]]:
+        """(gmail_id, sha256) for every archived message, first archived first, each gmail_id once."""
+        if not os.path.exists(self.index_path):
+            return
+        seen = set()
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 2 or fields[0] in seen:
+                    continue
+                seen.add(fields[0])
+                yield fields[0], fields[1]
+
+    def iter_messages(self) -> Iterator[tuple[str, bytes]]:
+        """Stream (gmail_id, raw) for every archived message."""
+        for gmail_id, digest in self.iter_index():
+            yield gmail_id, self.get(digest)
+
+
+def default_archive() -> Optional[EmailArchive]:
+    """The archive configured by EMAIL_ARCHIVE_DIR, or None if archiving is off."""
+    settings = get_settings()
+    if not settings.email_archive_dir:
+        return None
+    if not os.path.isabs(settings.email_archive_dir):
+        print(f"Warning: EMAIL_ARCHIVE_DIR={settings.email_archive_dir} is relative to the working directory "
+              f"({os.getcwd()}); use an absolute path")
+    return EmailArchive(settings.email_archive_dir, settings.email_archive_compression)
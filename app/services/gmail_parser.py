@@ -11,13 +11,191 @@ Parses payment notification emails from:
 
 import re
 import email
+from functools import cached_property
+from html import unescape
 from email import policy
 from email.parser import BytesParser
+from email.utils import parseaddr
 from datetime import datetime
 from typing import Optional
 from dataclasses import dataclass
 
 
+# Bump on any parser change that could parse an email differently:
+# processed_messages re-admits IDs that failed under an older version, and
+# payments_raw.parser_version shows which rows scripts/reparse_payments.py
+# should recheck
+PARSER_VERSION = 2
+
+
+# Pattern registry: every regex the parsers use, compiled once at import and
+# named <provider>.<field> so the benchmark can time each one.
+# Body patterns search EmailView.text (tags stripped, one line per block;
+# see EmailView), except the class-attribute hooks, which need the HTML.
+# Subject patterns that start with a lazy capture are anchored with ^: a
+# match, if any, starts at 0 anyway, and a miss fails after one attempt
+# instead of one per character.
+_I = re.IGNORECASE
+_M = re.MULTILINE
+PATTERNS: dict[str, re.Pattern] = {
+    'body.start': re.compile(r'<body[\s>]', _I),
+    'body.qp_escape': re.compile(r'=([0-9A-Fa-f]{2})'),
+    # One pass over the HTML: hidden blocks and comments, then any tag (group 3 is its name)
+    'body.markup': re.compile(r'<(style|script)\b.*?</\1\s*>|<!--.*?-->|<(/?)([A-Za-z][A-Za-z0-9]*)[^>]*>',
+                              re.DOTALL | _I),
+
+    'zelle.sender_heading': re.compile(r'^([A-Za-z ]+?)\s+sent you money', _I | _M),
+    'zelle.sender_received': re.compile(r'You received \$[\d,]+\.?\d* from ([A-Za-z ]+)', _I),
+    'zelle.amount_cell': re.compile(r'^\$?([\d,]+\.?\d*)$', _M),
+    'zelle.amount_text': re.compile(r'Amount:?\s*\$?([\d,]+\.?\d*)', _I),
+    'zelle.transaction': re.compile(r'Transaction number:?\s*(\d+)', _I),
+    'zelle.memo': re.compile(r'^Memo\b:?\s*([^\n]+)', _I | _M),
+
+    'cashapp.subject_ignore': re.compile(r'^you sent|privacy notice', _I),
+    'cashapp.subject_sent': re.compile(r'^(.+?)\s+sent you \$?([\d,]+\.?\d*)', _I),
+    'cashapp.subject_received': re.compile(r'received \$?([\d,]+\.?\d*)\s+from\s+(.+)', _I),
+    'cashapp.subject_memo': re.compile(r'sent you \$[\d,]+\.?\d*\s+for\s+(.+)$', _I),
+    'cashapp.body_sent_by': re.compile(r'You were sent \$([\d,]+\.?\d*) by ([^\.\n]+)', _I),
+    # The leftmost match always starts a run of [^.\n]; the lookbehind skips
+    # the doomed attempts from every position inside a run
+    'cashapp.body_paid_you': re.compile(r'(?:^|(?<=[\.\n]))([^\.\n]+) paid you \$([\d,]+\.?\d*)', _I),
+    'cashapp.memo': re.compile(r'profile-description"[^>]*>\s*For\s+([^<]+)', _I),
+    'cashapp.transaction': re.compile(r'#([A-Z0-9-]{4,})'),
+
+    'venmo.subject_ignore': re.compile(r'^you paid', _I),
+    'venmo.subject_paid': re.compile(r'^(.+?)\s+paid you \$?([\d,]+\.?\d*)', _I),
+    'venmo.transaction': re.compile(r'Transaction ID[:\s]+(\d+)', _I),
+    'venmo.note_html': re.compile(r'class="[^"]*transaction-note[^"]*"[^>]*>\s*([^<]+)'),
+    'venmo.note_text': re.compile(r'^Note:\s*([^\n]+)', _I | _M),
+
+    'chime.subject_sender': re.compile(r'^(.+?)\s+just sent you money', _I),
+    'chime.amount': re.compile(r'received\s+\$?([\d,]+\.?\d*)', _I),
+    'chime.sender': re.compile(r'from\s+([A-Za-z ]+?)(?= through\b|[^A-Za-z ]|$)', _I),
+    'chime.memo': re.compile(r'\bfor\s+([^\.\n]+)', _I),
+
+    'stripe.subject': re.compile(r'Payment of \$?([\d,]+\.?\d*)\s+from\s+(.+)', _I),
+    'stripe.amount': re.compile(r'\$?([\d,]+\.?\d*)\s*USD'),
+    'stripe.transaction': re.compile(r'(pi_[A-Za-z0-9]+)'),
+}
+
+# Tags that start a new line in EmailView.text; all others are dropped in place
+_BLOCK_TAGS = frozenset(
+    ['br', 'p', 'div', 'tr', 'td', 'th', 'li', 'ul', 'ol', 'table', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+)
+
+
+def _search(name: str, text: str) -> Optional[re.Match]:
+    """Search with a registered pattern."""
+    return PATTERNS[name].search(text)
+
+
+def payment_region(body: str) -> str:
+    """
+    The part of the body the parsers scan: everything from <body> on.
+    
+    <head> holds only styles and metadata, often most of a marketing
+    email's size, and nothing the parsers extract.
+    """
+    start = _search('body.start', body)
+    return body[start.start():] if start else body
+
+
+def _markup_replacement(match: re.Match) -> str:
+    return '\n' if match.group(3) and match.group(3).lower() in _BLOCK_TAGS else ''
+
+
+def html_to_text(html: str) -> str:
+    """
+    Compact text of an HTML body: styles, scripts and comments removed,
+    one line per block element, entities decoded, runs of whitespace
+    (including &nbsp;) collapsed and blank lines dropped.
+    """
+    text = PATTERNS['body.markup'].sub(_markup_replacement, html)
+    if '&' in text:
+        text = unescape(text)
+    return compact_text(text)
+
+
+def compact_text(text: str) -> str:
+    """Collapse whitespace within lines and drop blank lines."""
+    lines = (' '.join(line.split()) for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+# Parser registry: parsers register the sender domains they handle, so
+# picking one is a dict lookup on the From domain rather than a walk over
+# every parser
+PARSERS: list = []
+_PARSERS_BY_DOMAIN: dict[str, list] = {}
+_PARSERS_BY_DISPLAY_NAME: list[tuple[str, type]] = []
+
+
+def register_parser(domains: list[str], subject_keywords: list[str] = (), display_names: list[str] = (),
+                    ignore_subject: Optional[str] = None):
+    """
+    Class decorator declaring which emails a parser handles.
+    
+    domains: sender domains; subdomains match too (email.venmo.com -> venmo.com)
+    subject_keywords: if set, the subject must contain one of them
+    display_names: fallback for senders whose domain we don't know, matched
+        against the From display name only when no domain matched
+    ignore_subject: PATTERNS name; subjects it matches are never payments
+        (e.g. "You sent ..."), so they are dropped on headers alone
+    """
+    def decorator(parser_class):
+        parser_class.DOMAINS = tuple(d.lower() for d in domains)
+        parser_class.SUBJECT_KEYWORDS = tuple(k.lower() for k in subject_keywords)
+        parser_class.IGNORE_SUBJECT = ignore_subject
+        PARSERS.append(parser_class)
+        for domain in parser_class.DOMAINS:
+            _PARSERS_BY_DOMAIN.setdefault(domain, []).append(parser_class)
+        for name in display_names:
+            _PARSERS_BY_DISPLAY_NAME.append((name.lower(), parser_class))
+        return parser_class
+    return decorator
+
+
+def _accepts_subject(parser_class, subject: str) -> bool:
+    if parser_class.IGNORE_SUBJECT and _search(parser_class.IGNORE_SUBJECT, subject):
+        return False
+    if not parser_class.SUBJECT_KEYWORDS:
+        return True
+    subject = subject.lower()
+    return any(keyword in subject for keyword in parser_class.SUBJECT_KEYWORDS)
+
+
+def find_parser(from_addr: str, subject: str):
+    """
+    Parser for an email, or None.
+    
+    1. Sender domain, then each parent domain (alerts.chase.com, chase.com)
+    2. Only if no registered domain matched: display-name fallbacks
+    """
+    display_name, address = parseaddr(str(from_addr))
+    domain = address.rpartition('@')[2].lower()
+    
+    labels = domain.split('.')
+    for i in range(len(labels) - 1):
+        candidates = _PARSERS_BY_DOMAIN.get('.'.join(labels[i:]))
+        if candidates is not None:
+            return next((p for p in candidates if _accepts_subject(p, subject)), None)
+    
+    display_name = display_name.lower()
+    for name, parser_class in _PARSERS_BY_DISPLAY_NAME:
+        if name in display_name and _accepts_subject(parser_class, subject):
+            return parser_class
+    
+    return None
+
+
+def claims_message(from_addr: str, subject: str) -> bool:
+    """
+    Header-only prefilter: could this email be a payment? Cheap enough to
+    run on Gmail metadata before deciding to download the full message.
+    """
+    return find_parser(from_addr, subject) is not None
+
+
 @dataclass
 class ParsedPayment:
     """Parsed payment data from email."""
@@ -31,35 +209,61 @@ class ParsedPayment:
     raw_email_id: Optional[str] = None
 
 
-def decode_email_content(msg: email.message.Message) -> str:
-    """Extract and decode email body (HTML preferred, then plain text)."""
-    body = ""
+def _decode_part(part: email.message.Message) -> str:
+    """A text part as str, transfer encoding and charset undone."""
+    payload = part.get_payload(decode=True) or b''
+    try:
+        body = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+    except LookupError:
+        # Unknown charset
+        body = payload.decode('utf-8', errors='replace')
     
-    if msg.is_multipart():
-        for part in msg.walk():
-            content_type = part.get_content_type()
-            if content_type == "text/html":
-                payload = part.get_payload(decode=True)
-                if payload:
-                    charset = part.get_content_charset() or 'utf-8'
-                    body = payload.decode(charset, errors='replace')
-                    break
-            elif content_type == "text/plain" and not body:
-                payload = part.get_payload(decode=True)
-                if payload:
-                    charset = part.get_content_charset() or 'utf-8'
-                    body = payload.decode(charset, errors='replace')
-    else:
-        payload = msg.get_payload(decode=True)
-        if payload:
-            charset = msg.get_content_charset() or 'utf-8'
-            body = payload.decode(charset, errors='replace')
+    # Quoted-printable that wasn't declared as such (soft line breaks left in
+    # a 7bit/8bit part). Declared QP is already decoded above, and decoding
+    # it again would corrupt a literal "=XX" in the text.
+    if ('=\n' in body or '=\r\n' in body) and part.get('Content-Transfer-Encoding', '').lower() != 'quoted-printable':
+        body = body.replace('=\r\n', '').replace('=\n', '')
+        body = PATTERNS['body.qp_escape'].sub(lambda m: chr(int(m.group(1), 16)), body)
+    return body
+
+
+class EmailView:
+    """
+    One email as the parsers see it, each view decoded once and cached:
+    - html: payment_region() of the body part get_body() picks (HTML
+      preferred, then plain text), decoded
+    - text: html as compact text (html_to_text), one line per block
+      element; what the body patterns search
+    - lower: text lowercased, for keyword checks before a pattern search
+    """
     
-    # Decode quoted-printable artifacts
-    body = body.replace('=\r\n', '').replace('=\n', '')
-    body = re.sub(r'=([0-9A-Fa-f]{2})', lambda m: chr(int(m.group(1), 16)), body)
+    def __init__(self, msg: email.message.EmailMessage, subject: Optional[str] = None):
+        self.msg = msg
+        self.subject = msg.get('Subject', '') if subject is None else subject
     
-    return body
+    @cached_property
+    def part(self) -> Optional[email.message.EmailMessage]:
+        """The body part get_body() picks: HTML preferred, then plain text."""
+        return self.msg.get_body(preferencelist=('html', 'plain'))
+    
+    @property
+    def is_html(self) -> bool:
+        return self.part is not None and self.part.get_content_subtype() == 'html'
+    
+    @cached_property
+    def html(self) -> str:
+        if self.part is None:
+            return ''
+        return payment_region(_decode_part(self.part))
+    
+    @cached_property
+    def text(self) -> str:
+        body = self.html
+        return html_to_text(body) if self.is_html else compact_text(body)
+    
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
 
 
 def parse_email_date(msg: email.message.Message) -> datetime:
@@ -72,47 +276,43 @@ def parse_email_date(msg: email.message.Message) -> datetime:
         return datetime.utcnow()
 
 
+@register_parser(domains=['chase.com'], subject_keywords=['zelle'])
 class ZelleParser:
     """Parse Zelle payment emails from Chase."""
     
     @staticmethod
-    def can_parse(from_addr: str, subject: str) -> bool:
-        return 'chase.com' in from_addr.lower() and 'zelle' in subject.lower()
-    
-    @staticmethod
-    def parse(msg: email.message.Message, body: str) -> Optional[ParsedPayment]:
+    def parse(view: EmailView) -> Optional[ParsedPayment]:
         try:
+            body = view.text
+            
             # 1. Sender name
-            # Pattern A: "<h1>NAME sent you money"
-            sender_match = re.search(r'<h1[^>]*>\s*([A-Za-z\s]+)\s+sent you money', body, re.IGNORECASE)
+            # Pattern A: "NAME sent you money" heading line
+            sender_match = None
+            if 'sent you money' in view.lower:
+                sender_match = _search('zelle.sender_heading', body)
             
             # Pattern B: "You received $X from NAME"
             if not sender_match:
-                sender_match = re.search(r'You received \$[\d,]+\.?\d* from ([A-Za-z\s]+)', body, re.IGNORECASE)
+                sender_match = _search('zelle.sender_received', body)
                 
             sender_name = sender_match.group(1).strip().title() if sender_match else "Unknown"
             
             # 2. Amount
-            # Pattern A: ">$XXX.XX</td>" in table
-            amount_match = re.search(r'>\s*\$?([\d,]+\.?\d*)\s*</td>', body)
+            # Pattern A: "$XXX.XX" table cell (a line of its own)
+            amount_match = _search('zelle.amount_cell', body)
             
-            # Pattern B: Plain text "$XXX.XX"
+            # Pattern B: Plain text "Amount: $XXX.XX"
             if not amount_match:
-                amount_match = re.search(r'Amount:?\s*\$?([\d,]+\.?\d*)', body, re.IGNORECASE)
+                amount_match = _search('zelle.amount_text', body)
                 
             amount = float(amount_match.group(1).replace(',', '')) if amount_match else 0.0
             
-            # 3. Transaction number
-            tx_match = re.search(r'Transaction number</td>.*?>\s*(\d+)\s*</td>', body, re.DOTALL | re.IGNORECASE)
-            if not tx_match:
-                tx_match = re.search(r'Transaction number:?\s*(\d+)', body, re.IGNORECASE)
+            # 3. Transaction number: "Transaction number" cell or label, then the number
+            tx_match = _search('zelle.transaction', body)
             transaction_id = tx_match.group(1) if tx_match else None
             
-            # 4. Memo
-            memo_match = re.search(r'Memo</td>.*?>\s*([^<]+)\s*</td>', body, re.DOTALL | re.IGNORECASE)
-            if not memo_match:
-                memo_match = re.search(r'Memo:?\s*([^\n<]+)', body, re.IGNORECASE)
-                
+            # 4. Memo, same layouts
+            memo_match = _search('zelle.memo', body) if 'memo' in view.lower else None
             memo = memo_match.group(1).strip() if memo_match else None
             if memo and memo.lower() == 'n/a':
                 memo = None
@@ -128,46 +328,38 @@ class ZelleParser:
                 sender_identifier=None,
                 transaction_id=transaction_id,
                 memo=memo,
-                received_at=parse_email_date(msg)
+                received_at=parse_email_date(view.msg)
             )
         except Exception as e:
             print(f"Zelle parse error: {e}")
             return None
 
 
+@register_parser(domains=['square.com', 'cash.app'], display_names=['cash app'],
+                 ignore_subject='cashapp.subject_ignore')
 class CashAppParser:
     """Parse CashApp payment emails from Square."""
     
     @staticmethod
-    def can_parse(from_addr: str, subject: str) -> bool:
-        return 'square.com' in from_addr.lower() or 'cash app' in from_addr.lower()
-    
-    @staticmethod
-    def parse(msg: email.message.Message, body: str) -> Optional[ParsedPayment]:
+    def parse(view: EmailView) -> Optional[ParsedPayment]:
         try:
-            subject = msg.get('Subject', '')
+            subject = view.subject
             
-            # Explicit Ignore Patterns
-            if subject.lower().startswith("you sent"):
-                return None
-            if "privacy notice" in subject.lower():
-                return None
-
             sender_name = "Unknown"
             amount = 0.0
             memo = None
             
             # 1. Parse Subject
             # Pattern A: "Name sent you $XX for note"
-            match_a = re.search(r'(.+?)\s+sent you \$?([\d,]+\.?\d*)', subject, re.IGNORECASE)
+            match_a = _search('cashapp.subject_sent', subject)
             # Pattern B: "Cash App: You received $XX from Name"
-            match_b = re.search(r'received \$?([\d,]+\.?\d*)\s+from\s+(.+)', subject, re.IGNORECASE)
+            match_b = _search('cashapp.subject_received', subject)
             
             if match_a:
                 sender_name = match_a.group(1).strip()
                 amount = float(match_a.group(2).replace(',', ''))
                 # Extract memo if present
-                memo_match = re.search(r'sent you \$[\d,]+\.?\d*\s+for\s+(.+)$', subject, re.IGNORECASE)
+                memo_match = _search('cashapp.subject_memo', subject)
                 memo = memo_match.group(1).strip() if memo_match else None
             elif match_b:
                 amount = float(match_b.group(1).replace(',', ''))
@@ -183,11 +375,11 @@ class CashAppParser:
             # 2. Parse Body (Fallback or "Payment received" subject)
             if amount == 0.0 or sender_name == "Unknown":
                 # Pattern 1: "You were sent $120 by Riva D Brewer"
-                body_match = re.search(r'You were sent \$([\d,]+\.?\d*) by ([^\.\n<]+)', body, re.IGNORECASE)
+                body_match = _search('cashapp.body_sent_by', view.text)
                 
                 # Pattern 2: "Riva D Brewer paid you $120"
-                if not body_match:
-                    body_match = re.search(r'([^\.\n<]+) paid you \$([\d,]+\.?\d*)', body, re.IGNORECASE)
+                if not body_match and 'paid you' in view.lower:
+                    body_match = _search('cashapp.body_paid_you', view.text)
                     if body_match:
                         # Swap groups for this pattern
                         amount = float(body_match.group(2).replace(',', ''))
@@ -205,15 +397,13 @@ class CashAppParser:
             if not memo:
                 # Look for "For car payment" in HTML or text
                 # HTML often has: class="text-subtle profile-description"...>For car payment</td>
-                memo_match = re.search(r'profile-description"[^>]*>\s*For\s+([^<]+)', body, re.IGNORECASE)
+                memo_match = _search('cashapp.memo', view.html)
                 if memo_match:
-                    memo = memo_match.group(1).strip()
-                else:
-                    pass
+                    memo = unescape(memo_match.group(1)).strip()
 
             # 3. Transaction ID
             # Look for #D-XXXXXXXX
-            tx_match = re.search(r'#([A-Z0-9-]{4,})', body)
+            tx_match = _search('cashapp.transaction', view.text)
             transaction_id = tx_match.group(1) if tx_match else None
             
             # Validate
@@ -227,45 +417,34 @@ class CashAppParser:
                 sender_identifier=None,
                 transaction_id=transaction_id,
                 memo=memo,
-                received_at=parse_email_date(msg)
+                received_at=parse_email_date(view.msg)
             )
         except Exception as e:
             print(f"CashApp parse error: {e}")
             return None
 
 
+@register_parser(domains=['venmo.com'], ignore_subject='venmo.subject_ignore')
 class VenmoParser:
     """Parse Venmo payment emails."""
     
     @staticmethod
-    def can_parse(from_addr: str, subject: str) -> bool:
-        return 'venmo.com' in from_addr.lower()
-    
-    @staticmethod
-    def can_parse_body(body: str) -> bool:
-        return 'venmo' in body.lower()
-
-    @staticmethod
-    def parse(msg: email.message.Message, body: str) -> Optional[ParsedPayment]:
+    def parse(view: EmailView) -> Optional[ParsedPayment]:
         try:
-            subject = msg.get('Subject', '')
+            subject = view.subject
             
-            # Explicit ignore
-            if subject.lower().startswith("you paid"):
-                return None
-
             sender_name = "Unknown"
             amount = 0.0
             
             # Pattern A: "Name paid you $XX.XX" (Subject)
-            subj_match = re.search(r'(.+?)\s+paid you \$?([\d,]+\.?\d*)', subject, re.IGNORECASE)
+            subj_match = _search('venmo.subject_paid', subject)
             
             if subj_match:
                 sender_name = subj_match.group(1).strip()
                 amount = float(subj_match.group(2).replace(',', ''))
             
             # Transaction ID
-            tx_match = re.search(r'Transaction ID[:\s<]+(\d+)', body, re.IGNORECASE)
+            tx_match = _search('venmo.transaction', view.text)
             transaction_id = tx_match.group(1) if tx_match else None
             
             # Note/Memo
@@ -273,14 +452,13 @@ class VenmoParser:
             
             # 1. HTML extraction (Priority)
             # Look for class="transaction-note"
-            note_html = re.search(r'class="[^"]*transaction-note[^"]*"[^>]*>\s*([^<]+)', body)
+            note_html = _search('venmo.note_html', view.html)
             if note_html:
-                memo = note_html.group(1).strip()
+                memo = unescape(note_html.group(1)).strip()
             
-            # 2. Text/Subject Fallback
-            if not memo:
-                # Require "Note:" to be at separate line or start of text, not inside a word like "transaction-note"
-                note_match = re.search(r'(?:^|[\n>])Note:\s*([^<]+)', body, re.IGNORECASE)
+            # 2. Text Fallback: a line starting "Note:"
+            if not memo and 'note:' in view.lower:
+                note_match = _search('venmo.note_text', view.text)
                 if note_match:
                     memo = note_match.group(1).strip()
 
@@ -295,58 +473,50 @@ class VenmoParser:
                 sender_identifier=None,
                 transaction_id=transaction_id,
                 memo=memo,
-                received_at=parse_email_date(msg)
+                received_at=parse_email_date(view.msg)
             )
         except Exception as e:
             print(f"Venmo parse error: {e}")
             return None
 
 
+@register_parser(domains=['chime.com'])
 class ChimeParser:
     """Parse Chime payment emails."""
     
     @staticmethod
-    def can_parse(from_addr: str, subject: str) -> bool:
-        return 'chime.com' in from_addr.lower()
-    
-    @staticmethod
-    def parse(msg: email.message.Message, body: str) -> Optional[ParsedPayment]:
+    def parse(view: EmailView) -> Optional[ParsedPayment]:
         try:
-            subject = msg.get('Subject', '')
+            subject = view.subject
             sender_name = "Unknown"
             amount = 0.0
             memo = None
             
             # Subject: "Name just sent you money"
-            subj_match = re.search(r'(.+?)\s+just sent you money', subject, re.IGNORECASE)
+            subj_match = _search('chime.subject_sender', subject)
             if subj_match:
                 sender_name = subj_match.group(1).strip()
             
             # Body: "received $XX.XX from Name"
             # Try to find amount first
-            amount_match = re.search(r'received\s+\$?([\d,]+\.?\d*)', body, re.IGNORECASE)
+            amount_match = _search('chime.amount', view.text)
             if amount_match:
                 amount = float(amount_match.group(1).replace(',', ''))
 
             # Refine sender if unknown
             if sender_name == "Unknown":
-                from_match = re.search(r'from\s+([A-Za-z\s]+)', body, re.IGNORECASE)
+                # "from NAME through Chime"
+                from_match = _search('chime.sender', view.text)
                 if from_match:
-                     clean_name = from_match.group(1).replace('through', '').strip()
-                     sender_name = clean_name
+                    sender_name = from_match.group(1).strip()
             
-            # Memo
-            # Try HTML strong tag first: "for <strong>Car payment</strong>"
-            memo_match = re.search(r'for\s+<strong[^>]*>([^<]+)</strong>', body, re.IGNORECASE)
+            # Memo: "for Car payment" (plain or <strong> in the HTML), but not
+            # long strings or boilerplate
+            memo_match = _search('chime.memo', view.text)
             if memo_match:
-                memo = memo_match.group(1).strip()
-            else:
-                # Fallback to text, but avoid HTML comments or long strings
-                memo_match = re.search(r'for\s+([^<.\n]+)', body, re.IGNORECASE)
-                if memo_match:
-                    candidate = memo_match.group(1).strip()
-                    if len(candidate) < 50 and 'transaction' not in candidate.lower() and '-->' not in candidate and 'most cases' not in candidate.lower():
-                        memo = candidate
+                candidate = memo_match.group(1).strip()
+                if len(candidate) < 50 and 'transaction' not in candidate.lower() and 'most cases' not in candidate.lower():
+                    memo = candidate
             
             # Validate
             if amount == 0.0 or sender_name == "Unknown":
@@ -355,7 +525,7 @@ class ChimeParser:
 
             # Transaction ID - Fallback to Email Message-ID since Chime doesn't consistently provide one in body
             transaction_id = None
-            msg_id = msg.get('Message-ID')
+            msg_id = view.msg.get('Message-ID')
             if msg_id:
                 # Clean up ID: <12345@domain> -> 12345@domain
                 transaction_id = msg_id.strip('<>')
@@ -367,29 +537,26 @@ class ChimeParser:
                 sender_identifier=None,
                 transaction_id=transaction_id,
                 memo=memo,
-                received_at=parse_email_date(msg)
+                received_at=parse_email_date(view.msg)
             )
         except Exception as e:
             print(f"Chime parse error: {e}")
             return None
 
 
+@register_parser(domains=['stripe.com'])
 class StripeParser:
     """Parse Stripe payment emails."""
     
     @staticmethod
-    def can_parse(from_addr: str, subject: str) -> bool:
-        return 'stripe.com' in from_addr.lower()
-    
-    @staticmethod
-    def parse(msg: email.message.Message, body: str) -> Optional[ParsedPayment]:
+    def parse(view: EmailView) -> Optional[ParsedPayment]:
         try:
-            subject = msg.get('Subject', '')
+            subject = view.subject
             sender_name = "Unknown"
             amount = 0.0
             
             # Subject: "Payment of $XXX.XX from Name"
-            subj_match = re.search(r'Payment of \$?([\d,]+\.?\d*)\s+from\s+(.+)', subject, re.IGNORECASE)
+            subj_match = _search('stripe.subject', subject)
             
             if subj_match:
                 amount = float(subj_match.group(1).replace(',', ''))
@@ -401,12 +568,12 @@ class StripeParser:
                     sender_name = name_part.strip()
             else:
                 # Fallback to body scan
-                amount_match = re.search(r'\$?([\d,]+\.?\d*)\s*USD', body)
+                amount_match = _search('stripe.amount', view.text)
                 if amount_match:
                     amount = float(amount_match.group(1).replace(',', ''))
 
-            # Transaction ID: pi_XXXX
-            tx_match = re.search(r'(pi_[A-Za-z0-9]+)', body)
+            # Transaction ID: pi_XXXX, which may only appear in a link
+            tx_match = _search('stripe.transaction', view.text) or _search('stripe.transaction', view.html)
             transaction_id = tx_match.group(1) if tx_match else None
             
             # Validate
@@ -420,23 +587,13 @@ class StripeParser:
                 sender_identifier=None,
                 transaction_id=transaction_id,
                 memo=None,
-                received_at=parse_email_date(msg)
+                received_at=parse_email_date(view.msg)
             )
         except Exception as e:
             print(f"Stripe parse error: {e}")
             return None
 
 
-# Parser registry
-PARSERS = [
-    ZelleParser,
-    CashAppParser,
-    VenmoParser,
-    ChimeParser,
-    StripeParser,
-]
-
-
 def parse_email(raw_email: bytes) -> Optional[ParsedPayment]:
     """
     Parse a raw email (.eml) and extract payment information.
@@ -452,14 +609,13 @@ def parse_email(raw_email: bytes) -> Optional[ParsedPayment]:
         
         from_addr = msg.get('From', '')
         subject = msg.get('Subject', '')
-        body = decode_email_content(msg)
         
-        # Find appropriate parser
-        for parser_class in PARSERS:
-            if parser_class.can_parse(from_addr, subject):
-                return parser_class.parse(msg, body)
+        # Pick the parser before decoding: non-payment mail stops here
+        parser_class = find_parser(from_addr, subject)
+        if not parser_class:
+            return None  # No parser matched
         
-        return None  # No parser matched
+        return parser_class.parse(EmailView(msg, subject))
         
     except Exception as e:
         print(f"Email parse error: {e}")
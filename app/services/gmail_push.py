@@ -0,0 +1,140 @@
+"""
+Gmail Push Notifications
+
+Near-real-time payment ingestion from Gmail watch notifications, delivered
+by Cloud Pub/Sub push to POST /webhook/gmail-push:
+- decode_notification() unpacks a push body into (emailAddress, historyId)
+- PushIngestor debounces bursts: the first notification schedules one
+  poll_gmail() cycle gmail_push_debounce_seconds later, the rest only raise
+  the historyId it has to reach; a cycle is skipped when the stored sync
+  cursor is already there (redeliveries, a worker poll that got there first)
+- renew_watch() re-registers users.watch (it expires after 7 days) and
+  records the expiry in gmail_sync_state
+"""
+
+import base64
+import json
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models import GmailSyncState
+from app.services.payment_ingest import PollResult, poll_gmail
+
+
+def decode_notification(body: dict) -> Optional[tuple[str, int]]:
+    """
+    (emailAddress, historyId) from a Pub/Sub push body:
+    {"message": {"data": base64(JSON), "messageId": ...}, "subscription": ...}
+    None if it isn't a Gmail notification.
+    """
+    try:
+        data = json.loads(base64.b64decode(body["message"]["data"]))
+        return data["emailAddress"], int(data["historyId"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class PushIngestor:
+    """Runs at most one fetch-parse-store cycle per burst of notifications."""
+
+    def __init__(self, debounce: Optional[float] = None,
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 gmail_factory: Optional[Callable] = None):
+        """
+        gmail_factory: builds the GmailService (default: authenticate from
+        env/token.json); the client is kept warm between cycles.
+        """
+        self.debounce = get_settings().gmail_push_debounce_seconds if debounce is None else debounce
+        self.session_factory = session_factory
+        self.gmail_factory = gmail_factory
+        self._gmail = None
+        self._lock = threading.Lock()      # guards the pending state below
+        self._run_lock = threading.Lock()  # one cycle at a time
+        self._timer: Optional[threading.Timer] = None
+        self._pending: dict[str, int] = {}  # mailbox -> highest historyId notified
+        self.cycles = 0
+        self.skipped = 0
+        self.last_result: Optional[PollResult] = None
+
+    def notify(self, mailbox: str, history_id: int) -> bool:
+        """Note a notification. Returns True if it scheduled a cycle, False if one is already pending."""
+        with self._lock:
+            self._pending[mailbox] = max(history_id, self._pending.get(mailbox, 0))
+            if self._timer is not None:
+                return False
+            self._timer = threading.Timer(self.debounce, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+            return True
+
+    def cancel(self):
+        """Drop a scheduled cycle (shutdown)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _client(self):
+        if self._gmail is None:
+            if self.gmail_factory is None:
+                from app.services.gmail_service import GmailService
+                self.gmail_factory = GmailService
+            self._gmail = self.gmail_factory()
+        return self._gmail
+
+    @staticmethod
+    def _caught_up(db: Session, pending: dict[str, int]) -> bool:
+        """True if the sync cursor of every notified mailbox already covers its historyId."""
+        for mailbox, history_id in pending.items():
+            state = db.get(GmailSyncState, mailbox)
+            if not state or int(state.history_id) < history_id:
+                return False
+        return True
+
+    def _run(self):
+        # Notifications from here on schedule the next cycle, which waits for this one
+        with self._lock:
+            self._timer = None
+            pending, self._pending = self._pending, {}
+
+        with self._run_lock:
+            db = self.session_factory()
+            try:
+                if self._caught_up(db, pending):
+                    self.skipped += 1
+                    return
+                print(f"[{datetime.now()}] Push notification: fetching up to historyId "
+                      f"{max(pending.values())}")
+                self.last_result = poll_gmail(self._client(), db)
+                self.cycles += 1
+            except Exception as e:
+                db.rollback()
+                # Rebuilt on the next cycle; the worker's next poll covers these messages meanwhile
+                self._gmail = None
+                print(f"[{datetime.now()}] Push-triggered fetch failed: {e}")
+            finally:
+                db.close()
+
+
+def renew_watch(db: Session, gmail, topic: str) -> dict:
+    """
+    (Re)register the mailbox's watch on `topic` and record when it expires.
+    Not committed here. The sync cursor itself is left to the pollers.
+    """
+    watch = gmail.watch(topic)
+    mailbox = gmail.service.users().getProfile(userId='me').execute()['emailAddress']
+    state = db.get(GmailSyncState, mailbox)
+    if state:
+        state.watch_expires_at = watch['expires_at']
+    else:
+        print(f"No sync cursor for {mailbox} yet; run a poll to create it")
+    return {'mailbox': mailbox, **watch}
+
+
+# Shared ingestor for the API process
+push_ingestor = PushIngestor()
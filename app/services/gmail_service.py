@@ -14,16 +14,34 @@ For local development:
 import os
 import json
 import base64
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Optional, List
+from email.header import decode_header, make_header
+from itertools import islice
+from typing import Iterable, Iterator, Optional, List
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models import GmailSyncState
+from app.services.gmail_parser import claims_message
+from app.services.processed_messages import skip_processed, unprocessed_ids
 
 # Gmail API scopes
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# messages.get calls per batch HTTP request. Gmail accepts up to 100, but
+# larger batches are more likely to have parts rate-limited (429)
+BATCH_SIZE = 50
+
+# Headers the parsers' prefilter needs (header-first fetch)
+METADATA_HEADERS = ['From', 'Subject', 'Date', 'Message-ID']
+
 # Payment senders to filter emails
 PAYMENT_SENDERS = [
     'no.reply.alerts@chase.com',  # Zelle
@@ -51,14 +69,59 @@ def get_credentials_from_env():
         return None, None
 
 
+class HistoryCursorExpired(Exception):
+    """The stored historyId is too old for users.history.list (HTTP 404)."""
+
+
+@dataclass
+class SyncResult:
+    """
+    Messages from one incremental sync and the cursor to store once they are
+    saved. `emails` downloads them lazily; iterate it before save_sync_state().
+    """
+    mailbox: str
+    history_id: str
+    message_ids: List[str]
+    full_sync: bool = False
+    skipped: int = 0  # already in processed_messages, not downloaded
+    emails: Iterator[dict] = field(default_factory=lambda: iter(()))
+    downloaded: int = 0
+    deferred: int = 0  # over gmail_resync_max_messages, left for the next run
+    
+    @property
+    def complete(self) -> bool:
+        """True once every message was downloaded, filtered out on its headers or found missing."""
+        return self.deferred == 0 and self.downloaded == len(self.message_ids)
+
+
+@dataclass
+class FetchStats:
+    """What the header-first fetch downloaded and what it avoided."""
+    headers_fetched: int = 0
+    raw_fetched: int = 0
+    raw_bytes: int = 0
+    skipped: int = 0        # not claimed by any parser, never downloaded raw
+    bytes_skipped: int = 0  # Gmail's sizeEstimate of those messages
+
+
 class GmailService:
     """Gmail API wrapper for fetching payment emails."""
     
-    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token.json'):
+    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token.json',
+                 service=None, batch_uri: Optional[str] = None, header_first: bool = True):
+        """
+        service / batch_uri: use a prebuilt API client and batch endpoint
+        instead of authenticating (e.g. against a local stand-in).
+        header_first: fetch headers before downloading (see iter_emails).
+        """
         self.credentials_path = credentials_path
         self.token_path = token_path
-        self.service = None
-        self._authenticate()
+        self.service = service
+        self.batch_uri = batch_uri
+        self.header_first = header_first
+        self.stats = FetchStats()
+        if service is None:
+            self._authenticate()
     
     def _authenticate(self):
         """Authenticate with Gmail API using OAuth."""
@@ -122,66 +185,354 @@ class GmailService:
         
         return f'({sender_filter}) after:{date_str}'
     
-    def fetch_emails(self, since_hours: int = 1, max_results: int = 50) -> List[dict]:
+    def stream_emails(self, since_hours: int = 1, max_results: Optional[int] = None,
+                      db: Optional[Session] = None) -> Iterator[dict]:
         """
-        Fetch payment emails from the last N hours.
-        
-        Args:
-            since_hours: Look back this many hours
-            max_results: Maximum emails to fetch
+        Yield payment emails from the last N hours as they are downloaded.
         
-        Returns:
-            List of email data dicts with id, raw content, and metadata
+        Follows search pagination and downloads one batch at a time, so only
+        one batch of raw emails is held in memory however long the window.
+        With db, messages already in processed_messages are not downloaded.
         """
         if not self.service:
             raise RuntimeError("Gmail service not authenticated")
         
         query = self._build_query(since_hours)
+        message_ids = self.iter_message_ids(query, max_results)
+        if db is not None:
+            message_ids = skip_processed(db, message_ids)
+        return self.iter_emails(message_ids)
+    
+    def iter_message_ids(self, query: str, max_results: Optional[int] = None,
+                         page_size: int = 500) -> Iterator[str]:
+        """Message IDs matching a Gmail search query, following nextPageToken."""
+        page_token = None
+        remaining = max_results
         
-        try:
-            # Search for emails
+        while remaining is None or remaining > 0:
+            limit = page_size if remaining is None else min(page_size, remaining)
             results = self.service.users().messages().list(
                 userId='me',
                 q=query,
-                maxResults=max_results
+                maxResults=limit,
+                pageToken=page_token
             ).execute()
             
             messages = results.get('messages', [])
-            emails = []
-            
             for msg in messages:
-                email_data = self._get_email_content(msg['id'])
-                if email_data:
-                    emails.append(email_data)
+                yield msg['id']
+            if remaining is not None:
+                remaining -= len(messages)
+            
+            page_token = results.get('nextPageToken')
+            if not page_token or not messages:
+                return
+    
+    def list_added_message_ids(self, start_history_id: str) -> tuple[List[str], str]:
+        """
+        IDs of messages added to the mailbox after start_history_id, and the
+        mailbox's current historyId.
+        
+        Raises HistoryCursorExpired if Gmail no longer has history that far back
+        (history is kept for about a week).
+        """
+        message_ids = []
+        seen = set()
+        history_id = start_history_id
+        page_token = None
+        
+        while True:
+            try:
+                response = self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    maxResults=500,
+                    pageToken=page_token
+                ).execute()
+            except HttpError as e:
+                if e.resp.status == 404:
+                    raise HistoryCursorExpired(start_history_id) from e
+                raise
             
-            return emails
+            for record in response.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message = added['message']
+                    labels = message.get('labelIds', [])
+                    if 'DRAFT' in labels or 'SENT' in labels or message['id'] in seen:
+                        continue
+                    seen.add(message['id'])
+                    message_ids.append(message['id'])
             
-        except Exception as e:
-            print(f"Error fetching emails: {e}")
-            return []
+            history_id = response.get('historyId', history_id)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return message_ids, history_id
     
-    def _get_email_content(self, message_id: str) -> Optional[dict]:
-        """Fetch full email content by message ID."""
-        try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=message_id,
-                format='raw'
-            ).execute()
+    def sync_emails(self, db: Session, initial_hours: int = 1) -> SyncResult:
+        """
+        Find emails added since the last sync of this mailbox and not yet
+        processed; they are downloaded in batches while result.emails is
+        iterated.
+        
+        With a stored cursor this is one users.history.list call (plus
+        pagination) and a batched download of only the new messages.
+        Without one, or if the cursor expired, it falls back to a full
+        search of the last gmail_resync_hours and downloads at most
+        gmail_resync_max_messages of the unprocessed matches. If more are
+        left the cursor is not advanced, so the next run resyncs again and
+        picks up where this one stopped.
+        
+        Nothing is written here: call save_sync_state() in the same
+        transaction that stores the payments, so the cursor only moves
+        forward once they are saved.
+        """
+        settings = get_settings()
+        
+        # Read the current historyId before searching: anything arriving
+        # during a full resync is then picked up by the next run
+        profile = self.service.users().getProfile(userId='me').execute()
+        mailbox = profile['emailAddress']
+        state = db.get(GmailSyncState, mailbox)
+        
+        if state:
+            try:
+                message_ids, history_id = self.list_added_message_ids(state.history_id)
+                return self._streaming(db, SyncResult(mailbox, history_id, message_ids))
+            except HistoryCursorExpired:
+                print(f"History cursor {state.history_id} expired, running a full resync")
+            hours = settings.gmail_resync_hours
+        else:
+            hours = initial_hours
+        
+        message_ids = list(self.iter_message_ids(self._build_query(hours)))
+        return self._streaming(db, SyncResult(mailbox, profile['historyId'], message_ids, full_sync=True),
+                               limit=settings.gmail_resync_max_messages)
+    
+    def _streaming(self, db: Session, result: SyncResult, limit: Optional[int] = None) -> SyncResult:
+        """
+        Drop messages already processed (one anti-join), keep at most `limit`
+        of the rest, then attach a lazy download that counts what arrived.
+        """
+        found = len(result.message_ids)
+        result.message_ids = unprocessed_ids(db, result.message_ids)
+        result.skipped = found - len(result.message_ids)
+        if limit is not None and len(result.message_ids) > limit:
+            result.deferred = len(result.message_ids) - limit
+            result.message_ids = result.message_ids[:limit]
+        
+        def emails():
+            for email_data in self.iter_emails(result.message_ids):
+                result.downloaded += 1
+                yield email_data
+        
+        result.emails = emails()
+        return result
+    
+    @staticmethod
+    def save_sync_state(db: Session, result: SyncResult):
+        """Advance the mailbox cursor (not committed here)."""
+        if result.deferred:
+            print(f"{result.deferred} emails left for the next run; keeping the previous cursor")
+            return
+        if not result.complete:
+            print("Not every message was downloaded; keeping the previous cursor")
+            return
+        
+        state = db.get(GmailSyncState, result.mailbox)
+        if not state:
+            state = GmailSyncState(mailbox=result.mailbox)
+            db.add(state)
+        state.history_id = result.history_id
+        if result.full_sync:
+            state.last_full_sync_at = datetime.utcnow()
+
+    def watch(self, topic: str, label_ids: Optional[List[str]] = None) -> dict:
+        """
+        Ask Gmail to publish mailbox changes to a Pub/Sub topic (users.watch).
+
+        A watch lasts 7 days; calling this again renews it. Returns the
+        mailbox's historyId and the expiry (datetime, UTC).
+        """
+        response = self.service.users().watch(userId='me', body={
+            'topicName': topic,
+            'labelIds': label_ids or ['INBOX'],
+            'labelFilterBehavior': 'include',
+        }).execute()
+        return {
+            'history_id': response['historyId'],
+            'expires_at': datetime.utcfromtimestamp(int(response['expiration']) / 1000),
+        }
+
+    def stop_watch(self):
+        """Stop push notifications for the mailbox (users.stop)."""
+        self.service.users().stop(userId='me').execute()
+
+    def _new_batch(self) -> BatchHttpRequest:
+        if self.batch_uri:
+            return BatchHttpRequest(batch_uri=self.batch_uri)
+        return self.service.new_batch_http_request()
+    
+    def _get_request(self, message_id: str, messages=None, format: str = 'raw'):
+        """
+        messages.get in the given format ('raw', or 'metadata' for the
+        METADATA_HEADERS only); pass a users().messages() resource to reuse
+        it across a batch.
+        """
+        messages = messages or self.service.users().messages()
+        if format == 'metadata':
+            return messages.get(userId='me', id=message_id, format='metadata', metadataHeaders=METADATA_HEADERS)
+        return messages.get(userId='me', id=message_id, format=format)
+    
+    @staticmethod
+    def _to_email_data(message_id: str, message: dict) -> dict:
+        """Decode a messages.get(format=raw) response."""
+        return {
+            'gmail_id': message_id,
+            'raw': base64.urlsafe_b64decode(message['raw'].encode('ASCII')),
+            'internal_date': message.get('internalDate'),
+        }
+    
+    @staticmethod
+    def _headers(message: dict) -> dict:
+        """Header name -> decoded value from a messages.get(format=metadata) response."""
+        headers = {}
+        for header in message.get('payload', {}).get('headers', []):
+            try:
+                headers[header['name']] = str(make_header(decode_header(header['value'])))
+            except Exception:
+                headers[header['name']] = header['value']
+        return headers
+    
+    def get_emails(self, message_ids: List[str], batch_size: int = BATCH_SIZE) -> List[dict]:
+        """Fetch full email content for many messages (see iter_emails), no header prefilter."""
+        return [e for e in self.iter_emails(message_ids, batch_size, header_first=False) if not e.get('missing')]
+    
+    def iter_emails(self, message_ids: Iterable[str], batch_size: int = BATCH_SIZE,
+                    header_first: Optional[bool] = None) -> Iterator[dict]:
+        """
+        Yield full email content for many messages, batch_size messages.get
+        calls per HTTP request (Gmail batch endpoint).
+        
+        message_ids may be a lazy iterator (e.g. iter_message_ids()); it is
+        consumed one batch at a time, so memory stays at one batch of emails.
+        Parts of a batch can fail on their own (usually 429 rate limits);
+        those messages are retried one by one with backoff. Messages that
+        still fail are logged and skipped. Messages Gmail no longer has
+        (404, e.g. deleted since they were listed) are yielded with
+        raw=None and missing=True, so the caller can record them as
+        handled. Results keep the input order.
+        
+        header_first (default: the service's setting) fetches each batch's
+        headers first and downloads only messages a parser claims
+        (gmail_parser.claims_message). The others are still yielded, with
+        raw=None and their headers, so the caller can record them.
+        """
+        if header_first is None:
+            header_first = self.header_first
+        
+        message_ids = iter(message_ids)
+        while True:
+            chunk = list(islice(message_ids, batch_size))
+            if not chunk:
+                return
             
-            # Decode raw email
-            raw_email = base64.urlsafe_b64decode(message['raw'].encode('ASCII'))
+            filtered = {}
+            gone = set()
+            wanted = chunk
+            if header_first:
+                metadata = self._get_batch(chunk, format='metadata', gone=gone)
+                self.stats.headers_fetched += len(metadata)
+                wanted = []
+                for message_id in chunk:
+                    if message_id in gone:
+                        continue
+                    message = metadata.get(message_id)
+                    # Headers unavailable: download it to be safe
+                    if message is None:
+                        wanted.append(message_id)
+                        continue
+                    headers = self._headers(message)
+                    if claims_message(headers.get('From', ''), headers.get('Subject', '')):
+                        wanted.append(message_id)
+                        continue
+                    filtered[message_id] = {
+                        'gmail_id': message_id,
+                        'raw': None,
+                        'headers': headers,
+                        'internal_date': message.get('internalDate'),
+                    }
+                    self.stats.skipped += 1
+                    self.stats.bytes_skipped += int(message.get('sizeEstimate', 0))
             
-            return {
-                'gmail_id': message_id,
-                'raw': raw_email,
-                'internal_date': message.get('internalDate'),
-            }
+            fetched = self._get_batch(wanted, gone=gone) if wanted else {}
+            for message_id in chunk:
+                if message_id in gone:
+                    yield {'gmail_id': message_id, 'raw': None, 'headers': {}, 'internal_date': None,
+                           'missing': True}
+                elif message_id in filtered:
+                    yield filtered[message_id]
+                elif message_id in fetched:
+                    email_data = self._to_email_data(message_id, fetched[message_id])
+                    self.stats.raw_fetched += 1
+                    self.stats.raw_bytes += len(email_data['raw'])
+                    yield email_data
+    
+    def _get_batch(self, chunk: List[str], format: str = 'raw', gone: Optional[set] = None) -> dict:
+        """
+        Fetch one batch (message ID -> response), retrying failed parts
+        individually. IDs Gmail answers 404 for are added to `gone`.
+        """
+        fetched = {}
+        failed = []
+        gone = set() if gone is None else gone
+        
+        def on_response(request_id, response, exception):
+            if exception is None:
+                fetched[request_id] = response
+            elif isinstance(exception, HttpError) and exception.resp.status == 404:
+                gone.add(request_id)
+            else:
+                failed.append(request_id)
+        
+        batch = self._new_batch()
+        messages = self.service.users().messages()
+        for message_id in chunk:
+            batch.add(self._get_request(message_id, messages, format), callback=on_response, request_id=message_id)
+        try:
+            batch.execute()
+        except Exception as e:
+            # The whole batch request failed: fetch its messages one by one
+            print(f"Batch of {len(chunk)} failed ({e}), retrying individually")
+            failed.extend(m for m in chunk if m not in fetched and m not in failed and m not in gone)
+        
+        for message_id in failed:
+            message = self._get_message(message_id, format, gone)
+            if message:
+                fetched[message_id] = message
+        
+        return fetched
+    
+    def _get_message(self, message_id: str, format: str = 'raw', gone: Optional[set] = None) -> Optional[dict]:
+        """messages.get for one message (retries 429/5xx with backoff); a 404 adds it to `gone`."""
+        try:
+            return self._get_request(message_id, format=format).execute(num_retries=3)
             
+        except HttpError as e:
+            if e.resp.status == 404 and gone is not None:
+                gone.add(message_id)
+                return None
+            print(f"Error fetching email {message_id}: {e}")
+            return None
         except Exception as e:
             print(f"Error fetching email {message_id}: {e}")
             return None
     
+    def _get_email_content(self, message_id: str) -> Optional[dict]:
+        """Fetch full email content by message ID."""
+        message = self._get_message(message_id)
+        return self._to_email_data(message_id, message) if message else None
+    
     def get_email_by_id(self, message_id: str) -> Optional[bytes]:
         """Get raw email bytes by Gmail message ID."""
         data = self._get_email_content(message_id)
@@ -0,0 +1,104 @@
+"""
+Worker Heartbeats
+
+Long-running workers record that they are alive in worker_heartbeats:
+- Heartbeat.beat() upserts the worker's row after every poll with its
+  outcome, the run of consecutive failures and the poll's counts
+- Heartbeat.stop() marks a graceful shutdown
+- worker_health() turns a row into ok / warning / error for /api/status
+"""
+
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import WorkerHeartbeat
+
+# Heartbeat name of scripts/payment_worker.py
+PAYMENT_WORKER = "payment-ingest"
+
+
+class Heartbeat:
+    """One worker process's heartbeat row."""
+
+    def __init__(self, worker: str):
+        self.worker = worker
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.started_at = datetime.utcnow()
+        self.last_success_at: Optional[datetime] = None
+        self.consecutive_failures = 0
+
+    def beat(self, db: Session, error: Optional[str] = None, details: Optional[dict] = None,
+             stopped: bool = False):
+        """Record a poll (failed if error is given) and commit."""
+        now = datetime.utcnow()
+        if error is not None:
+            self.consecutive_failures += 1
+        elif not stopped:
+            self.last_success_at = now
+            self.consecutive_failures = 0
+
+        values = {
+            'worker': self.worker,
+            'host': self.host,
+            'pid': self.pid,
+            'started_at': self.started_at,
+            'beat_at': now,
+            'last_success_at': self.last_success_at,
+            'last_error': error,
+            'consecutive_failures': self.consecutive_failures,
+            'details': details,
+            'stopped_at': now if stopped else None,
+        }
+        stmt = insert(WorkerHeartbeat).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkerHeartbeat.worker],
+            set_={
+                key: stmt.excluded[key] for key in values
+                # Keep the last error and poll counts through a shutdown
+                if key != 'worker' and not (stopped and key in ('last_error', 'details'))
+            },
+        )
+        db.execute(stmt)
+        db.commit()
+
+    def stop(self, db: Session):
+        """Mark a graceful shutdown."""
+        self.beat(db, stopped=True)
+
+
+def worker_health(db: Session, worker: str, stale_after: timedelta, now: Optional[datetime] = None) -> dict:
+    """
+    Status of a worker from its heartbeat:
+    - error: never ran, or no heartbeat within stale_after
+    - warning: stopped on purpose, or its latest polls failed
+    - ok otherwise
+    """
+    now = now or datetime.utcnow()
+    row = db.get(WorkerHeartbeat, worker)
+    if not row:
+        return {"status": "error", "message": "Never ran"}
+
+    info = {
+        "host": row.host,
+        "started_at": row.started_at,
+        "beat_at": row.beat_at,
+        "last_success_at": row.last_success_at,
+        "consecutive_failures": row.consecutive_failures,
+        "last_poll": row.details,
+    }
+    age = now - row.beat_at
+
+    if row.stopped_at and age <= stale_after:
+        return {"status": "warning", "message": f"Stopped at {row.stopped_at:%Y-%m-%d %H:%M:%S} UTC", **info}
+    if age > stale_after:
+        return {"status": "error", "message": f"No heartbeat for {int(age.total_seconds() // 60)} min", **info}
+    if row.consecutive_failures:
+        return {"status": "warning",
+                "message": f"{row.consecutive_failures} failed poll(s) in a row: {row.last_error}", **info}
+    return {"status": "ok", "message": f"Last poll {int(age.total_seconds())}s ago", **info}
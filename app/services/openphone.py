@@ -9,10 +9,32 @@ API Docs: https://www.openphone.com/docs/api
 """
 
 import os
+import time
+import asyncio
 import httpx
 from datetime import datetime
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+from app.core.config import get_settings
+
+
+def _h2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("Warning: OPENPHONE_HTTP2 set but h2 is not installed, using HTTP/1.1")
+        return False
+
+
+def p95(latencies: list[float]) -> float:
+    """95th percentile of send latencies (0.0 if there are none)."""
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
 
 
 @dataclass
@@ -22,14 +44,88 @@ class SmsResult:
     error: Optional[str] = None
 
 
+@dataclass
+class SmsBatchReport:
+    """Outcome of send_many(). results[i] is None if message i was never attempted."""
+    results: list[Optional[SmsResult]]
+    latencies: list[float] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for r in self.results if r and r.success)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results if r and not r.success)
+
+    @property
+    def skipped(self) -> int:
+        return sum(1 for r in self.results if r is None)
+
+    @property
+    def throughput(self) -> float:
+        """Attempted messages per second."""
+        attempted = len(self.results) - self.skipped
+        return attempted / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def p95_latency(self) -> float:
+        """95th percentile send latency in seconds."""
+        return p95(self.latencies)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` sends per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available, then take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
 class OpenPhoneService:
-    """OpenPhone API wrapper for sending SMS."""
+    """OpenPhone API wrapper for sending SMS.
+    
+    Owns one sync and one async httpx client, created on first use and kept
+    alive so consecutive messages reuse pooled TCP/TLS connections. Call
+    close() / aclose() on shutdown (FastAPI lifespan, end of scripts).
+    """
     
     BASE_URL = "https://api.openphone.com/v1"
     
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None):
         self.api_key = os.getenv("OPENPHONE_API_KEY")
         self.phone_number = os.getenv("OPENPHONE_PHONE_NUMBER", "+13127362939")
+        self.base_url = base_url or self.BASE_URL
+        
+        settings = get_settings()
+        self.timeout = settings.openphone_timeout_seconds
+        self.limits = httpx.Limits(
+            max_connections=settings.openphone_max_connections,
+            max_keepalive_connections=settings.openphone_max_keepalive_connections,
+        )
+        self.http2 = settings.openphone_http2 and _h2_available()
+        
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
         
         if not self.api_key:
             print("Warning: OPENPHONE_API_KEY not set")
@@ -40,6 +136,68 @@ class OpenPhoneService:
             "Content-Type": "application/json",
         }
     
+    def _client_options(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "headers": self._headers(),
+            "timeout": self.timeout,
+            "limits": self.limits,
+            "http2": self.http2,
+        }
+    
+    @property
+    def client(self) -> httpx.Client:
+        """Shared sync client."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.Client(**self._client_options())
+        return self._client
+    
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Shared async client for the running event loop.
+        
+        Pooled connections belong to the loop that opened them, so a new
+        loop (e.g. a second asyncio.run in a script) gets a fresh client.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client.is_closed or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+            self._async_loop = loop
+        return self._async_client
+    
+    def close(self):
+        """Close the sync client and its pooled connections."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+    
+    async def aclose(self):
+        """Close the async client and its pooled connections."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+    
+    def _payload(self, to_phone: str, message: str) -> dict:
+        return {
+            "from": self.phone_number,
+            "to": [self._normalize_phone(to_phone)],
+            "content": message,
+        }
+    
+    @staticmethod
+    def _to_result(response: httpx.Response) -> SmsResult:
+        if response.status_code in (200, 201, 202):
+            data = response.json()
+            return SmsResult(
+                success=True,
+                message_id=data.get("id") or data.get("data", {}).get("id"),
+            )
+        return SmsResult(
+            success=False,
+            error=f"API error: {response.status_code} - {response.text}",
+        )
+    
     async def send_sms(self, to_phone: str, message: str) -> SmsResult:
         """
         Send an SMS message.
@@ -54,69 +212,72 @@ class OpenPhoneService:
         if not self.api_key:
             return SmsResult(success=False, error="API key not configured")
         
-        # Normalize phone number
-        to_phone = self._normalize_phone(to_phone)
-        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/messages",
-                    headers=self._headers(),
-                    json={
-                        "from": self.phone_number,
-                        "to": [to_phone],
-                        "content": message,
-                    },
-                    timeout=30.0,
-                )
-                
-                if response.status_code in (200, 201, 202):
-                    data = response.json()
-                    return SmsResult(
-                        success=True,
-                        message_id=data.get("id") or data.get("data", {}).get("id"),
-                    )
-                else:
-                    return SmsResult(
-                        success=False,
-                        error=f"API error: {response.status_code} - {response.text}",
-                    )
-                    
+            response = await self.async_client.post("/messages", json=self._payload(to_phone, message))
+            return self._to_result(response)
         except Exception as e:
             return SmsResult(success=False, error=str(e))
     
+    async def send_many(
+        self,
+        messages: list[tuple[str, str]],
+        concurrency: int = 8,
+        rate_per_second: float = 5.0,
+        time_budget: Optional[float] = None,
+    ) -> SmsBatchReport:
+        """
+        Send many SMS messages concurrently.
+        
+        Args:
+            messages: (to_phone, message) pairs
+            concurrency: Max requests in flight at once
+            rate_per_second: Token-bucket limit on request starts
+            time_budget: Seconds for the whole batch; messages not started in
+                time are skipped (result None). A send that has started is
+                never cut off (the POST may already have reached OpenPhone,
+                and retrying it would send the SMS twice); it finishes under
+                the client's own timeout
+        
+        Returns:
+            SmsBatchReport with per-message results, latencies and timing
+        """
+        report = SmsBatchReport(results=[None] * len(messages))
+        semaphore = asyncio.Semaphore(concurrency)
+        bucket = TokenBucket(rate_per_second)
+        started = time.monotonic()
+        deadline = started + time_budget if time_budget else None
+        
+        def remaining() -> Optional[float]:
+            return deadline - time.monotonic() if deadline else None
+        
+        async def send_one(index: int, to_phone: str, message: str):
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(bucket.acquire(), timeout=remaining())
+                except asyncio.TimeoutError:
+                    return  # Budget spent before our turn: skipped
+                
+                sent_at = time.monotonic()
+                result = await self.send_sms(to_phone, message)
+                
+                report.latencies.append(time.monotonic() - sent_at)
+                report.results[index] = result
+        
+        await asyncio.gather(*(
+            send_one(i, to_phone, message) for i, (to_phone, message) in enumerate(messages)
+        ))
+        
+        report.elapsed = time.monotonic() - started
+        return report
+    
     def send_sms_sync(self, to_phone: str, message: str) -> SmsResult:
         """Synchronous version of send_sms."""
         if not self.api_key:
             return SmsResult(success=False, error="API key not configured")
         
-        to_phone = self._normalize_phone(to_phone)
-        
         try:
-            with httpx.Client() as client:
-                response = client.post(
-                    f"{self.BASE_URL}/messages",
-                    headers=self._headers(),
-                    json={
-                        "from": self.phone_number,
-                        "to": [to_phone],
-                        "content": message,
-                    },
-                    timeout=30.0,
-                )
-                
-                if response.status_code in (200, 201, 202):
-                    data = response.json()
-                    return SmsResult(
-                        success=True,
-                        message_id=data.get("id") or data.get("data", {}).get("id"),
-                    )
-                else:
-                    return SmsResult(
-                        success=False,
-                        error=f"API error: {response.status_code} - {response.text}",
-                    )
-                    
+            response = self.client.post("/messages", json=self._payload(to_phone, message))
+            return self._to_result(response)
         except Exception as e:
             return SmsResult(success=False, error=str(e))
     
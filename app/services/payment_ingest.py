@@ -0,0 +1,287 @@
+"""
+Payment Ingestion
+
+Turns parsed payment emails into payments_raw rows and ledger credits,
+shared by the cron script, the ingestion worker and the Gmail push webhook:
+- store_payment_batch() dedupes a batch in memory and with one query, then
+  inserts it with one INSERT ... ON CONFLICT DO NOTHING RETURNING and
+  posts matched credits in bulk
+- store_gmail_batch() does the same for Gmail messages and records each
+  message's outcome in processed_messages
+- poll_gmail() runs one incremental fetch-parse-store cycle, archiving
+  every downloaded email (see email_archive); cycles from different
+  processes take turns on a Postgres advisory lock
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import or_, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import PaymentRaw, LedgerType, ProcessedOutcome
+from app.services.alias_index import alias_index
+from app.services.billing import post_ledger_entries
+from app.services.email_archive import EmailArchive, default_archive
+from app.services.gmail_parser import PARSER_VERSION, parse_email, ParsedPayment
+from app.services.processed_messages import record_outcomes
+
+
+def existing_payment_keys(db: Session, payments: list[ParsedPayment],
+                          gmail_ids: list[Optional[str]]) -> tuple[set, set]:
+    """
+    Dedupe keys already stored, in one query: the (source, transaction_id)
+    pairs and the gmail_ids among those given.
+    """
+    keys = {(p.source, p.transaction_id) for p in payments if p.transaction_id}
+    ids = {gmail_id for gmail_id in gmail_ids if gmail_id}
+    
+    conditions = []
+    if keys:
+        conditions.append(tuple_(PaymentRaw.source, PaymentRaw.transaction_id).in_(keys))
+    if ids:
+        conditions.append(PaymentRaw.gmail_id.in_(ids))
+    if not conditions:
+        return set(), set()
+    
+    seen_keys, seen_ids = set(), set()
+    for row in db.query(PaymentRaw.source, PaymentRaw.transaction_id, PaymentRaw.gmail_id).filter(or_(*conditions)):
+        if row.transaction_id:
+            seen_keys.add((row.source.value, row.transaction_id))
+        if row.gmail_id:
+            seen_ids.add(row.gmail_id)
+    return seen_keys, seen_ids
+
+
+def store_payment_batch(db: Session, payments: list[ParsedPayment],
+                        gmail_ids: Optional[list[Optional[str]]] = None) -> tuple[list[Optional[UUID]], int]:
+    """
+    Store a batch of parsed payments in a fixed number of statements:
+    - one query for dedupe keys already stored; repeats within the batch
+      are dropped in memory
+    - alias matching from the in-memory index
+    - one multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING id, so a
+      payment stored concurrently by another run is skipped, not an error
+      (uq_payments_raw_source_transaction / uq_payments_raw_gmail_id)
+    - one multi-row ledger insert for the matched credits (and one balance upsert)
+    
+    Returns (payment id or None for a duplicate, per input payment; matched count).
+    """
+    gmail_ids = gmail_ids or [None] * len(payments)
+    seen_keys, seen_ids = existing_payment_keys(db, payments, gmail_ids)
+    alias_index.ensure_loaded(db)
+    
+    now = datetime.utcnow()
+    rows = []
+    payment_ids = []
+    matches = {}
+    for payment, gmail_id in zip(payments, gmail_ids):
+        key = (payment.source, payment.transaction_id)
+        if (payment.transaction_id and key in seen_keys) or (gmail_id and gmail_id in seen_ids):
+            payment_ids.append(None)
+            continue
+        if payment.transaction_id:
+            seen_keys.add(key)
+        if gmail_id:
+            seen_ids.add(gmail_id)
+        
+        driver = alias_index.match(payment.sender_name, payment.sender_identifier, payment.source)
+        payment_id = uuid4()
+        rows.append({
+            'id': payment_id,
+            'source': payment.source,
+            'sender_name': payment.sender_name,
+            'sender_identifier': payment.sender_identifier,
+            'amount': payment.amount,
+            'transaction_id': payment.transaction_id,
+            'memo': payment.memo,
+            'gmail_id': gmail_id,
+            'received_at': payment.received_at,
+            'driver_id': driver.id if driver else None,
+            'matched': driver is not None,
+            'parser_version': PARSER_VERSION,
+            'created_at': now,
+        })
+        payment_ids.append(payment_id)
+        if driver:
+            matches[payment_id] = (payment, driver)
+    
+    inserted = set()
+    if rows:
+        inserted = set(db.execute(
+            insert(PaymentRaw).values(rows).on_conflict_do_nothing().returning(PaymentRaw.id)
+        ).scalars())
+    
+    credits = [
+        {
+            'driver_id': driver.id,
+            'type': LedgerType.credit,
+            'amount': payment.amount,
+            'description': f"{payment.source.upper()} payment from {payment.sender_name}",
+            'reference_id': payment_id,
+        }
+        for payment_id, (payment, driver) in matches.items() if payment_id in inserted
+    ]
+    post_ledger_entries(db, credits)
+    
+    return [payment_id if payment_id in inserted else None for payment_id in payment_ids], len(credits)
+
+
+def store_gmail_batch(db: Session, parsed: list[tuple[str, Optional[ParsedPayment]]]) -> tuple[int, int]:
+    """
+    Store the payments among (gmail_id, payment or None) pairs and record
+    every message's outcome in processed_messages. Not committed here.
+    
+    Returns (stored, matched).
+    """
+    payments = [(gmail_id, payment) for gmail_id, payment in parsed if payment]
+    payment_ids, matched = store_payment_batch(
+        db, [payment for _, payment in payments], [gmail_id for gmail_id, _ in payments]
+    )
+    stored = dict(zip((gmail_id for gmail_id, _ in payments), payment_ids))
+    
+    outcomes = []
+    for gmail_id, payment in parsed:
+        if not payment:
+            outcomes.append((gmail_id, ProcessedOutcome.unparsed, None))
+        elif stored[gmail_id]:
+            outcomes.append((gmail_id, ProcessedOutcome.stored, stored[gmail_id]))
+        else:
+            print(f"  Skipping duplicate: {payment.source} {payment.transaction_id or gmail_id}")
+            outcomes.append((gmail_id, ProcessedOutcome.duplicate, None))
+    record_outcomes(db, outcomes)
+    
+    return sum(1 for payment_id in payment_ids if payment_id), matched
+
+
+@dataclass
+class PollResult:
+    """Totals for one poll of the mailbox."""
+    emails: int = 0
+    stored: int = 0
+    matched: int = 0
+    already_processed: int = 0
+
+
+# pg_advisory_lock key held while a poll_gmail() cycle runs
+GMAIL_POLL_LOCK_ID = 0x676D61696C  # "gmail"
+
+
+@contextmanager
+def gmail_poll_lock(db: Session):
+    """
+    Hold a Postgres advisory lock for the duration of the block, blocking
+    while another process holds it.
+    
+    The lock lives on its own connection: poll_gmail() commits every chunk,
+    which would release a transaction-level lock (or a FOR UPDATE row lock)
+    and hand the session's connection back to the pool.
+    """
+    with db.get_bind().connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": GMAIL_POLL_LOCK_ID})
+        conn.commit()  # session-level lock: don't sit idle in a transaction
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": GMAIL_POLL_LOCK_ID})
+            conn.commit()
+
+
+def poll_gmail(gmail, db: Session, hours: int = 1, full: bool = False, commit_every: int = 50,
+               archive: Optional[EmailArchive] = None) -> PollResult:
+    """
+    One pass over the mailbox with an already connected GmailService.
+    
+    By default only messages added since the last poll (historyId cursor in
+    gmail_sync_state); `hours` is the look-back for the very first run.
+    With full=True, search the last `hours` hours like before (every page,
+    so --full --hours 720 backfills a whole month).
+    
+    Emails are streamed: downloaded a batch at a time, parsed as they
+    arrive and committed every `commit_every` emails, so memory stays flat
+    and an interrupted poll keeps what it stored (re-runs skip duplicates).
+    Raw emails go to `archive` (default: EMAIL_ARCHIVE_DIR) before they
+    are parsed. Errors propagate; the caller rolls back.
+    
+    The worker, the cron script and the push webhook may poll at the same
+    time from different processes; they wait for each other on
+    gmail_poll_lock() so two cycles never download and store the same
+    messages or race on the sync cursor.
+    """
+    with gmail_poll_lock(db):
+        return _poll_gmail(gmail, db, hours, full, commit_every, archive)
+
+
+def _poll_gmail(gmail, db: Session, hours: int, full: bool, commit_every: int,
+                archive: Optional[EmailArchive]) -> PollResult:
+    from app.services.gmail_service import FetchStats
+    
+    gmail.stats = FetchStats()
+    archive = archive or default_archive()
+    result = PollResult()
+    chunk = []
+    gone = []
+    
+    def flush_chunk():
+        chunk_stored, chunk_matched = store_gmail_batch(db, chunk)
+        record_outcomes(db, [(gmail_id, ProcessedOutcome.missing, None) for gmail_id in gone])
+        db.commit()
+        result.stored += chunk_stored
+        result.matched += chunk_matched
+        chunk.clear()
+        gone.clear()
+    
+    sync = None
+    if full:
+        emails = gmail.stream_emails(since_hours=hours, db=db)
+    else:
+        sync = gmail.sync_emails(db, initial_hours=hours)
+        emails = sync.emails
+        result.already_processed = sync.skipped
+        print(f"Found {len(sync.message_ids)} new emails ({sync.skipped} already processed)")
+    
+    alias_index.refresh(db)
+    for email_data in emails:
+        result.emails += 1
+        if email_data.get('missing'):
+            # Deleted from Gmail since it was listed: handled, nothing to parse
+            print(f"\nEmail {email_data['gmail_id']} no longer exists in Gmail")
+            gone.append(email_data['gmail_id'])
+            continue
+        
+        payment = None
+        # raw is None for messages the header prefilter ruled out
+        if email_data['raw'] is not None:
+            print(f"\nProcessing email {email_data['gmail_id']}...")
+            if archive:
+                try:
+                    archive.put(email_data['gmail_id'], email_data['raw'])
+                except OSError as e:
+                    print(f"  Could not archive: {e}")
+            payment = parse_email(email_data['raw'])
+            if payment:
+                print(f"  Parsed: {payment.source} ${payment.amount:.2f} from {payment.sender_name}")
+        chunk.append((email_data['gmail_id'], payment))
+        if len(chunk) >= commit_every:
+            flush_chunk()
+            print(f"  Committed {result.emails} emails so far")
+    
+    if chunk or gone:
+        flush_chunk()
+    # Cursor commits once everything it covers is stored
+    if sync:
+        gmail.save_sync_state(db, sync)
+    db.commit()
+    print(f"\nDone! {result.emails} emails, processed {result.stored} new payments ({result.matched} matched)")
+    
+    stats = gmail.stats
+    if stats.headers_fetched:
+        print(f"Header-first fetch: {stats.skipped} of {stats.headers_fetched} emails ruled out on headers, "
+              f"{stats.bytes_skipped / 1024:,.0f} KB not downloaded "
+              f"({stats.raw_fetched} downloaded raw, {stats.raw_bytes / 1024:,.0f} KB)")
+    
+    return result
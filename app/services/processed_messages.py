@@ -0,0 +1,90 @@
+"""
+Processed Messages
+
+Ledger of every Gmail message the payment parser has handled, so the
+five-minute poll never downloads the same message twice:
+- unprocessed_ids() / skip_processed() drop known IDs with one anti-join
+  per chunk, before anything is downloaded
+- record_outcomes() stores what happened to each message (stored,
+  duplicate, unparsed, or missing from Gmail) with the parser version
+  that handled it
+- Unparsed messages are admitted again once PARSER_VERSION is bumped, so
+  a parser fix picks up the emails it used to miss
+"""
+
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+from uuid import UUID
+
+from sqlalchemy import String, bindparam, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm import Session
+
+from app.models import ProcessedMessage, ProcessedOutcome
+from app.services.gmail_parser import PARSER_VERSION
+
+# IDs per anti-join query (one messages.list page)
+CHUNK_SIZE = 500
+
+
+def unprocessed_ids(db: Session, message_ids: List[str]) -> List[str]:
+    """The message IDs not handled yet (or unparsed by an older parser), in input order."""
+    if not message_ids:
+        return []
+
+    ids = func.unnest(
+        bindparam('message_ids', message_ids, type_=ARRAY(String))
+    ).table_valued('gmail_id', with_ordinality='position').render_derived()
+
+    done = exists().where(
+        ProcessedMessage.gmail_id == ids.c.gmail_id,
+        or_(
+            ProcessedMessage.outcome != ProcessedOutcome.unparsed,
+            ProcessedMessage.parser_version >= PARSER_VERSION,
+        ),
+    )
+    return db.execute(
+        select(ids.c.gmail_id).where(~done).order_by(ids.c.position)
+    ).scalars().all()
+
+
+def skip_processed(db: Session, message_ids: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Lazy unprocessed_ids() for a stream of IDs, one query per chunk."""
+    message_ids = iter(message_ids)
+    while True:
+        chunk = list(islice(message_ids, chunk_size))
+        if not chunk:
+            return
+        yield from unprocessed_ids(db, chunk)
+
+
+def record_outcomes(db: Session, outcomes: list[tuple[str, ProcessedOutcome, Optional[UUID]]]):
+    """
+    Upsert (gmail_id, outcome, payment_id) for many messages in one statement
+    (not committed here). A repeated gmail_id keeps its last outcome.
+    """
+    rows = {
+        gmail_id: {
+            'gmail_id': gmail_id,
+            'outcome': outcome,
+            'parser_version': PARSER_VERSION,
+            'payment_id': payment_id,
+            'processed_at': datetime.utcnow(),
+        }
+        for gmail_id, outcome, payment_id in outcomes
+    }
+    if not rows:
+        return
+
+    stmt = insert(ProcessedMessage).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProcessedMessage.gmail_id],
+        set_={
+            "outcome": stmt.excluded.outcome,
+            "parser_version": stmt.excluded.parser_version,
+            "payment_id": stmt.excluded.payment_id,
+            "processed_at": stmt.excluded.processed_at,
+        },
+    )
+    db.execute(stmt)
@@ -0,0 +1,144 @@
+"""
+Payment Reparse
+
+Compares stored payments_raw rows with what the current parsers make of
+the same raw emails (from the email archive), after a parser change:
+- diff_payment() compares one row with a fresh ParsedPayment field by field
+- apply_corrections() writes corrected fields back in batched UPDATEs,
+  stamps parser_version, and posts a ledger adjustment when the amount of
+  a matched payment changed
+"""
+
+from dataclasses import dataclass, field
+from datetime import timezone
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import Session
+
+from app.models import LedgerType, PaymentRaw, PaymentSource
+from app.services.billing import post_ledger_entries
+from app.services.gmail_parser import PARSER_VERSION, ParsedPayment
+
+# payments_raw columns the parsers fill
+FIELDS = ('source', 'amount', 'sender_name', 'sender_identifier', 'transaction_id', 'memo', 'received_at')
+
+
+@dataclass
+class Correction:
+    """A stored row and the fields the current parsers disagree on: field -> (stored, reparsed)."""
+    payment_id: UUID
+    changes: dict = field(default_factory=dict)
+    driver_id: Optional[UUID] = None
+
+
+def _parsed_value(payment: ParsedPayment, name: str):
+    """A parsed field as payments_raw would store it."""
+    value = getattr(payment, name)
+    if name == 'amount':
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    if name == 'received_at' and value is not None and value.tzinfo is not None:
+        # Stored as naive UTC: the driver converts an aware datetime to the
+        # session time zone (UTC) before the offset is dropped
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def diff_payment(row: PaymentRaw, payment: ParsedPayment) -> dict:
+    """Fields where the stored row differs from the reparsed payment: field -> (stored, reparsed)."""
+    changes = {}
+    for name in FIELDS:
+        stored = getattr(row, name)
+        if name == 'source':
+            stored = stored.value
+        reparsed = _parsed_value(payment, name)
+        if stored != reparsed:
+            changes[name] = (stored, reparsed)
+    return changes
+
+
+def conflicting_keys(db: Session, corrections: list[Correction]) -> set[UUID]:
+    """
+    Corrections whose new (source, transaction_id) already belongs to another
+    row (or to an earlier correction in the list), which
+    uq_payments_raw_source_transaction would reject. Two queries.
+    """
+    rekeyed = {
+        c.payment_id: c.changes for c in corrections
+        if 'source' in c.changes or 'transaction_id' in c.changes
+    }
+    if not rekeyed:
+        return set()
+
+    # The unchanged half of a key comes from the row itself
+    keys = {}
+    rows = db.query(PaymentRaw.id, PaymentRaw.source, PaymentRaw.transaction_id).filter(PaymentRaw.id.in_(rekeyed))
+    for payment_id, source, transaction_id in rows:
+        changes = rekeyed[payment_id]
+        key = (changes['source'][1] if 'source' in changes else source.value,
+               changes['transaction_id'][1] if 'transaction_id' in changes else transaction_id)
+        if key[1]:
+            keys[payment_id] = key
+    if not keys:
+        return set()
+
+    taken = {
+        (source.value, transaction_id): payment_id
+        for payment_id, source, transaction_id in db.query(
+            PaymentRaw.id, PaymentRaw.source, PaymentRaw.transaction_id
+        ).filter(tuple_(PaymentRaw.source, PaymentRaw.transaction_id).in_(set(keys.values())))
+    }
+    conflicts = set()
+    for payment_id, key in keys.items():
+        if taken.setdefault(key, payment_id) != payment_id:
+            conflicts.add(payment_id)
+    return conflicts
+
+
+def apply_corrections(db: Session, corrections: list[Correction], reparsed_ids: list[UUID] = ()) -> int:
+    """
+    Write a batch of corrections (not committed here):
+    - one executemany UPDATE by primary key for the corrected fields
+    - parser_version set to PARSER_VERSION on the corrected rows and on
+      reparsed_ids (rows the current parsers reproduce unchanged)
+    - one bulk ledger post of the differences for matched payments whose
+      amount changed
+
+    Returns the number of rows corrected.
+    """
+    if reparsed_ids:
+        db.execute(
+            update(PaymentRaw).where(PaymentRaw.id.in_(list(reparsed_ids))).values(parser_version=PARSER_VERSION)
+        )
+    if not corrections:
+        return 0
+
+    # executemany needs the same columns in every row, so group by changed fields
+    groups: dict[tuple, list[dict]] = {}
+    for correction in corrections:
+        values = {name: new for name, (_, new) in correction.changes.items()}
+        if 'source' in values:
+            values['source'] = PaymentSource(values['source'])
+        values['parser_version'] = PARSER_VERSION
+        groups.setdefault(tuple(sorted(values)), []).append({'id': correction.payment_id, **values})
+    for rows in groups.values():
+        db.execute(update(PaymentRaw), rows)
+
+    adjustments = []
+    for correction in corrections:
+        if 'amount' not in correction.changes or not correction.driver_id:
+            continue
+        old, new = correction.changes['amount']
+        delta = new - old
+        adjustments.append({
+            'driver_id': correction.driver_id,
+            'type': LedgerType.credit if delta > 0 else LedgerType.debit,
+            'amount': abs(delta),
+            'description': f"Payment amount corrected from ${old:.2f} to ${new:.2f}",
+            'reference_id': correction.payment_id,
+        })
+    post_ledger_entries(db, adjustments)
+
+    return len(corrections)
@@ -0,0 +1,224 @@
+"""
+SMS Outbox Service
+
+Transactional outbox for SMS:
+- enqueue_sms() adds a message to sms_outbox in the caller's transaction,
+  so it is only sent if the triggering change commits
+- claim_batch() leases pending messages with FOR UPDATE SKIP LOCKED, so any
+  number of workers can drain the outbox in parallel
+- drain_batch() / drain() send claimed messages via OpenPhone, retry failures
+  with exponential backoff and write the final outcome to sms_log; drain()
+  stops once its time budget for the whole run is spent
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models import SmsOutbox, SmsOutboxStatus, SmsLog
+from app.services.openphone import openphone, p95
+
+
+@dataclass
+class DrainReport:
+    """Totals over one or more drained batches."""
+    sent: int = 0
+    retrying: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def attempted(self) -> int:
+        return self.sent + self.retrying + self.failed
+
+    @property
+    def throughput(self) -> float:
+        """Attempted messages per second of send time."""
+        return self.attempted / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def p95_latency(self) -> float:
+        """95th percentile send latency in seconds."""
+        return p95(self.latencies)
+
+
+def enqueue_sms(db: Session, phone: str, message: str, driver_id: Optional[UUID] = None) -> SmsOutbox:
+    """Queue an SMS. Not committed here: it commits with the caller's change."""
+    outbox = SmsOutbox(
+        id=uuid4(),
+        driver_id=driver_id,
+        phone=phone,
+        message=message,
+        status=SmsOutboxStatus.pending,
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(outbox)
+    return outbox
+
+
+def claim_batch(db: Session, limit: int, lease: timedelta) -> list:
+    """
+    Lease up to `limit` due messages in one statement and commit the claim.
+
+    Rows locked by another worker are skipped rather than waited on. A
+    'sending' row whose lease ran out (its worker died) is claimable again.
+
+    Returns rows of (id, driver_id, phone, message, attempts).
+    """
+    now = datetime.utcnow()
+
+    due = select(SmsOutbox.id).where(
+        or_(
+            and_(SmsOutbox.status == SmsOutboxStatus.pending, SmsOutbox.next_attempt_at <= now),
+            and_(SmsOutbox.status == SmsOutboxStatus.sending, SmsOutbox.locked_until < now),
+        )
+    ).order_by(SmsOutbox.next_attempt_at).limit(limit).with_for_update(skip_locked=True)
+
+    rows = db.execute(
+        update(SmsOutbox)
+        .where(SmsOutbox.id.in_(due.scalar_subquery()))
+        .values(
+            status=SmsOutboxStatus.sending,
+            locked_until=now + lease,
+            attempts=SmsOutbox.attempts + 1,
+            updated_at=now,
+        )
+        .returning(SmsOutbox.id, SmsOutbox.driver_id, SmsOutbox.phone, SmsOutbox.message, SmsOutbox.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    db.commit()
+    return rows
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter: base, 2x base, 4x base ... capped at a day."""
+    base = get_settings().sms_retry_base_seconds
+    seconds = min(base * 2 ** (attempts - 1), 86400)
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+def _log_outcome(row, status: str, message_id: Optional[str], error: Optional[str], now: datetime) -> dict:
+    """sms_log row for a final outcome."""
+    return {
+        'id': uuid4(),
+        'driver_id': row.driver_id,
+        'phone': row.phone,
+        'message': row.message,
+        'status': status,
+        'openphone_response': {'message_id': message_id, 'error': error, 'outbox_id': str(row.id)},
+        'created_at': now,
+    }
+
+
+async def drain_batch(db: Session, report: Optional[DrainReport] = None,
+                      deadline: Optional[float] = None) -> DrainReport:
+    """
+    Claim one batch, send it concurrently and record the results.
+
+    deadline (a time.monotonic() value) caps the sends, and once it has
+    passed nothing is claimed. Without one the batch gets
+    sms_time_budget_seconds of its own.
+    """
+    settings = get_settings()
+    report = report or DrainReport()
+
+    if deadline is None:
+        time_budget = settings.sms_time_budget_seconds
+    else:
+        time_budget = deadline - time.monotonic()
+        if time_budget <= 0:
+            return report
+
+    rows = claim_batch(
+        db,
+        limit=settings.sms_outbox_batch_size,
+        lease=timedelta(seconds=settings.sms_outbox_lease_seconds),
+    )
+    if not rows:
+        return report
+
+    batch = await openphone.send_many(
+        [(row.phone, row.message) for row in rows],
+        concurrency=settings.sms_concurrency,
+        rate_per_second=settings.sms_rate_per_second,
+        time_budget=time_budget,
+    )
+
+    now = datetime.utcnow()
+    updates = []
+    logs = []
+    for row, result in zip(rows, batch.results):
+        update_row = {
+            'id': row.id,
+            'status': SmsOutboxStatus.pending,
+            'attempts': row.attempts,
+            'next_attempt_at': now,
+            'locked_until': None,
+            'last_error': None,
+            'message_id': None,
+            'sent_at': None,
+            'updated_at': now,
+        }
+
+        if result is None:
+            # Never attempted (time budget): straight back in the queue, attempt not counted
+            update_row['attempts'] = row.attempts - 1
+        elif result.success:
+            update_row.update(status=SmsOutboxStatus.sent, message_id=result.message_id, sent_at=now)
+            report.sent += 1
+            if row.driver_id:
+                logs.append(_log_outcome(row, 'sent', result.message_id, None, now))
+        elif row.attempts >= settings.sms_max_attempts:
+            update_row.update(status=SmsOutboxStatus.failed, last_error=result.error)
+            report.failed += 1
+            if row.driver_id:
+                logs.append(_log_outcome(row, 'failed', None, result.error, now))
+        else:
+            update_row.update(last_error=result.error, next_attempt_at=now + retry_delay(row.attempts))
+            report.retrying += 1
+
+        updates.append(update_row)
+
+    # One bulk UPDATE by primary key, one bulk INSERT into sms_log
+    db.execute(update(SmsOutbox), updates)
+    if logs:
+        db.execute(insert(SmsLog), logs)
+    db.commit()
+
+    report.elapsed += batch.elapsed
+    report.latencies.extend(batch.latencies)
+    return report
+
+
+async def drain(db: Session, max_batches: Optional[int] = None,
+                time_budget: Optional[float] = None) -> DrainReport:
+    """
+    Drain batches until nothing is due, max_batches is reached or the time
+    budget for the whole run (default sms_time_budget_seconds) is spent.
+    Every batch shares the one deadline; messages not sent in time stay
+    queued for the next run or the worker.
+    """
+    if time_budget is None:
+        time_budget = get_settings().sms_time_budget_seconds
+    deadline = time.monotonic() + time_budget
+    report = DrainReport()
+    batches = 0
+
+    while (max_batches is None or batches < max_batches) and time.monotonic() < deadline:
+        attempted = report.attempted
+        await drain_batch(db, report, deadline)
+        batches += 1
+        if report.attempted == attempted:
+            break
+
+    return report
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Gmail Batch Downloads
+
+Runs GmailService against the local stand-in for the Gmail API
+(tests/gmail_stand_in.py), and compares fetching messages one
+messages.get per HTTP request (the old behaviour) with get_emails()
+(batched), and the peak memory of get_emails() with streaming the same
+messages through iter_emails() (search results paged). The stand-in can
+fail parts of a batch with 429 on their first attempt, to exercise the
+individual retries; the run fails if any message is missing or differs.
+
+--latency-ms adds a delay to every HTTP request the stand-in answers, to
+approximate the round trip to Google.
+
+Usage:
+    python scripts/bench_gmail_batch.py
+    python scripts/bench_gmail_batch.py --messages 500 --latency-ms 80 --fail-every 7
+"""
+
+import sys
+import os
+import time
+import threading
+import tracemalloc
+from http.server import ThreadingHTTPServer
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httplib2
+from googleapiclient.discovery import build
+from app.services.gmail_service import GmailService
+from tests.gmail_stand_in import StandInGmail, make_handler
+
+
+def run_benchmark(messages: int, latency_ms: float, fail_every: int):
+    gmail = StandInGmail(messages, latency_ms / 1000, fail_every)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(gmail))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+
+    service = build(
+        "gmail", "v1", http=httplib2.Http(), static_discovery=True,
+        client_options={"api_endpoint": base_url},
+    )
+    client = GmailService(service=service, batch_uri=base_url + "batch/gmail/v1", header_first=False)
+
+    try:
+        ids = list(client.iter_message_ids("", page_size=100))
+
+        # Old behaviour: one messages.get per HTTP request
+        gmail.http_requests = 0
+        start = time.perf_counter()
+        sequential = [client._get_email_content(message_id) for message_id in ids]
+        sequential_seconds = time.perf_counter() - start
+        sequential_requests = gmail.http_requests
+
+        gmail.http_requests = 0
+        start = time.perf_counter()
+        batched = client.get_emails(ids)
+        batched_seconds = time.perf_counter() - start
+        batched_requests = gmail.http_requests
+        retries = len(gmail.failed_once)
+
+        # Peak memory (untimed, tracemalloc is slow): the whole list at once
+        # vs streaming pages of IDs and batches of emails, each dropped once checked
+        tracemalloc.start()
+        client.get_emails(ids)
+        listed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        streamed = []
+        tracemalloc.start()
+        for email_data in client.iter_emails(client.iter_message_ids("", page_size=100)):
+            streamed.append((email_data["gmail_id"], email_data["raw"] == gmail.messages[email_data["gmail_id"]]))
+        streamed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        expected = [(m, gmail.messages[m]) for m in ids]
+        for label, result in (("sequential", sequential), ("batched", batched)):
+            got = [(e["gmail_id"], e["raw"]) for e in result if e]
+            if got != expected:
+                raise SystemExit(f"{label}: {len(got)} of {len(expected)} messages came back intact")
+        if streamed != [(m, True) for m in ids]:
+            raise SystemExit(f"streamed: {sum(ok for _, ok in streamed)} of {len(ids)} messages came back intact")
+
+        print(f"{messages} messages, {latency_ms:.0f} ms per HTTP request, "
+              f"{retries} batch parts rate-limited once")
+        print(f"  One per request: {sequential_seconds:7.2f}s  {sequential_requests:5d} HTTP requests")
+        print(f"  Batched:         {batched_seconds:7.2f}s  {batched_requests:5d} HTTP requests "
+              f"({batched_requests - retries} batches + {retries} retries)")
+        print(f"  Speedup:         {sequential_seconds / batched_seconds:7.1f}x")
+        print(f"  Peak memory:     {listed_peak / 1e6:7.1f} MB get_emails(), "
+              f"{streamed_peak / 1e6:.1f} MB streamed (iter_emails)")
+
+    finally:
+        server.shutdown()
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --messages 500."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        messages=int(_arg('--messages', '200')),
+        latency_ms=float(_arg('--latency-ms', '50')),
+        fail_every=int(_arg('--fail-every', '10')),
+    )
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Header-First Gmail Fetch
+
+Serves a mailbox like the real one from the local Gmail stand-in (see
+tests/gmail_stand_in.py): payment notifications mixed with mail from the same
+senders that no parser keeps ("You sent ...", "You paid ...", privacy
+notices), all with the providers' heavy HTML. Downloads it with
+iter_emails() raw-only and header-first, checks both yield the same
+payment emails, and reports HTTP requests, time and bytes downloaded.
+
+Usage:
+    python scripts/bench_gmail_header_first.py
+    python scripts/bench_gmail_header_first.py --messages 1000 --payment-share 0.3 --latency-ms 80
+"""
+
+import sys
+import os
+import time
+import threading
+from http.server import ThreadingHTTPServer
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httplib2
+from googleapiclient.discovery import build
+from app.services.gmail_parser import parse_email
+from app.services.gmail_service import GmailService
+from tests.gmail_stand_in import StandInGmail, make_handler
+from tests.sample_emails import NOISE, SAMPLES, build_email, build_notification
+
+
+def build_mailbox(messages: int, payment_share: float) -> list[bytes]:
+    """payment_share of the messages are payments, spread evenly; the rest is noise."""
+    providers = list(SAMPLES)
+    mailbox = []
+    payments = 0
+    for i in range(messages):
+        if payments < payment_share * (i + 1):
+            mailbox.append(build_email(providers[payments % len(providers)]))
+            payments += 1
+        else:
+            from_addr, subject, content = NOISE[i % len(NOISE)]
+            mailbox.append(build_notification(from_addr, subject, content, f"noise-{i}"))
+    return mailbox
+
+
+def run_benchmark(messages: int, payment_share: float, latency_ms: float):
+    gmail = StandInGmail(messages, latency_ms / 1000, fail_every=0,
+                         mailbox=build_mailbox(messages, payment_share))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(gmail))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+
+    service = build(
+        "gmail", "v1", http=httplib2.Http(), static_discovery=True,
+        client_options={"api_endpoint": base_url},
+    )
+
+    try:
+        ids = list(gmail.messages)
+        results = {}
+        print(f"{messages} messages, {payment_share:.0%} payments, {latency_ms:.0f} ms per HTTP request")
+        for label, header_first in (("raw only", False), ("header-first", True)):
+            client = GmailService(service=service, batch_uri=base_url + "batch/gmail/v1", header_first=header_first)
+            gmail.http_requests = 0
+            start = time.perf_counter()
+            emails = list(client.iter_emails(ids))
+            seconds = time.perf_counter() - start
+
+            payments = [(e["gmail_id"], parse_email(e["raw"])) for e in emails if e["raw"] is not None]
+            results[label] = [(m, p.transaction_id) for m, p in payments if p]
+            print(f"  {label:13} {seconds:6.2f}s  {gmail.http_requests:4d} HTTP requests  "
+                  f"{client.stats.raw_fetched:5d} downloaded raw ({client.stats.raw_bytes / 1024:,.0f} KB)  "
+                  f"{client.stats.skipped:5d} ruled out on headers ({client.stats.bytes_skipped / 1024:,.0f} KB saved)")
+
+        if results["raw only"] != results["header-first"]:
+            raise SystemExit("header-first fetch lost or changed payment emails")
+        print(f"  Same {len(results['raw only'])} payments parsed either way")
+
+    finally:
+        server.shutdown()
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --messages 500."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        messages=int(_arg('--messages', '300')),
+        payment_share=float(_arg('--payment-share', '0.25')),
+        latency_ms=float(_arg('--latency-ms', '50')),
+    )
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Payment Email Parsing
+
+Takes the sample email per provider (tests/sample_emails.py: HTML with a
+large <head> of styles and a legal footer, like the real notifications),
+checks each one parses to the expected payment, then reports:
+- parse_email() throughput per provider (emails/sec)
+- time per registered pattern (gmail_parser.PATTERNS), searched over the
+  HTML from <body> on (payment_region()) and over the compact text view
+  the body patterns run on (EmailView.text)
+
+Usage:
+    python scripts/bench_gmail_parser.py
+    python scripts/bench_gmail_parser.py --iterations 5000
+"""
+
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email import policy
+from email.parser import BytesParser
+from app.services.gmail_parser import PATTERNS, EmailView, parse_email
+from tests.sample_emails import SAMPLES, build_email, parse_rate, pattern_time
+
+
+def check(provider: str, raw: bytes):
+    """Fail loudly if a sample no longer parses to what it should."""
+    expected = SAMPLES[provider][3]
+    payment = parse_email(raw)
+    got = (payment.amount, payment.sender_name, payment.transaction_id) if payment else None
+    if got != expected:
+        raise SystemExit(f"{provider}: expected {expected}, parsed {got}")
+
+
+def run_benchmark(iterations: int):
+    for provider in SAMPLES:
+        raw = build_email(provider)
+        check(provider, raw)
+
+        msg = BytesParser(policy=policy.default).parsebytes(raw)
+        view = EmailView(msg)
+        body = msg.get_body(preferencelist=('html',)).get_content()
+        subject = view.subject
+
+        rate = parse_rate(raw, iterations)
+        print(f"\n{provider}: {rate:,.0f} emails/sec "
+              f"(body {len(body):,} chars, from <body> {len(view.html):,}, text view {len(view.text):,})")
+        print(f"  {'pattern':32} {'html':>12} {'text':>12}")
+
+        for name in PATTERNS:
+            if not name.startswith(provider + '.'):
+                continue
+            if '.subject' in name:
+                per_call = pattern_time(name, subject, iterations)
+                print(f"  {name:32} {'(subject)':>12} {per_call:10.2f}us")
+                continue
+            html = pattern_time(name, view.html, iterations)
+            text = pattern_time(name, view.text, iterations)
+            print(f"  {name:32} {html:10.2f}us {text:10.2f}us")
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --iterations 5000."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    run_benchmark(iterations=int(_arg('--iterations', '1000')))
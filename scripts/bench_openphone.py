@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark: OpenPhone Client Pooling
+
+Sends messages to a local stand-in for the OpenPhone API and compares
+per-message latency of a new httpx client per message (the old behaviour)
+against OpenPhoneService's pooled, keep-alive clients.
+
+With --tls the stand-in serves HTTPS with a throwaway self-signed certificate,
+so the numbers include the TLS handshake the pool saves in production.
+
+Usage:
+    python scripts/bench_openphone.py
+    python scripts/bench_openphone.py --messages 500 --tls
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import ssl
+import tempfile
+import threading
+import statistics
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENPHONE_API_KEY", "bench-key-not-real")
+
+import httpx
+from app.services.openphone import OpenPhoneService
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Accepts POST /v1/messages like OpenPhone and answers 202."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps({"data": {"id": "AC-bench"}}).encode()
+        self.send_response(202)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _self_signed_cert(directory: str) -> tuple[str, str]:
+    """Write a self-signed cert/key for 127.0.0.1 and return their paths."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    import ipaddress
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(datetime.utcnow() + timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+def start_stand_in(tls: bool, workdir: str) -> tuple[ThreadingHTTPServer, str]:
+    """Start the stand-in server on a free port and return (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    scheme = "http"
+
+    if tls:
+        cert_path, key_path = _self_signed_cert(workdir)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        # httpx trusts SSL_CERT_FILE, so both clients verify against our cert
+        os.environ["SSL_CERT_FILE"] = cert_path
+        scheme = "https"
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def unpooled_send_sync(service: OpenPhoneService, to_phone: str, message: str):
+    """The old send_sms_sync: a fresh client, and connection, per message."""
+    with httpx.Client() as client:
+        client.post(
+            f"{service.base_url}/messages",
+            headers=service._headers(),
+            json=service._payload(to_phone, message),
+            timeout=30.0,
+        )
+
+
+async def unpooled_send_async(service: OpenPhoneService, to_phone: str, message: str):
+    """The old send_sms: a fresh async client, and connection, per message."""
+    async with httpx.AsyncClient() as client:
+        await client.post(
+            f"{service.base_url}/messages",
+            headers=service._headers(),
+            json=service._payload(to_phone, message),
+            timeout=30.0,
+        )
+
+
+def _timed(fn, count: int) -> list[float]:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _timed_async(fn, count: int) -> list[float]:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _report(label: str, latencies: list[float]):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    print(f"  {label:<22} mean {statistics.mean(latencies) * 1000:7.2f} ms   "
+          f"p95 {p95 * 1000:7.2f} ms")
+
+
+def run_benchmark(messages: int, tls: bool):
+    """Time each client strategy sending `messages` SMS one after another."""
+    with tempfile.TemporaryDirectory() as workdir:
+        server, base_url = start_stand_in(tls, workdir)
+        service = OpenPhoneService(base_url=base_url)
+        phone, text = "3125550100", "Benchmark message"
+
+        print(f"Sending {messages} messages per strategy to {base_url}")
+
+        try:
+            print("\n--- Sync ---")
+            _report("new client per message", _timed(lambda: unpooled_send_sync(service, phone, text), messages))
+            _report("pooled client", _timed(lambda: service.send_sms_sync(phone, text), messages))
+
+            async def run_async():
+                try:
+                    print("\n--- Async ---")
+                    _report("new client per message",
+                            await _timed_async(lambda: unpooled_send_async(service, phone, text), messages))
+                    _report("pooled client",
+                            await _timed_async(lambda: service.send_sms(phone, text), messages))
+                finally:
+                    await service.aclose()
+
+            asyncio.run(run_async())
+
+        finally:
+            service.close()
+            server.shutdown()
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --messages 200."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    run_benchmark(messages=int(_arg('--messages', '200')), tls='--tls' in sys.argv)
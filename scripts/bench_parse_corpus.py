@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark: End-to-End Parsing of a Synthetic Corpus
+
+Runs a corpus of generated payment emails (see generate_payment_emails.py;
+generated in memory, or read from a directory it wrote) through
+parse_email() and reports:
+- throughput: emails/sec and MB/sec overall and per provider, and
+  per-email latency percentiles
+- memory: tracemalloc peak while parsing a single email (untimed pass)
+- characters the registered patterns covered per email, body decoding
+  included (untimed pass)
+- accuracy: share of fields parsed exactly as the ground truth, per
+  provider and field, and which variants (layout, encoding, charset,
+  structure, weight) the misses come from
+
+Exits non-zero if field accuracy is below --min-accuracy (default 1.0,
+every field of every email), so a parser change that breaks a layout or
+an encoding is caught.
+
+Usage:
+    python scripts/bench_parse_corpus.py
+    python scripts/bench_parse_corpus.py --messages 5000 --seed 7
+    python scripts/bench_parse_corpus.py --corpus corpus --min-accuracy 0.99
+"""
+
+import sys
+import os
+import json
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from dataclasses import asdict
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import gmail_parser
+from app.services.gmail_parser import parse_email
+from tests.payment_corpus import FIELDS, PROVIDERS, generate_corpus, parsed_fields
+
+# Misses printed in full; the counts cover all of them
+SAMPLE_MISSES = 10
+
+
+def load_corpus(directory: str) -> list[tuple[str, bytes, dict, dict]]:
+    """(file name, raw, variant, expected) for a directory written by generate_payment_emails.py."""
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        manifest = json.load(f)
+    corpus = []
+    for name, entry in manifest['messages'].items():
+        with open(os.path.join(directory, name), 'rb') as f:
+            corpus.append((name, f.read(), entry['variant'], entry['expected']))
+    return corpus
+
+
+class _CountingPattern:
+    """Stands in for a registered pattern and counts the characters each search or sub covers."""
+
+    def __init__(self, pattern, counter: list):
+        self.pattern = pattern
+        self.counter = counter
+
+    def search(self, text, *args):
+        self.counter[0] += len(text)
+        return self.pattern.search(text, *args)
+
+    def sub(self, repl, text, *args):
+        self.counter[0] += len(text)
+        return self.pattern.sub(repl, text, *args)
+
+
+def scanned_chars(corpus: list) -> list[int]:
+    """Characters covered per email by registered patterns (gmail_parser.PATTERNS), decoding included."""
+    patterns = gmail_parser.PATTERNS
+    counter = [0]
+    scanned = []
+    gmail_parser.PATTERNS = {name: _CountingPattern(p, counter) for name, p in patterns.items()}
+    try:
+        for _, raw, _, _ in corpus:
+            counter[0] = 0
+            parse_email(raw)
+            scanned.append(counter[0])
+    finally:
+        gmail_parser.PATTERNS = patterns
+    return scanned
+
+
+def _percentile(values: list[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_benchmark(corpus: list, min_accuracy: float) -> bool:
+    """Time, measure and score the corpus. Returns True if accuracy is at least min_accuracy."""
+    total_bytes = sum(len(raw) for _, raw, _, _ in corpus)
+    print(f"{len(corpus)} emails, {total_bytes / 1e6:,.1f} MB")
+
+    for _, raw, _, _ in corpus[:20]:
+        parse_email(raw)
+
+    # Timed pass
+    results = []
+    latencies = []
+    by_provider = defaultdict(lambda: [0, 0, 0.0])  # emails, bytes, seconds
+    start = time.perf_counter()
+    for name, raw, variant, expected in corpus:
+        t0 = time.perf_counter()
+        payment = parse_email(raw)
+        seconds = time.perf_counter() - t0
+        latencies.append(seconds)
+        stats = by_provider[expected['source']]
+        stats[0] += 1
+        stats[1] += len(raw)
+        stats[2] += seconds
+        results.append(payment)
+    wall = time.perf_counter() - start
+
+    # Memory pass (untimed, tracemalloc is slow): peak per email
+    peaks = []
+    tracemalloc.start()
+    for _, raw, _, _ in corpus:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        parse_email(raw)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    scanned = sorted(scanned_chars(corpus))
+
+    # Accuracy
+    correct = Counter()
+    seen = Counter()
+    missed_variants = defaultdict(Counter)
+    misses = []
+    for (name, raw, variant, expected), payment in zip(corpus, results):
+        got = parsed_fields(payment)
+        wrong = [field for field in FIELDS if got is None or got[field] != expected[field]]
+        for field in FIELDS:
+            seen[(expected['source'], field)] += 1
+            correct[(expected['source'], field)] += field not in wrong
+        if wrong:
+            for dimension, value in variant.items():
+                missed_variants[dimension][value] += 1
+            misses.append((name, variant, wrong, expected, got))
+
+    latencies.sort()
+    peaks.sort()
+    print(f"\nThroughput: {len(corpus) / wall:,.0f} emails/sec, {total_bytes / 1e6 / wall:,.1f} MB/sec "
+          f"(latency p50 {_percentile(latencies, 0.5) * 1e3:.2f} ms, "
+          f"p99 {_percentile(latencies, 0.99) * 1e3:.2f} ms)")
+    for provider in PROVIDERS:
+        emails, size, seconds = by_provider[provider]
+        if emails:
+            print(f"  {provider:8} {emails / seconds:8,.0f} emails/sec  {size / 1e6 / seconds:6,.1f} MB/sec")
+    print(f"Memory: peak per email p50 {_percentile(peaks, 0.5) / 1024:,.0f} KB, "
+          f"max {peaks[-1] / 1024:,.0f} KB")
+    print(f"Scanned by patterns: {sum(scanned) / len(scanned):,.0f} chars per email on average "
+          f"(p50 {_percentile(scanned, 0.5):,}, max {scanned[-1]:,})")
+
+    print(f"\nField accuracy ({len(corpus) - len(misses)} of {len(corpus)} emails fully correct)")
+    print(f"  {'':8} " + " ".join(f"{field:>14}" for field in FIELDS))
+    for provider in PROVIDERS:
+        if seen[(provider, 'source')]:
+            print(f"  {provider:8} " + " ".join(
+                f"{correct[(provider, field)] / seen[(provider, field)]:14.1%}" for field in FIELDS
+            ))
+    for dimension, counts in missed_variants.items():
+        print(f"  misses by {dimension}: " + ", ".join(f"{value} {count}" for value, count in counts.most_common()))
+    for name, variant, wrong, expected, got in misses[:SAMPLE_MISSES]:
+        print(f"  {name} {variant}")
+        for field in wrong:
+            print(f"      {field}: expected {expected[field]!r}, parsed {got[field] if got else None!r}")
+
+    accuracy = sum(correct.values()) / sum(seen.values())
+    print(f"\nOverall field accuracy {accuracy:.2%} (minimum {min_accuracy:.2%})")
+    return accuracy >= min_accuracy
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --messages 5000."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    if '--corpus' in sys.argv:
+        corpus = load_corpus(_arg('--corpus', 'corpus'))
+    else:
+        corpus = [
+            (name, raw, variant, asdict(expected))
+            for name, raw, variant, expected in generate_corpus(int(_arg('--messages', '1000')),
+                                                                int(_arg('--seed', '1')))
+        ]
+    ok = run_benchmark(corpus, min_accuracy=float(_arg('--min-accuracy', '1.0')))
+    sys.exit(0 if ok else 1)
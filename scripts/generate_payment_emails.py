@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Generator: Synthetic Payment Emails
+
+Writes the synthetic payment notifications from tests/payment_corpus.py
+(all five providers, known ground truth) to disk, for parser benchmarks
+and regression checks (see bench_parse_corpus.py). Each message varies
+independently in:
+- layout: the body/subject layouts each parser handles (Zelle heading
+  table vs "You received ... from" text, Cash App subject vs body
+  sender, Venmo HTML vs text note, Chime <strong> vs text memo, Stripe
+  with and without "for <account>")
+- transfer encoding: quoted-printable, base64, 8bit
+- charset: utf-8, iso-8859-1, windows-1252 (accented names and memos
+  where the parser reads them)
+- structure: text+HTML alternative, HTML only, HTML with an inline logo
+  (multipart/related), or with a PDF receipt attached (multipart/mixed)
+- weight: provider-style HTML with a large <head> and legal footer, or a
+  minimal body
+
+Output is deterministic for a given --seed. Writes <n>-<provider>.eml
+files and manifest.json (file -> variant and expected fields).
+
+Usage:
+    python scripts/generate_payment_emails.py --out corpus
+    python scripts/generate_payment_emails.py --out corpus --count 10000 --seed 7
+"""
+
+import sys
+import os
+import json
+from dataclasses import asdict
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.payment_corpus import generate_corpus
+
+
+def write_corpus(out_dir: str, count: int, seed: int):
+    """Write the .eml files and manifest.json."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'seed': seed, 'count': count, 'messages': {}}
+    total = 0
+    for name, raw, variant, expected in generate_corpus(count, seed):
+        with open(os.path.join(out_dir, name), 'wb') as f:
+            f.write(raw)
+        total += len(raw)
+        manifest['messages'][name] = {'variant': variant, 'expected': asdict(expected)}
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    print(f"Wrote {count} emails ({total / 1e6:,.1f} MB) and manifest.json to {out_dir}")
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --count 10000."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    write_corpus(
+        out_dir=_arg('--out', 'corpus'),
+        count=int(_arg('--count', '1000')),
+        seed=int(_arg('--seed', '1')),
+    )
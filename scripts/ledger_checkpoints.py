@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Ledger Checkpoint Maintenance
+
+Writes a new balance checkpoint for every driver with enough ledger entries
+since their last one, so bulk balance computation only reads the ledger tail.
+
+Usage:
+    python scripts/ledger_checkpoints.py                    # advance checkpoints
+    python scripts/ledger_checkpoints.py --min-entries 7    # checkpoint more eagerly
+    python scripts/ledger_checkpoints.py --verify           # prove checkpoint + tail == full SUM
+
+Runs after midnight billing (see .github/workflows/midnight-billing.yml).
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env before imports
+from dotenv import load_dotenv
+load_dotenv('.env.local')
+
+from app.core.database import SessionLocal
+from app.services.billing import create_checkpoints, verify_checkpoints
+
+
+def run_checkpoints(min_entries: int = 30, settle_hours: int = 24):
+    """Advance checkpoints in a single transaction."""
+    print(f"[{datetime.now()}] Advancing ledger checkpoints "
+          f"(min {min_entries} entries, settled {settle_hours}h)")
+
+    db = SessionLocal()
+
+    try:
+        count = create_checkpoints(db, min_entries=min_entries, settle=timedelta(hours=settle_hours))
+        db.commit()
+        print(f"Wrote {count} checkpoints")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error writing checkpoints: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def run_verify() -> bool:
+    """Compare checkpoint + tail against the full ledger SUM for every driver."""
+    print(f"[{datetime.now()}] Verifying ledger checkpoints")
+
+    db = SessionLocal()
+
+    try:
+        checked, mismatches = verify_checkpoints(db)
+        print(f"Checked {checked} drivers with checkpoints")
+
+        for m in mismatches:
+            print(f"  MISMATCH {m.driver_id}: checkpoint+tail ${m.checkpointed_balance:.2f} "
+                  f"vs full ${m.full_balance:.2f}, "
+                  f"entries {m.checkpoint_entries} checkpointed vs {m.covered_entries} covered")
+
+        if mismatches:
+            print(f"{len(mismatches)} mismatches found")
+            return False
+
+        print("All checkpoints verified")
+        return True
+
+    finally:
+        db.close()
+
+
+def _int_arg(name: str, default: int) -> int:
+    """Read an integer CLI option like --min-entries 30."""
+    if name not in sys.argv:
+        return default
+    try:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    except (ValueError, IndexError):
+        print(f"Invalid {name} argument, defaulting to {default}")
+        return default
+
+
+if __name__ == "__main__":
+    if '--verify' in sys.argv:
+        sys.exit(0 if run_verify() else 1)
+    else:
+        run_checkpoints(
+            min_entries=_int_arg('--min-entries', 30),
+            settle_hours=_int_arg('--settle-hours', 24),
+        )
@@ -4,22 +4,24 @@ Cron Job: Midnight Billing
 
 Runs daily at midnight to:
 1. Create debit entries for active drivers based on their billing rate
-2. Detect late payments (daily: >= 2 days, weekly: >= 48 hours)
-3. Send SMS reminders for late payments
-4. Log all SMS activity
+2. Detect late payments (negative balance for daily: >= 2 days, weekly: >= 48 hours)
+3. Queue SMS reminders for late payments in the SMS outbox
+4. Drain the outbox (concurrently, rate-limited) and log all SMS activity
 
 Usage:
     python scripts/midnight_billing.py
 
+Debits are keyed by (driver_id, billing_period), so re-running the job
+for the same day or week does not charge anyone twice.
+
 Crontab (daily at midnight):
     0 0 * * * cd /path/to/gonzocar && python scripts/midnight_billing.py
 """
 
 import sys
 import os
-from datetime import datetime, timedelta
-from uuid import uuid4
-from decimal import Decimal
+import asyncio
+from datetime import datetime
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -29,10 +31,13 @@ from dotenv import load_dotenv
 load_dotenv('.env.local')
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.core.database import SessionLocal
-from app.models import Driver, Ledger, SmsLog, LedgerType, BillingType
+from app.models import Driver, SmsLog, SmsOutbox, BillingType
+from app.services.billing import (
+    DebitRunResult, create_period_debits, find_late_drivers, get_balance_summaries
+)
 from app.services.openphone import openphone, SmsTemplates
+from app.services.sms_outbox import DrainReport, drain, enqueue_sms
 
 
 def get_db() -> Session:
@@ -40,89 +45,20 @@ def get_db() -> Session:
     return SessionLocal()
 
 
-def calculate_balance(db: Session, driver_id) -> Decimal:
-    """Calculate driver's current balance (credits - debits)."""
-    credits = db.query(func.sum(Ledger.amount)).filter(
-        Ledger.driver_id == driver_id,
-        Ledger.type == LedgerType.credit
-    ).scalar() or Decimal('0')
-    
-    debits = db.query(func.sum(Ledger.amount)).filter(
-        Ledger.driver_id == driver_id,
-        Ledger.type == LedgerType.debit
-    ).scalar() or Decimal('0')
-    
-    return credits - debits
+def create_daily_debits(db: Session) -> DebitRunResult:
+    """Create today's debit entries for drivers with daily billing."""
+    return create_period_debits(db, BillingType.daily)
 
 
-def get_last_debit_date(db: Session, driver_id) -> datetime:
-    """Get the date of the last debit entry for a driver."""
-    last_debit = db.query(Ledger).filter(
-        Ledger.driver_id == driver_id,
-        Ledger.type == LedgerType.debit
-    ).order_by(Ledger.created_at.desc()).first()
-    
-    return last_debit.created_at if last_debit else None
+def create_weekly_debits(db: Session) -> DebitRunResult:
+    """Create this week's debit entries for weekly drivers last charged >= 7 days ago."""
+    return create_period_debits(db, BillingType.weekly)
 
 
-def create_daily_debits(db: Session, drivers: list[Driver]) -> int:
-    """Create daily debit entries for drivers with daily billing."""
-    count = 0
-    today = datetime.utcnow().date()
-    
-    for driver in drivers:
-        if driver.billing_type != BillingType.daily:
-            continue
-        
-        # Check if already charged today
-        last_debit_date = get_last_debit_date(db, driver.id)
-        if last_debit_date and last_debit_date.date() == today:
-            continue
-        
-        # Create debit entry
-        debit = Ledger(
-            id=uuid4(),
-            driver_id=driver.id,
-            type=LedgerType.debit,
-            amount=driver.billing_rate,
-            description=f"Daily rental charge",
-            created_at=datetime.utcnow()
-        )
-        db.add(debit)
-        count += 1
-        print(f"  Created daily debit: {driver.first_name} {driver.last_name} - ${driver.billing_rate}")
-    
-    return count
-
-
-def create_weekly_debits(db: Session, drivers: list[Driver]) -> int:
-    """Create weekly debit entries for drivers with weekly billing."""
-    count = 0
-    today = datetime.utcnow()
-    
-    for driver in drivers:
-        if driver.billing_type != BillingType.weekly:
-            continue
-        
-        # Check if already charged this week
-        last_debit_date = get_last_debit_date(db, driver.id)
-        if last_debit_date and (today - last_debit_date).days < 7:
-            continue
-        
-        # Create debit entry
-        debit = Ledger(
-            id=uuid4(),
-            driver_id=driver.id,
-            type=LedgerType.debit,
-            amount=driver.billing_rate,
-            description=f"Weekly rental charge",
-            created_at=datetime.utcnow()
-        )
-        db.add(debit)
-        count += 1
-        print(f"  Created weekly debit: {driver.first_name} {driver.last_name} - ${driver.billing_rate}")
-    
-    return count
+def print_debit_result(result: DebitRunResult, verb: str = "Created"):
+    """Print inserted vs skipped counts for one billing type."""
+    print(f"  {result.billing_type.value.capitalize()} ({result.billing_period}): "
+          f"{verb} {result.inserted} debits, skipped {result.skipped} already charged")
 
 
 def check_late_payments(db: Session, drivers: list[Driver]) -> list[tuple]:
@@ -133,78 +69,69 @@ def check_late_payments(db: Session, drivers: list[Driver]) -> list[tuple]:
     - Daily billing: negative balance for >= 2 days
     - Weekly billing: negative balance for >= 48 hours
     
+    "Negative for" is measured from when the balance last went below zero,
+    found in one window-function query (see billing.find_late_drivers).
+    
     Returns list of (driver, balance, days_late)
     """
-    late_drivers = []
-    now = datetime.utcnow()
+    drivers_by_id = {driver.id: driver for driver in drivers}
     
-    for driver in drivers:
-        balance = calculate_balance(db, driver.id)
-        
-        if balance >= 0:
-            continue
-        
-        # Find when balance became negative (simplified: use last debit date)
-        last_debit = db.query(Ledger).filter(
-            Ledger.driver_id == driver.id,
-            Ledger.type == LedgerType.debit
-        ).order_by(Ledger.created_at.desc()).first()
-        
-        if not last_debit:
+    return [
+        (drivers_by_id[late.driver_id], late.balance, late.days_late)
+        for late in find_late_drivers(db)
+        if late.driver_id in drivers_by_id
+    ]
+
+
+def queue_late_payment_notices(db: Session, late_drivers: list[tuple]) -> int:
+    """
+    Queue a late payment SMS for every late driver not yet texted today.
+    
+    Messages go to the SMS outbox in the billing transaction, so they only
+    exist if tonight's debits commit. Returns the number queued.
+    """
+    today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    late_ids = [driver.id for driver, _, _ in late_drivers]
+    
+    # Who was already texted (or queued) today, in two queries
+    already_texted = {
+        row.driver_id for row in db.query(SmsLog.driver_id).filter(
+            SmsLog.driver_id.in_(late_ids),
+            SmsLog.created_at >= today_start
+        ).distinct()
+    } | {
+        row.driver_id for row in db.query(SmsOutbox.driver_id).filter(
+            SmsOutbox.driver_id.in_(late_ids),
+            SmsOutbox.created_at >= today_start
+        ).distinct()
+    }
+    
+    queued = 0
+    for driver, balance, days_late in late_drivers:
+        if driver.id in already_texted:
+            print(f"  Already sent SMS today to {driver.first_name} {driver.last_name}")
             continue
         
-        days_late = (now - last_debit.created_at).days
-        
-        # Check if late based on billing type
-        if driver.billing_type == BillingType.daily and days_late >= 2:
-            late_drivers.append((driver, balance, days_late))
-        elif driver.billing_type == BillingType.weekly and days_late >= 2:  # 48 hours = 2 days
-            late_drivers.append((driver, balance, days_late))
+        message = SmsTemplates.late_payment(
+            driver_name=driver.first_name,
+            amount=abs(float(balance)),
+            days_late=days_late
+        )
+        enqueue_sms(db, phone=driver.phone, message=message, driver_id=driver.id)
+        queued += 1
     
-    return late_drivers
+    return queued
 
 
-def send_late_payment_sms(db: Session, driver: Driver, balance: Decimal, days_late: int) -> bool:
-    """Send late payment SMS and log it."""
-    # Check if we already sent SMS today
-    today = datetime.utcnow().date()
-    existing_sms = db.query(SmsLog).filter(
-        SmsLog.driver_id == driver.id,
-        func.date(SmsLog.created_at) == today
-    ).first()
+def send_queued_sms(db: Session) -> DrainReport:
+    """Drain the SMS outbox now, concurrently and rate-limited (see Settings.sms_*)."""
+    async def drain_outbox() -> DrainReport:
+        try:
+            return await drain(db)
+        finally:
+            await openphone.aclose()
     
-    if existing_sms:
-        print(f"  Already sent SMS today to {driver.first_name} {driver.last_name}")
-        return False
-    
-    # Prepare message
-    message = SmsTemplates.late_payment(
-        driver_name=driver.first_name,
-        amount=abs(float(balance)),
-        days_late=days_late
-    )
-    
-    # Send SMS
-    result = openphone.send_sms_sync(driver.phone, message)
-    
-    # Log SMS
-    sms_log = SmsLog(
-        id=uuid4(),
-        driver_id=driver.id,
-        phone=driver.phone,
-        message=message,
-        status='sent' if result.success else 'failed',
-        openphone_response={'message_id': result.message_id, 'error': result.error},
-        created_at=datetime.utcnow()
-    )
-    db.add(sms_log)
-    
-    if result.success:
-        print(f"  Sent late payment SMS to {driver.first_name} {driver.last_name}")
-    else:
-        print(f"  Failed to send SMS to {driver.first_name} {driver.last_name}: {result.error}")
-    
-    return result.success
+    return asyncio.run(drain_outbox())
 
 
 def run_billing():
@@ -222,26 +149,33 @@ def run_billing():
             print("No active drivers, exiting")
             return
         
-        # Create debit entries
+        # Create debit entries (one idempotent statement per billing type)
         print("\n--- Creating Debit Entries ---")
-        daily_count = create_daily_debits(db, drivers)
-        weekly_count = create_weekly_debits(db, drivers)
-        print(f"Created {daily_count} daily debits, {weekly_count} weekly debits")
+        print_debit_result(create_daily_debits(db))
+        print_debit_result(create_weekly_debits(db))
         
-        # Check for late payments
+        # Check for late payments (tonight's debits included)
         print("\n--- Checking Late Payments ---")
         late_drivers = check_late_payments(db, drivers)
         print(f"Found {len(late_drivers)} late drivers")
         
-        # Send SMS reminders
+        # Queue SMS reminders in the same transaction as the debits
         if late_drivers:
-            print("\n--- Sending SMS Reminders ---")
+            print("\n--- Queueing SMS Reminders ---")
             for driver, balance, days_late in late_drivers:
                 print(f"  {driver.first_name} {driver.last_name}: ${balance:.2f} ({days_late} days late)")
-                send_late_payment_sms(db, driver, balance, days_late)
+            print(f"Queued {queue_late_payment_notices(db, late_drivers)} SMS")
         
         # Commit all changes
         db.commit()
+        
+        # Send queued SMS now rather than waiting for an SMS worker
+        print("\n--- Sending Queued SMS ---")
+        report = send_queued_sms(db)
+        print(f"Sent {report.sent}, retrying {report.retrying}, failed {report.failed} "
+              f"in {report.elapsed:.1f}s ({report.throughput:.1f} msg/s, "
+              f"p95 latency {report.p95_latency * 1000:.0f} ms)")
+        
         print(f"\n[{datetime.now()}] Billing job completed successfully")
         
     except Exception as e:
@@ -250,6 +184,7 @@ def run_billing():
         raise
     finally:
         db.close()
+        openphone.close()
 
 
 def run_with_dry_run():
@@ -262,9 +197,18 @@ def run_with_dry_run():
         drivers = db.query(Driver).filter(Driver.billing_active == True).all()
         print(f"Found {len(drivers)} active drivers")
         
-        print("\n--- Would Create Debits For ---")
+        # Run the debit statements inside a savepoint and roll them back
+        print("\n--- Would Create Debits ---")
+        savepoint = db.begin_nested()
+        print_debit_result(create_daily_debits(db), verb="Would create")
+        print_debit_result(create_weekly_debits(db), verb="Would create")
+        savepoint.rollback()
+        
+        summaries = get_balance_summaries(db, driver_ids=[d.id for d in drivers])
+        
+        print("\n--- Current Balances ---")
         for driver in drivers:
-            balance = calculate_balance(db, driver.id)
+            balance = summaries[driver.id].balance
             print(f"  {driver.first_name} {driver.last_name}")
             print(f"    Type: {driver.billing_type.value}, Rate: ${driver.billing_rate}")
             print(f"    Current Balance: ${balance:.2f}")
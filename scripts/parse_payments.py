@@ -3,14 +3,21 @@
 Cron Job: Parse Payment Emails
 
 Runs every 5 minutes to:
-1. Fetch new payment emails from Gmail
+1. Fetch payment emails added since the last run (Gmail history cursor)
 2. Parse payment details (amount, sender, etc.)
 3. Store in payments_raw table
 4. Attempt to match with drivers via aliases
 5. Create ledger entries for matched payments
+6. Record every message in processed_messages, so it is never downloaded again
 
 Usage:
     python scripts/parse_payments.py
+    python scripts/parse_payments.py --hours 24          # first-run look-back
+    python scripts/parse_payments.py --full --hours 24   # ignore the sync cursor
+    python scripts/parse_payments.py --full --hours 720  # 30-day backfill from Gmail
+    python scripts/parse_payments.py --backfill path/to/eml-dir --workers 8
+    python scripts/parse_payments.py --replay                  # re-parse the archive at EMAIL_ARCHIVE_DIR offline
+    python scripts/parse_payments.py --replay path/to/archive --store
 
 Crontab (every 5 min):
     */5 * * * * cd /path/to/gonzocar && python scripts/parse_payments.py
@@ -18,16 +25,19 @@ Crontab (every 5 min):
 
 import sys
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from uuid import uuid4
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
-from app.models.models import PaymentRaw, Alias, Ledger, Driver
-from app.services.gmail_parser import parse_email, ParsedPayment
+from app.services.alias_index import alias_index
+from app.services.email_archive import EmailArchive
+from app.services.gmail_parser import parse_email
+from app.services.payment_ingest import poll_gmail, store_gmail_batch, store_payment_batch
 
 
 def get_db() -> Session:
@@ -35,110 +45,26 @@ def get_db() -> Session:
     return SessionLocal()
 
 
-def is_duplicate(db: Session, source: str, transaction_id: str, gmail_id: str = None) -> bool:
-    """Check if payment already exists in database."""
-    # 1. Check by Transaction ID (if present)
-    if transaction_id:
-        existing = db.query(PaymentRaw).filter(
-            PaymentRaw.source == source,
-            PaymentRaw.transaction_id == transaction_id
-        ).first()
-        if existing:
-            return True
-
-    # 2. Check by Gmail ID (if present) - Robust fallback for same email
-    if gmail_id:
-        existing_by_gmail = db.query(PaymentRaw).filter(
-            PaymentRaw.gmail_id == gmail_id
-        ).first()
-        if existing_by_gmail:
-            return True
-            
-    return False
-
-
-def find_driver_by_alias(db: Session, sender_name: str, sender_identifier: str) -> Driver:
-    """Try to match sender to a driver via aliases."""
-    # Try exact match on sender name
-    alias = db.query(Alias).filter(
-        Alias.alias_value == sender_name
-    ).first()
-    
-    if alias:
-        return db.query(Driver).filter(Driver.id == alias.driver_id).first()
-    
-    # Try sender identifier (email/phone) if available
-    if sender_identifier:
-        alias = db.query(Alias).filter(
-            Alias.alias_value == sender_identifier
-        ).first()
-        if alias:
-            return db.query(Driver).filter(Driver.id == alias.driver_id).first()
-    
-    return None
-
-
-def store_payment(db: Session, payment: ParsedPayment, gmail_id: str = None) -> PaymentRaw:
-    """Store parsed payment in database."""
-    # Check for duplicate
-    # Check for duplicate
-    if is_duplicate(db, payment.source, payment.transaction_id, gmail_id):
-        print(f"  Skipping duplicate: {payment.source} {payment.transaction_id or gmail_id}")
-        return None
-    
-    # Try to match with driver
-    driver = find_driver_by_alias(db, payment.sender_name, payment.sender_identifier)
-    
-    # Create payment record
-    payment_raw = PaymentRaw(
-        id=uuid4(),
-        source=payment.source,
-        sender_name=payment.sender_name,
-        sender_identifier=payment.sender_identifier,
-        amount=payment.amount,
-        transaction_id=payment.transaction_id,
-        memo=payment.memo,
-        received_at=payment.received_at,
-        gmail_id=gmail_id,
-        driver_id=driver.id if driver else None,
-        matched=driver is not None
-    )
-    
-    db.add(payment_raw)
-    db.flush()  # Ensure it's visible to subsequent is_duplicate checks within the same transaction
-    
-    # If matched, create ledger entry
-    if driver:
-        ledger_entry = Ledger(
-            id=uuid4(),
-            driver_id=driver.id,
-            type='credit',
-            amount=payment.amount,
-            description=f"{payment.source.upper()} payment from {payment.sender_name}",
-            reference_id=str(payment_raw.id),
-            created_at=datetime.utcnow()
-        )
-        db.add(ledger_entry)
-        print(f"  Matched to driver: {driver.first_name} {driver.last_name}")
-    
-    return payment_raw
-
-
-def process_email(db: Session, raw_email: bytes, gmail_id: str = None) -> bool:
-    """Process a single email."""
-    payment = parse_email(raw_email)
-    
-    if not payment:
+def gmail_credentials_present() -> bool:
+    """Check for the OAuth files GmailService needs, explaining what is missing."""
+    if not os.path.exists('credentials.json'):
+        print("Error: credentials.json not found")
+        print("Download from Google Cloud Console")
         return False
     
-    print(f"  Parsed: {payment.source} ${payment.amount:.2f} from {payment.sender_name}")
+    if not os.path.exists('token.json'):
+        print("Error: token.json not found")
+        print("Run: python app/services/gmail_service.py")
+        return False
     
-    result = store_payment(db, payment, gmail_id)
-    return result is not None
+    return True
 
 
-def run_with_gmail(hours: int = 1):
-    """Fetch and process emails from Gmail API."""
+def run_with_gmail(hours: int = 1, full: bool = False, commit_every: int = 50):
+    """
+    Fetch and process emails from Gmail API once (see poll_gmail).
+    scripts/payment_worker.py does the same continuously with a warm client.
+    """
     try:
         from app.services.gmail_service import GmailService
     except ImportError as e:
@@ -146,41 +72,19 @@ def run_with_gmail(hours: int = 1):
         print("Install with: pip install google-auth-oauthlib google-api-python-client")
         return
     
-    # Check for credentials
-    if not os.path.exists('credentials.json'):
-        print("Error: credentials.json not found")
-        print("Download from Google Cloud Console")
-        return
-    
-    if not os.path.exists('token.json'):
-        print("Error: token.json not found")
-        print("Run: python app/services/gmail_service.py")
+    if not gmail_credentials_present():
         return
     
-    print(f"[{datetime.now()}] Starting payment email parser (looking back {hours} hours)")
+    mode = f"full search of the last {hours} hours" if full else "incremental sync"
+    print(f"[{datetime.now()}] Starting payment email parser ({mode})")
     print("Connecting to Gmail API...")
     
     try:
         gmail = GmailService()
-        emails = gmail.fetch_emails(since_hours=hours, max_results=50)
-        
-        print(f"Found {len(emails)} payment emails")
-        
-        if not emails:
-            return
-        
         db = get_db()
-        processed = 0
         
         try:
-            for email_data in emails:
-                print(f"\nProcessing email {email_data['gmail_id']}...")
-                if process_email(db, email_data['raw'], email_data['gmail_id']):
-                    processed += 1
-            
-            db.commit()
-            print(f"\nDone! Processed {processed} new payments")
-            
+            poll_gmail(gmail, db, hours=hours, full=full, commit_every=commit_every)
         finally:
             db.close()
             
@@ -201,24 +105,205 @@ def run_with_local_files(directory: str):
         return
     
     db = get_db()
-    processed = 0
+    payments = []
     
     try:
+        alias_index.refresh(db)
         for eml_path in eml_files:
             print(f"\nProcessing {eml_path.name}...")
             with open(eml_path, 'rb') as f:
-                if process_email(db, f.read()):
-                    processed += 1
+                payment = parse_email(f.read())
+            if payment:
+                print(f"  Parsed: {payment.source} ${payment.amount:.2f} from {payment.sender_name}")
+                payments.append(payment)
         
+        payment_ids, matched = store_payment_batch(db, payments)
         db.commit()
-        print(f"\nDone! Processed {processed} new payments")
+        processed = sum(1 for payment_id in payment_ids if payment_id)
+        print(f"\nDone! Processed {processed} new payments ({matched} matched)")
         
     finally:
         db.close()
 
 
+def _parse_file(path: str) -> tuple:
+    """Worker: read and parse one .eml. Returns (path, payment or None, seconds)."""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        payment = parse_email(f.read())
+    return path, payment, time.perf_counter() - start
+
+
+def run_backfill(directory: str, workers: int, batch_size: int = 500):
+    """
+    Backfill a directory of .eml files in parallel.
+    
+    Files are parsed in a process pool (parsing is CPU-bound) and streamed
+    back in order to this process, which dedupes and inserts them in
+    batches of batch_size, committing after each batch.
+    """
+    from pathlib import Path
+    
+    print(f"[{datetime.now()}] Backfilling .eml files from {directory} with {workers} workers")
+    
+    eml_files = sorted(str(p) for p in Path(directory).rglob('*.eml'))
+    print(f"Found {len(eml_files)} .eml files")
+    
+    if not eml_files:
+        return
+    
+    # A few chunks per worker: big enough to amortize pickling, small
+    # enough that results start streaming back early
+    chunksize = max(1, min(64, len(eml_files) // (workers * 4)))
+    
+    db = get_db()
+    parse_seconds = 0.0
+    write_seconds = 0.0
+    parsed = stored = matched = 0
+    batch = []
+    
+    def flush_batch():
+        nonlocal write_seconds, stored, matched
+        start = time.perf_counter()
+        payment_ids, batch_matched = store_payment_batch(db, batch)
+        db.commit()
+        write_seconds += time.perf_counter() - start
+        stored += sum(1 for payment_id in payment_ids if payment_id)
+        matched += batch_matched
+        batch.clear()
+    
+    wall_start = time.perf_counter()
+    try:
+        alias_index.refresh(db)
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, payment, seconds in pool.map(_parse_file, eml_files, chunksize=chunksize):
+                parse_seconds += seconds
+                if not payment:
+                    continue
+                parsed += 1
+                batch.append(payment)
+                if len(batch) >= batch_size:
+                    flush_batch()
+        
+        if batch:
+            flush_batch()
+        
+    finally:
+        db.close()
+    
+    wall = time.perf_counter() - wall_start
+    print(f"\nDone! {len(eml_files)} files, {parsed} payments parsed, "
+          f"{stored} new ({matched} matched), {parsed - stored} duplicates")
+    print(f"  {len(eml_files) / wall:,.0f} files/sec over {wall:.1f}s wall")
+    print(f"  read + parse (workers): {parse_seconds:.1f}s summed over {workers} workers")
+    print(f"  dedupe + insert + commit (writer): {write_seconds:.1f}s")
+    print(f"  writer waiting on workers: {wall - write_seconds:.1f}s")
+
+
+def run_replay(archive_dir: str, store: bool = False, batch_size: int = 500):
+    """
+    Stream the raw-email archive (see email_archive) through the parsers,
+    without Gmail: reproduces a parse offline, or checks what a parser fix
+    changes. Reports what parses per source; with store=True the payments
+    are stored like a poll would (duplicates skipped, outcomes recorded).
+    """
+    from collections import Counter
+    
+    archive = EmailArchive(archive_dir)
+    print(f"[{datetime.now()}] Replaying archived emails from {archive_dir}"
+          f"{' (storing new payments)' if store else ''}")
+    
+    db = get_db() if store else None
+    sources = Counter()
+    emails = raw_bytes = 0
+    read_seconds = parse_seconds = 0.0
+    batch = []
+    stored = matched = 0
+    
+    def flush_batch():
+        nonlocal stored, matched
+        batch_stored, batch_matched = store_gmail_batch(db, batch)
+        db.commit()
+        stored += batch_stored
+        matched += batch_matched
+        batch.clear()
+    
+    wall_start = time.perf_counter()
+    try:
+        if db:
+            alias_index.refresh(db)
+        
+        messages = archive.iter_messages()
+        while True:
+            start = time.perf_counter()
+            item = next(messages, None)
+            read_seconds += time.perf_counter() - start
+            if item is None:
+                break
+            gmail_id, raw = item
+            emails += 1
+            raw_bytes += len(raw)
+            
+            start = time.perf_counter()
+            payment = parse_email(raw)
+            parse_seconds += time.perf_counter() - start
+            sources[payment.source if payment else 'unparsed'] += 1
+            
+            if db:
+                batch.append((gmail_id, payment))
+                if len(batch) >= batch_size:
+                    flush_batch()
+        
+        if batch:
+            flush_batch()
+        
+    finally:
+        if db:
+            db.close()
+    
+    wall = time.perf_counter() - wall_start
+    print(f"\nDone! {emails} archived emails ({raw_bytes / 1e6:,.1f} MB raw)")
+    for source, count in sources.most_common():
+        print(f"  {source:10} {count:6d}")
+    if store:
+        print(f"Stored {stored} new payments ({matched} matched)")
+    if emails:
+        print(f"  {emails / wall:,.0f} emails/sec over {wall:.1f}s wall "
+              f"(read + decompress {read_seconds:.1f}s, parse {parse_seconds:.1f}s)")
+
+
+def _int_arg(name: str, default: int) -> int:
+    """Read an integer CLI option like --workers 8."""
+    if name in sys.argv:
+        try:
+            return int(sys.argv[sys.argv.index(name) + 1])
+        except (ValueError, IndexError):
+            print(f"Invalid {name} argument, defaulting to {default}")
+    return default
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1].endswith('.eml'):
+    if '--replay' in sys.argv:
+        # Re-parse archived raw emails, no Gmail access
+        from app.core.config import get_settings
+        idx = sys.argv.index('--replay')
+        archive_dir = get_settings().email_archive_dir
+        if idx + 1 < len(sys.argv) and not sys.argv[idx + 1].startswith('--'):
+            archive_dir = sys.argv[idx + 1]
+        if not archive_dir:
+            print("No archive: set EMAIL_ARCHIVE_DIR or pass --replay path/to/archive")
+            sys.exit(1)
+        run_replay(archive_dir, store='--store' in sys.argv, batch_size=_int_arg('--batch-size', 500))
+    elif '--backfill' in sys.argv:
+        # Parallel backfill of a directory of .eml files
+        directory = sys.argv[sys.argv.index('--backfill') + 1]
+        run_backfill(
+            directory,
+            workers=_int_arg('--workers', os.cpu_count() or 1),
+            batch_size=_int_arg('--batch-size', 500),
+        )
+    elif len(sys.argv) > 1 and sys.argv[1].endswith('.eml'):
         # Process local directory/files (legacy support)
         run_with_local_files(sys.argv[1])
     else:
@@ -232,4 +317,4 @@ if __name__ == "__main__":
                 print("Invalid --hours argument, defaulting to 1 hour")
         
         # Production mode: fetch from Gmail
-        run_with_gmail(hours=hours)
+        run_with_gmail(hours=hours, full='--full' in sys.argv)
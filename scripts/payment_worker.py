@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Worker: Payment Ingestion
+
+Long-running replacement for the five-minute parse_payments.py cron run.
+Connects to Gmail once and keeps the API client (OAuth credentials refresh
+themselves), the database pool and the alias index warm, then polls the
+mailbox every payment_poll_seconds plus random jitter (see poll_gmail).
+
+- After a failed poll it backs off exponentially, up to
+  payment_poll_max_backoff_seconds
+- Every poll writes the worker_heartbeats row that /api/status reports
+- SIGINT/SIGTERM finish the poll in progress, mark the heartbeat stopped
+  and exit
+
+Usage:
+    python scripts/payment_worker.py                 # run until stopped
+    python scripts/payment_worker.py --once          # one poll, then exit
+    python scripts/payment_worker.py --interval 30   # override payment_poll_seconds
+    python scripts/payment_worker.py --hours 24      # first-run look-back (no sync cursor yet)
+"""
+
+import sys
+import os
+import random
+import signal
+import threading
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env before imports
+from dotenv import load_dotenv
+load_dotenv('.env.local')
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.services.heartbeat import PAYMENT_WORKER, Heartbeat
+from app.services.payment_ingest import poll_gmail
+from scripts.parse_payments import gmail_credentials_present
+
+
+def next_wait(interval: float, jitter: float, max_backoff: float, failures: int) -> float:
+    """Seconds until the next poll: the interval, doubled per consecutive failure (capped), plus jitter."""
+    base = min(interval * 2 ** failures, max_backoff) if failures else interval
+    return base + random.uniform(0, jitter)
+
+
+def run_worker(interval: float, once: bool = False, hours: int = 1):
+    """Poll until stopped."""
+    settings = get_settings()
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"[{datetime.now()}] Signal {signum} received, stopping after the current poll")
+        stop.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, request_stop)
+
+    from app.services.gmail_service import GmailService
+
+    print(f"[{datetime.now()}] Payment worker started (pid {os.getpid()}), polling every {interval:.0f}s")
+    gmail = GmailService()
+    heartbeat = Heartbeat(PAYMENT_WORKER)
+
+    try:
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                result = poll_gmail(gmail, db, hours=hours)
+                heartbeat.beat(db, details={
+                    'emails': result.emails,
+                    'stored': result.stored,
+                    'matched': result.matched,
+                    'already_processed': result.already_processed,
+                    'bytes_skipped': gmail.stats.bytes_skipped,
+                })
+            except Exception as e:
+                db.rollback()
+                print(f"[{datetime.now()}] Poll failed: {e}")
+                try:
+                    heartbeat.beat(db, error=str(e)[:1000])
+                except Exception as beat_error:
+                    db.rollback()
+                    print(f"[{datetime.now()}] Could not write heartbeat: {beat_error}")
+            finally:
+                db.close()
+
+            if once:
+                break
+
+            wait = next_wait(interval, settings.payment_poll_jitter_seconds,
+                             settings.payment_poll_max_backoff_seconds, heartbeat.consecutive_failures)
+            if heartbeat.consecutive_failures:
+                print(f"[{datetime.now()}] {heartbeat.consecutive_failures} failed poll(s), retrying in {wait:.0f}s")
+            stop.wait(wait)
+
+    finally:
+        db = SessionLocal()
+        try:
+            heartbeat.stop(db)
+        except Exception as e:
+            print(f"[{datetime.now()}] Could not mark heartbeat stopped: {e}")
+        finally:
+            db.close()
+        print(f"[{datetime.now()}] Payment worker stopped")
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --interval 30."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    if not gmail_credentials_present():
+        sys.exit(1)
+
+    run_worker(
+        interval=float(_arg('--interval', str(get_settings().payment_poll_seconds))),
+        once='--once' in sys.argv,
+        hours=int(_arg('--hours', '1')),
+    )
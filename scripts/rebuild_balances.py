@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Rebuild Driver Balances
+
+Recomputes the driver_balances read model from the ledger in bulk.
+Run after manual ledger edits or if a balance is ever suspected to be off.
+
+By default each balance is the latest ledger checkpoint plus the entries
+after it; --full ignores checkpoints and sums the whole ledger.
+
+Usage:
+    python scripts/rebuild_balances.py
+    python scripts/rebuild_balances.py --full
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env before imports
+from dotenv import load_dotenv
+load_dotenv('.env.local')
+
+from app.core.database import SessionLocal
+from app.services.billing import rebuild_balances
+
+
+def run_rebuild(full: bool = False):
+    """Recompute all balances in a single transaction."""
+    source = "full ledger" if full else "checkpoints + ledger tail"
+    print(f"[{datetime.now()}] Rebuilding driver balances from {source}")
+
+    db = SessionLocal()
+
+    try:
+        count = rebuild_balances(db, use_checkpoints=not full)
+        db.commit()
+        print(f"Rebuilt {count} driver balances")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding balances: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_rebuild(full='--full' in sys.argv)
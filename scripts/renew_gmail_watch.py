@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Gmail Watch Renewal
+
+Registers (or renews) the payments mailbox's users.watch on the Pub/Sub
+topic gmail_push_topic, whose push subscription calls
+POST /webhook/gmail-push?token=<gmail_push_token>. A watch expires after
+7 days; this runs daily so it never lapses (see
+.github/workflows/renew-gmail-watch.yml). The expiry is recorded in
+gmail_sync_state.watch_expires_at.
+
+Usage:
+    python scripts/renew_gmail_watch.py
+    python scripts/renew_gmail_watch.py --topic projects/gonzo/topics/gmail-payments
+    python scripts/renew_gmail_watch.py --stop    # stop push notifications
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env before imports
+from dotenv import load_dotenv
+load_dotenv('.env.local')
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.services.gmail_push import renew_watch
+from app.services.gmail_service import GmailService
+
+
+def run_renewal(topic: str):
+    """Renew the watch and record its expiry."""
+    if not topic:
+        print("Error: GMAIL_PUSH_TOPIC is not set")
+        sys.exit(1)
+
+    print(f"[{datetime.now()}] Renewing Gmail watch on {topic}")
+    gmail = GmailService()
+    db = SessionLocal()
+
+    try:
+        watch = renew_watch(db, gmail, topic)
+        db.commit()
+        print(f"Watching {watch['mailbox']} from historyId {watch['history_id']}, "
+              f"expires {watch['expires_at']:%Y-%m-%d %H:%M} UTC")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error renewing watch: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --topic projects/..."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    if '--stop' in sys.argv:
+        GmailService().stop_watch()
+        print("Stopped Gmail push notifications")
+    else:
+        run_renewal(_arg('--topic', get_settings().gmail_push_topic))
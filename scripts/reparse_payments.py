@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Reparse Stored Payments
+
+After a parser change (bump gmail_parser.PARSER_VERSION), re-runs the
+current parsers over the archived raw email of every stored payment
+(see email_archive), in a process pool, and diffs each result against
+the payments_raw row field by field. Writes a JSON report of every row
+that would change, that no longer parses, or whose email isn't archived,
+and prints a summary.
+
+With --apply, corrections are written back a batch at a time (batched
+UPDATEs, one commit per batch) and every reparsed row is stamped with
+the current parser_version. A corrected amount on a matched payment posts
+the difference to the driver's ledger. Rows whose corrected
+(source, transaction_id) belongs to another payment, and rows that no
+longer parse, are reported but never changed; driver matches are left
+alone (check changed senders in the report).
+
+Usage:
+    python scripts/reparse_payments.py                          # report only, archive at EMAIL_ARCHIVE_DIR
+    python scripts/reparse_payments.py --older-than 2           # rows parsed before version 2, or unversioned
+    python scripts/reparse_payments.py --source zelle --workers 8 --report zelle.json
+    python scripts/reparse_payments.py --apply
+    python scripts/reparse_payments.py --archive path/to/archive
+"""
+
+import sys
+import os
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env before imports
+from dotenv import load_dotenv
+load_dotenv('.env.local')
+
+from sqlalchemy import or_
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models import PaymentRaw, PaymentSource
+from app.services.email_archive import EmailArchive
+from app.services.gmail_parser import PARSER_VERSION, parse_email
+from app.services.reparse import Correction, apply_corrections, conflicting_keys, diff_payment
+
+# Diffs printed in the summary; the report has all of them
+SAMPLE_DIFFS = 10
+
+
+def _reparse(job: tuple) -> tuple[bool, object]:
+    """
+    Worker: read one archived email and parse it. Returns (found, payment or
+    None); found is False when the index lists an object that is gone.
+    """
+    archive_dir, digest = job
+    try:
+        raw = EmailArchive(archive_dir).get(digest)
+    except KeyError:
+        return False, None
+    return True, parse_email(raw)
+
+
+def _jsonable(value):
+    return str(value) if value is not None else None
+
+
+def run_reparse(archive_dir: str, workers: int, batch_size: int = 500, source: str = None,
+                older_than: int = None, apply: bool = False, report_path: str = None):
+    """Reparse stored payments a batch at a time; report, and optionally correct, what changed."""
+    report_path = report_path or f"reparse-report-{datetime.now():%Y%m%d-%H%M%S}.json"
+    print(f"[{datetime.now()}] Reparsing stored payments with parser version {PARSER_VERSION}"
+          f" ({workers} workers{', applying corrections' if apply else ', report only'})")
+
+    archive = EmailArchive(archive_dir)
+    digests = dict(archive.iter_index())
+    print(f"{len(digests)} emails in the archive at {archive_dir}")
+
+    db = SessionLocal()
+    outcomes = Counter()
+    fields = Counter()
+    report_rows = []
+    corrected = 0
+    last_id = None
+    wall_start = time.perf_counter()
+
+    try:
+        query = db.query(PaymentRaw).filter(PaymentRaw.gmail_id.isnot(None))
+        if source:
+            query = query.filter(PaymentRaw.source == PaymentSource(source))
+        if older_than is not None:
+            query = query.filter(or_(PaymentRaw.parser_version.is_(None), PaymentRaw.parser_version < older_than))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Keyset pagination, so each batch can commit without holding a cursor open
+                page = query
+                if last_id is not None:
+                    page = page.filter(PaymentRaw.id > last_id)
+                rows = page.order_by(PaymentRaw.id).limit(batch_size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                archived = [row for row in rows if row.gmail_id in digests]
+                chunksize = max(1, len(archived) // (workers * 4))
+                jobs = [(archive_dir, digests[row.gmail_id]) for row in archived]
+                payments = {
+                    row.id: payment
+                    for row, (found, payment) in zip(archived, pool.map(_reparse, jobs, chunksize=chunksize))
+                    if found
+                }
+
+                corrections = []
+                unchanged = []
+                entries = []
+                for row in rows:
+                    entry = {'payment_id': str(row.id), 'gmail_id': row.gmail_id,
+                             'stored_version': row.parser_version}
+                    if row.id not in payments:
+                        outcome = 'no_raw_email'
+                    elif payments[row.id] is None:
+                        outcome = 'unparsed'
+                    else:
+                        changes = diff_payment(row, payments[row.id])
+                        if not changes:
+                            outcomes['unchanged'] += 1
+                            if row.parser_version != PARSER_VERSION:
+                                unchanged.append(row.id)
+                            continue
+                        outcome = 'changed'
+                        fields.update(changes.keys())
+                        entry['changes'] = {
+                            name: [_jsonable(old), _jsonable(new)] for name, (old, new) in changes.items()
+                        }
+                        corrections.append(Correction(row.id, changes, row.driver_id if row.matched else None))
+                    entry['outcome'] = outcome
+                    entries.append(entry)
+
+                conflicts = {str(payment_id) for payment_id in conflicting_keys(db, corrections)}
+                for entry in entries:
+                    if entry['payment_id'] in conflicts:
+                        entry['outcome'] = 'key_conflict'
+                    outcomes[entry['outcome']] += 1
+                report_rows.extend(entries)
+
+                if apply:
+                    corrected += apply_corrections(
+                        db, [c for c in corrections if str(c.payment_id) not in conflicts], unchanged
+                    )
+                    db.commit()
+                else:
+                    db.rollback()
+
+                done = sum(outcomes.values())
+                print(f"  {done} rows reparsed ({outcomes['changed']} {'corrected' if apply else 'would change'})")
+
+    finally:
+        db.close()
+
+    wall = time.perf_counter() - wall_start
+    total = sum(outcomes.values())
+    report = {
+        'parser_version': PARSER_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'applied': apply,
+        'filters': {'source': source, 'older_than': older_than},
+        'totals': dict(outcomes),
+        'changed_fields': dict(fields),
+        'rows': report_rows,
+    }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    print(f"\nDone! {total} stored payments reparsed in {wall:.1f}s "
+          f"({total / wall if wall else 0:,.0f} rows/sec)")
+    for outcome in ('unchanged', 'changed', 'key_conflict', 'unparsed', 'no_raw_email'):
+        print(f"  {outcome:14} {outcomes[outcome]:7d}")
+    if fields:
+        print("Changed fields: " + ", ".join(f"{name} {count}" for name, count in fields.most_common()))
+    for entry in [e for e in report_rows if 'changes' in e][:SAMPLE_DIFFS]:
+        print(f"  {entry['payment_id']} ({entry['outcome']})")
+        for name, (old, new) in entry['changes'].items():
+            print(f"      {name}: {old!r} -> {new!r}")
+    if apply:
+        print(f"Applied {corrected} corrections")
+    print(f"Report written to {report_path}")
+
+
+def _arg(name: str, default: str) -> str:
+    """Read a CLI option like --workers 8."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+if __name__ == "__main__":
+    older_than = _arg('--older-than', None)
+    archive_dir = _arg('--archive', get_settings().email_archive_dir)
+    if not archive_dir:
+        print("No archive: set EMAIL_ARCHIVE_DIR or pass --archive path/to/archive")
+        sys.exit(1)
+    run_reparse(
+        archive_dir=archive_dir,
+        workers=int(_arg('--workers', str(os.cpu_count() or 1))),
+        batch_size=int(_arg('--batch-size', '500')),
+        source=_arg('--source', None),
+        older_than=int(older_than) if older_than is not None else None,
+        apply='--apply' in sys.argv,
+        report_path=_arg('--report', None),
+    )
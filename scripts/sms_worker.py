@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Worker: SMS Outbox
+
+Drains the sms_outbox table: claims due messages in batches with
+FOR UPDATE SKIP LOCKED, sends them via OpenPhone (concurrently, rate-limited),
+retries failures with exponential backoff and logs outcomes to sms_log.
+
+Several workers can run side by side; each claims different rows.
+
+Usage:
+    python scripts/sms_worker.py          # run until stopped
+    python scripts/sms_worker.py --once   # drain what is due, then exit
+"""
+
+import sys
+import os
+import signal
+import asyncio
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env before imports
+from dotenv import load_dotenv
+load_dotenv('.env.local')
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.services.openphone import openphone
+from app.services.sms_outbox import drain, drain_batch
+
+
+async def run_worker(once: bool = False):
+    """Drain batches until stopped, sleeping when the outbox is empty."""
+    settings = get_settings()
+    stop = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"[{datetime.now()}] SMS worker started (pid {os.getpid()})")
+    db = SessionLocal()
+
+    try:
+        if once:
+            report = await drain(db)
+            print(f"Sent {report.sent}, retrying {report.retrying}, failed {report.failed}")
+            return
+
+        while not stop.is_set():
+            try:
+                report = await drain_batch(db)
+            except Exception as e:
+                db.rollback()
+                print(f"[{datetime.now()}] Error draining outbox: {e}")
+                report = None
+
+            if report and report.attempted:
+                print(f"[{datetime.now()}] Sent {report.sent}, retrying {report.retrying}, "
+                      f"failed {report.failed} ({report.throughput:.1f} msg/s, "
+                      f"p95 {report.p95_latency * 1000:.0f} ms)")
+                continue
+
+            # Nothing due: wait for the next poll (or a stop signal)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.sms_outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    finally:
+        db.close()
+        await openphone.aclose()
+        print(f"[{datetime.now()}] SMS worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker(once='--once' in sys.argv))
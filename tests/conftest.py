@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+# Make `app` and `scripts` importable when pytest runs from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Throwaway schema for tests that need Postgres
+TEST_SCHEMA = "pytest_gonzo"
+
+# Lines the performance tests want shown after the run (see perf_report)
+_PERF_LINES: list[str] = []
+
+
+@pytest.fixture(scope="session")
+def perf_report() -> list[str]:
+    """Append lines here to have them printed in the terminal summary."""
+    return _PERF_LINES
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _PERF_LINES:
+        terminalreporter.section("parser performance")
+        for line in _PERF_LINES:
+            terminalreporter.write_line(line)
+
+
+@pytest.fixture
+def session_factory():
+    """
+    sessionmaker bound to a fresh schema with every table, on the Postgres at
+    DATABASE_URL (the test is skipped if there is none). Dropped afterwards.
+    """
+    from app.core.config import get_settings
+    from app.core.database import Base
+
+    engine = create_engine(get_settings().database_url, connect_args={"options": f"-csearch_path={TEST_SCHEMA}"})
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+    except OperationalError:
+        engine.dispose()
+        pytest.skip("No Postgres at DATABASE_URL")
+    Base.metadata.create_all(engine)
+
+    yield sessionmaker(bind=engine, autoflush=False)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+    engine.dispose()
@@ -0,0 +1,199 @@
+"""
+Local stand-in for the Gmail API, for tests and benchmarks.
+
+An in-memory mailbox served over HTTP: messages list (paged)/get (raw or
+metadata), profile, history, watch/stop and the multipart/mixed batch
+endpoint. Parts of a batch can fail with 429 on their first attempt
+(fail_every), to exercise GmailService's individual retries, and every
+request can be delayed (latency) to approximate the round trip to Google.
+Used by tests/ and by scripts/bench_gmail_batch.py,
+bench_gmail_header_first.py and replay_gmail_push.py.
+"""
+
+import base64
+import json
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from email.parser import BytesHeaderParser, BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import httplib2
+from googleapiclient.discovery import build
+
+from app.services.gmail_service import GmailService
+
+
+class StandInGmail:
+    """In-memory mailbox plus request counters shared by the handler."""
+
+    def __init__(self, messages: int, latency: float, fail_every: int, mailbox: list = None):
+        """mailbox: raw emails to serve instead of generated placeholder ones."""
+        if mailbox is None:
+            mailbox = [(f"Subject: Payment {i}\r\n\r\n" + f"body {i}\r\n" * 1000).encode() for i in range(messages)]
+        self.messages = {f"msg{i:05d}": raw for i, raw in enumerate(mailbox)}
+        self.latency = latency
+        self.fail_every = fail_every
+        self.http_requests = 0
+        self.failed_once = set()
+        self.deleted = set()  # still in history and search results, 404 on get
+        self.watch_topic = None
+        self.lock = threading.Lock()
+
+    def deliver(self, raw: bytes) -> tuple[str, str]:
+        """A new message arrives. Returns (message ID, the mailbox's new historyId)."""
+        with self.lock:
+            message_id = f"msg{len(self.messages):05d}"
+            self.messages[message_id] = raw
+            return message_id, str(1000 + len(self.messages))
+
+    def post(self, path: str, body: dict) -> tuple[int, dict]:
+        """Answer users.watch / users.stop."""
+        action = urllib.parse.urlparse(path).path.rstrip("/").rsplit("/", 1)[-1]
+        if action == "watch":
+            self.watch_topic = body["topicName"]
+            # Watches last 7 days
+            expiration = int((time.time() + 7 * 86400) * 1000)
+            return 200, {"historyId": str(1000 + len(self.messages)), "expiration": str(expiration)}
+        if action == "stop":
+            self.watch_topic = None
+            return 204, {}
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+    def get(self, path: str, in_batch: bool) -> tuple[int, dict]:
+        """Answer one API call (GET path?query) with (status, JSON)."""
+        parsed = urllib.parse.urlparse(path)
+        parts = parsed.path.strip("/").split("/")  # gmail v1 users me messages [id]
+
+        if parts[-1] == "profile":
+            return 200, {"emailAddress": "payments@example.com", "historyId": str(1000 + len(self.messages))}
+
+        if parts[-1] == "history":
+            # Message i was added at historyId 1000 + i + 1
+            query = urllib.parse.parse_qs(parsed.query)
+            start = int(query["startHistoryId"][0])
+            if start < 1000:
+                return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            added = [m for i, m in enumerate(self.messages) if 1000 + i + 1 > start]
+            return 200, {
+                "history": [{"id": m, "messagesAdded": [{"message": {"id": m, "labelIds": ["INBOX"]}}]} for m in added],
+                "historyId": str(1000 + len(self.messages)),
+            }
+
+        if parts[-1] == "messages":
+            query = urllib.parse.parse_qs(parsed.query)
+            limit = int(query.get("maxResults", ["100"])[0])
+            offset = int(query.get("pageToken", ["0"])[0])
+            ids = list(self.messages)[offset:offset + limit]
+            page = {"messages": [{"id": m, "threadId": m} for m in ids]}
+            if offset + limit < len(self.messages):
+                page["nextPageToken"] = str(offset + limit)
+            return 200, page
+
+        message_id = parts[-1]
+        if message_id not in self.messages or message_id in self.deleted:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+        # Rate-limit some parts of a batch, once per message
+        if in_batch and self.fail_every and int(message_id[3:]) % self.fail_every == 0:
+            with self.lock:
+                if message_id not in self.failed_once:
+                    self.failed_once.add(message_id)
+                    return 429, {"error": {"code": 429, "message": "Too many concurrent requests for user"}}
+
+        query = urllib.parse.parse_qs(parsed.query)
+        if query.get("format") == ["metadata"]:
+            wanted = {h.lower() for h in query.get("metadataHeaders", [])}
+            headers = BytesHeaderParser().parsebytes(self.messages[message_id])
+            return 200, {
+                "id": message_id,
+                "internalDate": "1767623400000",
+                "sizeEstimate": len(self.messages[message_id]),
+                "payload": {"headers": [{"name": k, "value": v} for k, v in headers.items() if k.lower() in wanted]},
+            }
+
+        raw = base64.urlsafe_b64encode(self.messages[message_id]).decode()
+        return 200, {"id": message_id, "raw": raw, "internalDate": "1767623400000"}
+
+
+def make_handler(gmail: StandInGmail):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _respond(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _count(self):
+            with gmail.lock:
+                gmail.http_requests += 1
+            if gmail.latency:
+                time.sleep(gmail.latency)
+
+        def do_GET(self):
+            self._count()
+            status, payload = gmail.get(self.path, in_batch=False)
+            self._respond(status, json.dumps(payload).encode(), "application/json")
+
+        def do_POST(self):
+            """Batch endpoint (multipart/mixed of application/http parts), or watch/stop."""
+            self._count()
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            if not self.path.startswith("/batch"):
+                status, payload = gmail.post(self.path, json.loads(body or b"{}"))
+                self._respond(status, json.dumps(payload).encode() if status != 204 else b"", "application/json")
+                return
+
+            envelope = b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body
+            batch = BytesParser().parsebytes(envelope)
+
+            boundary = "batch_standin_boundary"
+            out = []
+            for part in batch.get_payload():
+                request_line = part.get_payload().split("\n", 1)[0]
+                method, path, _ = request_line.split(" ", 2)
+                status, payload = gmail.get(path, in_batch=True)
+                content = json.dumps(payload)
+                out.append(
+                    f"--{boundary}\r\n"
+                    "Content-Type: application/http\r\n"
+                    f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    "Content-Type: application/json; charset=UTF-8\r\n"
+                    f"Content-Length: {len(content)}\r\n\r\n"
+                    f"{content}\r\n"
+                )
+            out.append(f"--{boundary}--\r\n")
+            self._respond(200, "".join(out).encode(), f"multipart/mixed; boundary={boundary}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+@contextmanager
+def serve(gmail: StandInGmail) -> Iterator[str]:
+    """Serve the stand-in on a free local port; yields its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(gmail))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/"
+    finally:
+        server.shutdown()
+
+
+def connect(base_url: str, header_first: bool = True) -> GmailService:
+    """A GmailService talking to the stand-in at base_url."""
+    service = build(
+        "gmail", "v1", http=httplib2.Http(), static_discovery=True,
+        client_options={"api_endpoint": base_url},
+    )
+    return GmailService(service=service, batch_uri=base_url + "batch/gmail/v1", header_first=header_first)
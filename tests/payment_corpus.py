@@ -0,0 +1,250 @@
+"""
+Synthetic payment emails with known ground truth, for the corpus parser
+test and the scripts built on it (generate_payment_emails.py,
+bench_parse_corpus.py). Each message varies independently in:
+- layout: the body/subject layouts each parser handles (Zelle heading
+  table vs "You received ... from" text, Cash App subject vs body
+  sender, Venmo HTML vs text note, Chime <strong> vs text memo, Stripe
+  with and without "for <account>")
+- transfer encoding: quoted-printable, base64, 8bit
+- charset: utf-8, iso-8859-1, windows-1252 (accented names and memos
+  where the parser reads them)
+- structure: text+HTML alternative, HTML only, HTML with an inline logo
+  (multipart/related), or with a PDF receipt attached (multipart/mixed)
+- weight: provider-style HTML with a large <head> and legal footer, or a
+  minimal body
+
+Output is deterministic for a given seed.
+"""
+
+import random
+import string
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterator, Optional
+
+from tests.sample_emails import FOOTER, STYLES
+
+PROVIDERS = ['zelle', 'cashapp', 'venmo', 'chime', 'stripe']
+
+FROM = {
+    'zelle': "Chase <no.reply.alerts@chase.com>",
+    'cashapp': "Cash App <cash@square.com>",
+    'venmo': "Venmo <venmo@venmo.com>",
+    'chime': "Chime <alerts@account.chime.com>",
+    'stripe': "Stripe <notifications@stripe.com>",
+}
+
+LAYOUTS = {
+    'zelle': ['table', 'text'],
+    'cashapp': ['subject_sent', 'subject_received', 'body_sent_by', 'body_paid_you'],
+    'venmo': ['note_html', 'note_text'],
+    'chime': ['memo_strong', 'memo_text'],
+    'stripe': ['for_account', 'plain'],
+}
+ENCODINGS = ['quoted-printable', 'base64', '8bit']
+CHARSETS = ['utf-8', 'iso-8859-1', 'windows-1252']
+STRUCTURES = ['alternative', 'html_only', 'related', 'mixed']
+WEIGHTS = ['heavy', 'light']
+
+NAMES = ["John Smith", "Riva D Brewer", "Maria Lopez", "Devon Carter", "Alex Kim", "Tanya Brooks",
+         "Marcus Lee", "Keisha Johnson", "Luis Ramirez", "Omar Haddad", "Grace Nguyen", "Andre Wallace"]
+# Not for Zelle (see build_message)
+ACCENTED_NAMES = ["Zoë Martínez", "José Peña", "Renée Dubois", "Björn Åberg"]
+MEMOS = ["Weekly rental", "car payment", "rent", "Week 12", "insurance", "late fee", "deposit"]
+ACCENTED_MEMOS = ["café rent", "depósito semanal", "loyer réglé"]
+
+
+@dataclass
+class Expected:
+    """What parse_email() should return for a message."""
+    source: str
+    amount: float
+    sender_name: str
+    transaction_id: Optional[str]
+    memo: Optional[str]
+    received_at: str  # ISO 8601 with offset, as parsed from the Date header
+
+
+FIELDS = ['source', 'amount', 'sender_name', 'transaction_id', 'memo', 'received_at']
+
+
+def _money(amount: float) -> str:
+    return f"{amount:,.2f}"
+
+
+def _html(content: str, weight: str) -> str:
+    if weight == 'light':
+        return f"<html><body><div>{content}</div></body></html>"
+    return (
+        "<html><head><meta charset=\"utf-8\"><title>Notification</title>"
+        f"{STYLES}</head><body><table class=\"c1\">{content}</table>{FOOTER}</body></html>"
+    )
+
+
+def _zelle(rng: random.Random, layout: str, name: str, amount: float, memo: Optional[str]):
+    tx = str(rng.randrange(10 ** 7, 10 ** 11))
+    shown_memo = memo or "N/A"
+    if layout == 'table':
+        content = (
+            f"<tr><td><h1 class=\"c2\">{name.upper()} sent you money</h1></td></tr>"
+            f"<tr><td>Amount</td><td class=\"c3\">${_money(amount)}</td></tr>"
+            f"<tr><td>Transaction number</td><td class=\"c4\"> {tx} </td></tr>"
+            f"<tr><td>Memo</td><td class=\"c5\"> {shown_memo} </td></tr>"
+        )
+    else:
+        content = (
+            f"<tr><td><p>You received ${_money(amount)} from {name.upper()}.</p>"
+            f"<p>Amount: ${_money(amount)}</p><p>Transaction number: {tx}</p>"
+            f"<p>Memo: {shown_memo}</p></td></tr>"
+        )
+    text = f"{name.upper()} sent you ${_money(amount)}\nTransaction number: {tx}\nMemo: {shown_memo}\n"
+    return "You received money with Zelle", content, text, name.title(), tx, memo
+
+
+def _cashapp(rng: random.Random, layout: str, name: str, amount: float, memo: Optional[str]):
+    tx = "D-" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=8))
+    shown = f"{amount:,.0f}" if amount == int(amount) else _money(amount)
+    memo_row = f"<tr><td class=\"text-subtle profile-description\">For {memo}</td></tr>" if memo else ""
+    if layout == 'subject_sent':
+        subject = f"{name} sent you ${shown}" + (f" for {memo}" if memo else "")
+        content = f"<tr><td>You were sent ${shown} by {name}</td></tr>{memo_row}"
+    elif layout == 'subject_received':
+        subject = f"Cash App: You received ${shown} from {name}"
+        content = f"<tr><td>You received ${shown} from {name}</td></tr>{memo_row}"
+    elif layout == 'body_sent_by':
+        subject = "Payment received"
+        content = f"<tr><td>You were sent ${shown} by {name}</td></tr>{memo_row}"
+    else:
+        subject = "Payment received"
+        content = f"<tr><td>\n{name} paid you ${shown}\n</td></tr>{memo_row}"
+    content += f"<tr><td>Identifier #{tx}</td></tr>"
+    text = f"{name} sent you ${shown}\n" + (f"For {memo}\n" if memo else "") + f"Identifier #{tx}\n"
+    return subject, content, text, name, tx, memo
+
+
+def _venmo(rng: random.Random, layout: str, name: str, amount: float, memo: Optional[str]):
+    tx = str(rng.randrange(10 ** 18, 10 ** 19))
+    if layout == 'note_html':
+        content = (
+            f"<tr><td>{name} paid you ${_money(amount)}</td></tr>"
+            + (f"<tr><td class=\"transaction-note c6\">{memo}</td></tr>" if memo else "")
+            + f"<tr><td>Transaction ID: {tx}</td></tr>"
+        )
+    else:
+        content = (
+            f"<tr><td><p>{name} paid you ${_money(amount)}</p>"
+            + (f"<p>Note: {memo}</p>" if memo else "")
+            + f"<p>Transaction ID: {tx}</p></td></tr>"
+        )
+    text = f"{name} paid you ${_money(amount)}\n" + (f"Note: {memo}\n" if memo else "") + f"Transaction ID: {tx}\n"
+    return f"{name} paid you ${_money(amount)}", content, text, name, tx, memo
+
+
+def _chime(rng: random.Random, layout: str, name: str, amount: float, memo: Optional[str]):
+    if not memo:
+        clause = ""
+    elif layout == 'memo_strong':
+        clause = f" for <strong>{memo}</strong>"
+    else:
+        clause = f" for {memo}"
+    content = f"<tr><td>You received ${_money(amount)} from {name} through Chime{clause}.</td></tr>"
+    text = f"You received ${_money(amount)} from {name} through Chime" + (f" for {memo}" if memo else "") + ".\n"
+    # Chime has no transaction ID in the body; the parser falls back to Message-ID
+    return f"{name} just sent you money", content, text, name, None, memo
+
+
+def _stripe(rng: random.Random, layout: str, name: str, amount: float, memo: Optional[str]):
+    tx = "pi_" + "".join(rng.choices(string.ascii_letters + string.digits, k=24))
+    subject = f"Payment of ${_money(amount)} from {name}"
+    if layout == 'for_account':
+        subject += " for Gonzo Car Rentals"
+    content = f"<tr><td>${_money(amount)} USD</td></tr><tr><td>{tx}</td></tr>"
+    text = f"${_money(amount)} USD\n{tx}\n"
+    # Stripe receipts carry no memo
+    return subject, content, text, name, tx, None
+
+
+BUILDERS = {'zelle': _zelle, 'cashapp': _cashapp, 'venmo': _venmo, 'chime': _chime, 'stripe': _stripe}
+
+
+def build_message(rng: random.Random, index: int, provider: str) -> tuple[bytes, dict, Expected]:
+    """One message: (raw bytes, variant, expected fields)."""
+    variant = {
+        'layout': rng.choice(LAYOUTS[provider]),
+        'encoding': rng.choice(ENCODINGS),
+        'charset': rng.choice(CHARSETS),
+        'structure': rng.choice(STRUCTURES),
+        'weight': rng.choice(WEIGHTS),
+    }
+    # Non-UTF-8 charsets always get characters outside ASCII to encode;
+    # Zelle's sender pattern only takes ASCII letters
+    accented = variant['charset'] != 'utf-8' or rng.random() < 0.2
+    name_pool = ACCENTED_NAMES if accented and provider != 'zelle' else NAMES
+    memo_pool = ACCENTED_MEMOS if accented else MEMOS
+    name = rng.choice(name_pool)
+    memo = rng.choice(memo_pool) if rng.random() < 0.85 else None
+    amount = rng.choice([rng.randrange(20, 600) * 1.0, round(rng.uniform(20, 2500), 2)])
+
+    subject, content, text, sender_name, tx, memo = BUILDERS[provider](rng, variant['layout'], name, amount, memo)
+
+    domain = FROM[provider].split('@')[1].rstrip('>')
+    message_id = f"{index:07d}.{rng.getrandbits(48):012x}@{domain}"
+    offset = timezone(timedelta(hours=rng.choice([0, -5, -6, -8])))
+    date = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=rng.randrange(0, 60 * 24 * 180))
+
+    msg = EmailMessage()
+    msg['From'] = FROM[provider]
+    msg['To'] = "payments@gonzocar.com"
+    msg['Subject'] = subject
+    msg['Date'] = format_datetime(date.astimezone(offset))
+    msg['Message-ID'] = f"<{message_id}>"
+
+    html = _html(content, variant['weight'])
+    options = {'charset': variant['charset'], 'cte': variant['encoding']}
+    if variant['structure'] == 'html_only':
+        msg.set_content(html, subtype='html', **options)
+    else:
+        msg.set_content(text, **options)
+        msg.add_alternative(html, subtype='html', **options)
+        if variant['structure'] == 'related':
+            msg.get_payload()[1].add_related(rng.randbytes(rng.randrange(2000, 20000)), 'image', 'png',
+                                             cid=f"<logo-{index}@{domain}>")
+        elif variant['structure'] == 'mixed':
+            msg.add_attachment(rng.randbytes(rng.randrange(5000, 40000)), 'application', 'pdf',
+                               filename="receipt.pdf")
+
+    expected = Expected(
+        source=provider,
+        amount=amount,
+        sender_name=sender_name,
+        transaction_id=tx if provider != 'chime' else message_id,
+        memo=memo,
+        received_at=parsedate_to_datetime(msg['Date']).isoformat(),
+    )
+    return msg.as_bytes(), variant, expected
+
+
+def generate_corpus(count: int, seed: int = 1) -> Iterator[tuple[str, bytes, dict, Expected]]:
+    """(file name, raw bytes, variant, expected) for `count` messages, providers in rotation."""
+    rng = random.Random(seed)
+    for i in range(count):
+        provider = PROVIDERS[i % len(PROVIDERS)]
+        raw, variant, expected = build_message(rng, i, provider)
+        yield f"{i:06d}-{provider}.eml", raw, variant, expected
+
+
+def parsed_fields(payment) -> dict:
+    """A ParsedPayment as comparable ground-truth fields (None if it didn't parse)."""
+    if payment is None:
+        return None
+    return {
+        'source': payment.source,
+        'amount': payment.amount,
+        'sender_name': payment.sender_name,
+        'transaction_id': payment.transaction_id,
+        'memo': payment.memo,
+        'received_at': payment.received_at.isoformat(),
+    }
@@ -0,0 +1,40 @@
+"""Batched Gmail downloads against the Gmail stand-in."""
+
+import pytest
+
+from tests.gmail_stand_in import StandInGmail, connect, serve
+
+
+@pytest.fixture
+def stand_in():
+    """(StandInGmail, GmailService) with 120 messages; every 7th part is rate-limited once in a batch."""
+    gmail = StandInGmail(120, 0, 7)
+    with serve(gmail) as base_url:
+        yield gmail, connect(base_url, header_first=False)
+
+
+def test_rate_limited_parts_are_retried(stand_in):
+    gmail, client = stand_in
+    ids = list(gmail.messages)
+    gmail.http_requests = 0
+
+    emails = client.get_emails(ids, batch_size=50)
+
+    assert [(e["gmail_id"], e["raw"]) for e in emails] == list(gmail.messages.items())
+    retried = [m for m in ids if int(m[3:]) % 7 == 0]
+    assert gmail.failed_once == set(retried)
+    # 3 batch requests, then one request per failed part
+    assert gmail.http_requests == 3 + len(retried)
+
+
+def test_iter_emails_downloads_one_batch_at_a_time(stand_in):
+    gmail, client = stand_in
+    gmail.http_requests = 0
+
+    emails = client.iter_emails(iter(gmail.messages), batch_size=50)
+    first = next(emails)
+
+    assert first["gmail_id"] == "msg00000"
+    # The first batch (and its 8 retried parts) only
+    assert gmail.http_requests == 1 + 8
+    assert len(list(emails)) == 119
@@ -0,0 +1,152 @@
+"""
+Gmail push notifications through POST /webhook/gmail-push, with a fresh
+PushIngestor fetching from the Gmail stand-in. Needs Postgres at DATABASE_URL.
+"""
+
+import base64
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import webhooks
+from app.core.config import get_settings
+from app.main import app
+from app.models import Alias, AliasType, Driver, GmailSyncState, PaymentRaw
+from app.services.gmail_push import PushIngestor, renew_watch
+from tests.gmail_stand_in import StandInGmail, connect, serve
+from tests.sample_emails import NOISE, SAMPLES, build_email, build_notification, zelle_payment
+
+TOKEN = "push-test-token"
+MAILBOX = "payments@example.com"
+TOPIC = "projects/gonzo/topics/gmail-payments"
+
+
+def notification(history_id: int, message_id: str = "9120304151") -> dict:
+    """A Pub/Sub push body; data is base64 of {"emailAddress", "historyId"}."""
+    data = json.dumps({"emailAddress": MAILBOX, "historyId": history_id}).encode()
+    return {
+        "message": {"data": base64.b64encode(data).decode(), "messageId": message_id,
+                    "publishTime": "2026-01-05T14:30:00.123Z"},
+        "subscription": "projects/gonzo/subscriptions/gmail-payments-push",
+    }
+
+
+class PushEnv:
+    """The stand-in mailbox, the ingestor behind the webhook and a client to post to it."""
+
+    def __init__(self, gmail: StandInGmail, ingestor: PushIngestor, session_factory, base_url: str):
+        self.gmail = gmail
+        self.ingestor = ingestor
+        self.db = session_factory()
+        self.base_url = base_url
+        self.client = TestClient(app)
+
+    def push(self, body: dict, token: str = TOKEN):
+        return self.client.post("/webhook/gmail-push", params={"token": token}, json=body)
+
+    def wait_for_cycles(self, done: int, timeout: float = 10.0):
+        """Block until the ingestor has finished `done` cycles (run or skipped)."""
+        deadline = time.monotonic() + timeout
+        while self.ingestor.cycles + self.ingestor.skipped < done:
+            assert time.monotonic() < deadline, f"timed out waiting for push cycle {done}"
+            time.sleep(0.02)
+
+    def cursor(self):
+        self.db.expire_all()
+        state = self.db.get(GmailSyncState, MAILBOX)
+        return state.history_id if state else None
+
+
+@pytest.fixture
+def env(session_factory, monkeypatch):
+    # The five sample payments plus one email no parser keeps: historyId 1006
+    mailbox = [build_email(provider) for provider in SAMPLES]
+    mailbox.append(build_notification(*NOISE[0], "noise-0"))
+    gmail = StandInGmail(0, 0, 0, mailbox=mailbox)
+
+    with serve(gmail) as base_url:
+        ingestor = PushIngestor(debounce=0.2, session_factory=session_factory,
+                                gmail_factory=lambda: connect(base_url))
+        monkeypatch.setattr(webhooks, "push_ingestor", ingestor)
+        monkeypatch.setattr(get_settings(), "gmail_push_token", TOKEN)
+        env = PushEnv(gmail, ingestor, session_factory, base_url)
+
+        driver = Driver(first_name="John", last_name="Smith", email="john@example.com",
+                        phone="5550100", billing_rate=50)
+        env.db.add(driver)
+        env.db.add(Alias(driver=driver, alias_type=AliasType.zelle, alias_value="John Smith"))
+        env.db.commit()
+        env.driver_id = driver.id
+
+        yield env
+
+        ingestor.cancel()
+        env.db.close()
+
+
+@pytest.mark.parametrize("token", ["wrong", "", "tökén"])
+def test_bad_token_is_rejected(env, token):
+    response = env.push(notification(1006), token=token)
+    assert response.status_code == 403
+    assert env.ingestor.cycles == 0
+
+
+def test_malformed_body_is_acknowledged_and_ignored(env):
+    response = env.client.post("/webhook/gmail-push", params={"token": TOKEN}, json={"message": {"data": "!!"}})
+    assert response.status_code == 200
+    assert response.json() == {"status": "ignored"}
+
+
+def test_first_notification_stores_the_mailbox(env):
+    response = env.push(notification(1006))
+    env.wait_for_cycles(1)
+
+    assert response.json() == {"status": "scheduled"}
+    assert env.db.query(PaymentRaw).count() == len(SAMPLES)
+    assert env.cursor() == "1006"
+
+
+@pytest.mark.parametrize("history_id", [1006, 1003], ids=["redelivered", "stale"])
+def test_notification_the_cursor_covers_is_skipped_without_a_fetch(env, history_id):
+    env.push(notification(1006))
+    env.wait_for_cycles(1)
+    env.gmail.http_requests = 0
+
+    env.push(notification(history_id, "9120304149"))
+    env.wait_for_cycles(2)
+
+    assert env.ingestor.skipped == 1
+    assert env.gmail.http_requests == 0
+
+
+def test_burst_of_notifications_runs_one_cycle(env):
+    env.push(notification(1006))
+    env.wait_for_cycles(1)
+    for n in (31000001, 31000002, 31000003):
+        env.gmail.deliver(zelle_payment(n))
+    cycles = env.ingestor.cycles
+
+    # Three new emails, one notification redelivered
+    statuses = [env.push(notification(history_id)).json()["status"] for history_id in (1007, 1008, 1008, 1009)]
+    env.wait_for_cycles(cycles + 1)
+    time.sleep(env.ingestor.debounce * 2)  # a second cycle would have started by now
+
+    assert statuses == ["scheduled"] + ["debounced"] * 3
+    assert env.ingestor.cycles == cycles + 1
+    new = env.db.query(PaymentRaw).filter(PaymentRaw.transaction_id.like("3100000%")).all()
+    assert len(new) == 3
+    assert all(payment.driver_id == env.driver_id for payment in new)
+    assert env.cursor() == "1009"
+
+
+def test_renew_watch_records_the_expiry(env):
+    env.push(notification(1006))
+    env.wait_for_cycles(1)
+
+    watch = renew_watch(env.db, connect(env.base_url), TOPIC)
+    env.db.commit()
+
+    assert env.gmail.watch_topic == TOPIC
+    assert env.db.get(GmailSyncState, MAILBOX).watch_expires_at == watch["expires_at"]
@@ -0,0 +1,52 @@
+"""Incremental Gmail sync against the Gmail stand-in: when the cursor may move forward."""
+
+import pytest
+
+from app.models import GmailSyncState, ProcessedMessage, ProcessedOutcome
+from app.services.payment_ingest import poll_gmail
+from tests.gmail_stand_in import StandInGmail, connect, serve
+from tests.sample_emails import SAMPLES, build_email
+
+
+@pytest.fixture
+def stand_in():
+    gmail = StandInGmail(0, 0, 0, mailbox=[build_email(provider) for provider in SAMPLES])
+    with serve(gmail) as base_url:
+        yield gmail, connect(base_url)
+
+
+@pytest.mark.parametrize("header_first", [True, False])
+def test_deleted_message_is_yielded_as_missing(stand_in, header_first):
+    gmail, client = stand_in
+    gmail.deleted.add("msg00002")
+
+    emails = list(client.iter_emails(list(gmail.messages), header_first=header_first))
+
+    assert [e["gmail_id"] for e in emails] == list(gmail.messages)
+    missing = [e for e in emails if e.get("missing")]
+    assert [(e["gmail_id"], e["raw"]) for e in missing] == [("msg00002", None)]
+
+
+def test_poll_records_deleted_message_and_advances_cursor(stand_in, session_factory):
+    gmail, client = stand_in
+    gmail.deleted.add("msg00002")
+    db = session_factory()
+    db.add(GmailSyncState(mailbox="payments@example.com", history_id="1000"))
+    db.commit()
+
+    result = poll_gmail(client, db)
+
+    db.expire_all()
+    assert db.get(GmailSyncState, "payments@example.com").history_id == "1005"
+    assert db.get(ProcessedMessage, "msg00002").outcome == ProcessedOutcome.missing
+    assert result.stored == len(SAMPLES) - 1
+    # Nothing is left to ask Gmail for
+    assert poll_gmail(client, db).emails == 0
+    db.close()
+
+
+def test_get_emails_leaves_out_missing_messages(stand_in):
+    gmail, client = stand_in
+    gmail.deleted.add("msg00000")
+
+    assert [e["gmail_id"] for e in client.get_emails(list(gmail.messages))] == list(gmail.messages)[1:]
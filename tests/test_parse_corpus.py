@@ -0,0 +1,27 @@
+"""Every field of every generated payment email parses to its ground truth (see payment_corpus.py)."""
+
+from dataclasses import asdict
+
+import pytest
+
+from app.services.gmail_parser import parse_email
+from tests.payment_corpus import FIELDS, generate_corpus, parsed_fields
+
+
+@pytest.mark.parametrize("seed", [1, 7])
+def test_corpus_parses_with_full_accuracy(seed):
+    misses = []
+    for name, raw, variant, expected in generate_corpus(300, seed=seed):
+        expected = asdict(expected)
+        got = parsed_fields(parse_email(raw))
+        wrong = [field for field in FIELDS if got is None or got[field] != expected[field]]
+        if wrong:
+            misses.append((name, variant, wrong))
+
+    assert misses == []
+
+
+def test_non_payment_email_is_not_parsed():
+    raw = b"From: News <news@example.com>\r\nSubject: You received money with Zelle\r\n\r\n$25.00\r\n"
+    assert parse_email(raw) is None
+
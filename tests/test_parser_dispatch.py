@@ -0,0 +1,56 @@
+"""Sender-domain dispatch: which parser, if any, an email's headers select."""
+
+import pytest
+
+from app.services.gmail_parser import (
+    PARSERS, CashAppParser, ChimeParser, StripeParser, VenmoParser, ZelleParser,
+    claims_message, find_parser,
+)
+
+
+@pytest.mark.parametrize("from_addr, subject, parser", [
+    ("Chase <no.reply.alerts@chase.com>", "You received money with Zelle", ZelleParser),
+    ("Cash App <cash@square.com>", "Jane Doe sent you $25", CashAppParser),
+    ("Venmo <venmo@venmo.com>", "Jane Doe paid you $25.00", VenmoParser),
+    ("Chime <alerts@account.chime.com>", "Jane Doe just sent you money", ChimeParser),
+    ("Stripe <notifications@stripe.com>", "Payment received", StripeParser),
+])
+def test_sender_domain_selects_parser(from_addr, subject, parser):
+    assert find_parser(from_addr, subject) is parser
+
+
+def test_parent_domains_match():
+    assert find_parser("Venmo <venmo@email.venmo.com>", "Jane paid you $5.00") is VenmoParser
+
+
+def test_subject_keywords_are_required():
+    assert find_parser("Chase <no.reply.alerts@chase.com>", "Your statement is ready") is None
+
+
+@pytest.mark.parametrize("from_addr, subject", [
+    ("Venmo <venmo@venmo.com>", "You paid Jane Doe $25.00"),
+    ("Cash App <cash@square.com>", "You sent $25 to Jane Doe"),
+    ("Cash App <cash@square.com>", "Privacy Notice"),
+])
+def test_ignored_subjects_are_dropped(from_addr, subject):
+    assert find_parser(from_addr, subject) is None
+
+
+def test_display_name_fallback_for_unknown_domains():
+    assert find_parser("Cash App <cash@mailer.example>", "Jane Doe sent you $25") is CashAppParser
+
+
+def test_display_name_fallback_skipped_when_domain_is_registered():
+    # chase.com is registered, so its rules decide even if the name says Cash App
+    assert find_parser("Cash App <alerts@chase.com>", "Jane Doe sent you $25") is None
+
+
+def test_unknown_sender_not_claimed():
+    assert not claims_message("News <news@example.com>", "You received money with Zelle")
+    assert claims_message("Chase <no.reply.alerts@chase.com>", "You received money with Zelle")
+
+
+def test_every_parser_registered_once():
+    assert sorted(parser.__name__ for parser in PARSERS) == sorted(set(parser.__name__ for parser in PARSERS))
+    assert all(parser.DOMAINS for parser in PARSERS)
+
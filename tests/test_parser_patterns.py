@@ -0,0 +1,60 @@
+"""
+The PATTERNS regex registry over the sample email of each provider: every
+sample parses, every provider's patterns are registered and compiled, and
+parse throughput and time per pattern are reported in the summary.
+"""
+
+import re
+from email import policy
+from email.parser import BytesParser
+
+import pytest
+
+from app.services.gmail_parser import PATTERNS, EmailView, parse_email
+from tests.sample_emails import SAMPLES, build_email, parse_rate, pattern_time
+
+# Enough for stable numbers without slowing the suite down
+ITERATIONS = 200
+
+
+def test_patterns_are_named_by_provider():
+    prefixes = {name.split('.', 1)[0] for name in PATTERNS}
+    assert prefixes == set(SAMPLES) | {'body'}
+    assert all(isinstance(pattern, re.Pattern) for pattern in PATTERNS.values())
+
+
+@pytest.mark.parametrize("provider", list(SAMPLES))
+def test_sample_parses(provider):
+    payment = parse_email(build_email(provider))
+    assert payment is not None
+    assert payment.source == provider
+    assert (payment.amount, payment.sender_name, payment.transaction_id) == SAMPLES[provider][3]
+
+
+def test_is_html_does_not_depend_on_reading_html():
+    view = EmailView(BytesParser(policy=policy.default).parsebytes(build_email('zelle')))
+    assert view.is_html
+    plain = EmailView(BytesParser(policy=policy.default).parsebytes(
+        b"From: a@example.com\r\nSubject: hi\r\n\r\nJane Doe sent you $5.00\r\n"))
+    assert not plain.is_html
+    assert plain.text == "Jane Doe sent you $5.00"
+
+
+@pytest.mark.parametrize("provider", list(SAMPLES))
+def test_pattern_performance(provider, perf_report):
+    raw = build_email(provider)
+    view = EmailView(BytesParser(policy=policy.default).parsebytes(raw))
+    names = [name for name in PATTERNS if name.startswith(provider + '.')]
+    assert names
+
+    rate = parse_rate(raw, ITERATIONS)
+    perf_report.append(f"{provider}: {rate:,.0f} emails/sec "
+                       f"(from <body> {len(view.html):,} chars, text view {len(view.text):,})")
+    perf_report.append(f"  {'pattern':32} {'html':>10} {'text':>10}")
+    for name in names:
+        if '.subject' in name:
+            perf_report.append(f"  {name:32} {'(subject)':>10} {pattern_time(name, view.subject, ITERATIONS):8.2f}us")
+            continue
+        perf_report.append(f"  {name:32} {pattern_time(name, view.html, ITERATIONS):8.2f}us "
+                           f"{pattern_time(name, view.text, ITERATIONS):8.2f}us")
+    assert rate > 0